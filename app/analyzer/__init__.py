@@ -0,0 +1,17 @@
+# app/analyzer
+# Motor de detección de AlertTrail detrás de run_analysis.
+from functools import lru_cache
+
+from ..config import settings
+from .engine import ENGINE_VERSION, RuleSet, Scan, compile_rules
+from .rules import DEFAULT_RULES, Rule, load_rules
+
+
+@lru_cache(maxsize=1)
+def _configured_rules() -> tuple[Rule, ...]:
+    return load_rules(settings.ANALYSIS_RULES_FILE)
+
+
+def get_ruleset() -> RuleSet:
+    """Reglas configuradas (ANALYSIS_RULES_FILE o las default), ya compiladas."""
+    return compile_rules(_configured_rules())
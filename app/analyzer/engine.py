@@ -0,0 +1,252 @@
+# app/analyzer/engine.py
+# Motor de reglas de una sola pasada, estilo Aho-Corasick + verificación.
+#
+# Al compilar, cada regla aporta uno o más "anchors": texto literal que aparece sí o sí
+# en cualquier match (el literal mismo, o el tramo literal más largo de su regex).
+# Todos los anchors se juntan en UN regex con forma de trie que recorre el texto
+# (en minúsculas) una sola vez; su costo casi no depende de la cantidad de reglas.
+# Cada aparición de un anchor acredita a sus reglas:
+#   - literal sin mayúsculas/minúsculas: hit directo;
+#   - literal case-sensitive: se compara contra el texto original;
+#   - regex: se verifica la regla sólo en esa línea (una vez por línea y regla).
+# Las reglas regex sin anchor usable (p.ej. r"\S+@\S+") caen a una pasada propia.
+#
+# Limitaciones: los patrones no cruzan líneas, y si dos anchors se solapan
+# parcialmente ("abc" y "cde" en "abcde") el segundo no se ve. Un anchor contenido
+# en otro ("password" dentro de "failed password") sí se acredita.
+import hashlib
+import re
+from functools import lru_cache
+from typing import Iterable, Optional
+
+try:
+    import re._parser as sre_parse  # Python >= 3.11
+except ImportError:  # pragma: no cover
+    import sre_parse
+
+from .rules import SEVERITIES, Rule
+
+ENGINE_VERSION = "rules/1"
+MIN_ANCHOR = 2
+
+_LITERAL = sre_parse.LITERAL
+_BRANCH = sre_parse.BRANCH
+_SUBPATTERN = sre_parse.SUBPATTERN
+_REPEATS = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT)
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+
+def _trie_regex(words: Iterable[str]) -> str:
+    """Regex con forma de trie para un conjunto de literales (evita probar N alternativas)."""
+    trie: dict = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node: dict) -> str:
+        end = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if end:
+            body = "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+def _anchors(seq) -> Optional[list[str]]:
+    """Literales (en minúsculas) tales que todo match contiene al menos uno, o None."""
+    items = list(seq)
+    if len(items) == 1 and items[0][0] is _BRANCH:
+        out = []
+        for branch in items[0][1][1]:
+            sub = _anchors(branch)
+            if sub is None:
+                return None
+            out.extend(sub)
+        return out
+
+    candidates: list[list[str]] = []
+    run: list[str] = []
+
+    def flush():
+        if run:
+            candidates.append(["".join(run)])
+            run.clear()
+
+    for op, av in items:
+        if op is _LITERAL:
+            run.append(chr(av))
+            continue
+        flush()
+        if op is _SUBPATTERN:
+            sub = _anchors(av[-1])
+        elif op in _REPEATS and av[0] >= 1:
+            sub = _anchors(av[2])
+        else:
+            sub = None
+        if sub:
+            candidates.append(sub)
+    flush()
+
+    best = max(candidates, key=lambda c: min(len(a) for a in c), default=None)
+    if best is None or min(len(a) for a in best) < MIN_ANCHOR:
+        return None
+    return [a.lower() for a in best]
+
+
+class Scan:
+    """Acumulador incremental: feed() con trozos alineados a línea, result() al final."""
+
+    def __init__(self, ruleset: "RuleSet"):
+        self.rs = ruleset
+        self.offset = 0
+        self.lines = 0
+        self.counts = [0] * len(ruleset.rules)
+        self.first = [-1] * len(ruleset.rules)
+
+    def _line(self, text: str, start: int, end: int) -> tuple[int, int]:
+        ls = text.rfind("\n", 0, start) + 1
+        le = text.find("\n", end)
+        return ls, (le if le != -1 else len(text))
+
+    def _hit(self, idx: int, pos: int):
+        if self.counts[idx] == 0:
+            self.first[idx] = self.offset + pos
+        self.counts[idx] += 1
+
+    def _verify_regex(self, idx: int, text: str, ls: int, le: int):
+        pred = self.rs.unless[idx]
+        if pred is not None and pred.search(text, ls, le):
+            return
+        for m in self.rs.compiled[idx].finditer(text, ls, le):
+            self._hit(idx, m.start())
+
+    def feed(self, text: str) -> "Scan":
+        rs = self.rs
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # Algunos caracteres Unicode cambian de largo al pasar a minúsculas: para no
+            # desalinear offsets, sólo se bajan las letras ASCII.
+            lowered = text.translate(_ASCII_LOWER)
+
+        credits, kind, unless, patterns = rs.credits, rs.kind, rs.unless, rs.patterns
+        # Fin de la última línea ya verificada por regla: los hits que caen antes se saltean
+        # sin volver a buscar los bordes de la línea (si no, es cuadrático en líneas largas)
+        last_end = {}  # regla regex -> fin de línea
+        unless_line = {}  # regla literal con unless -> (fin de línea, el unless matcheó)
+        for m in rs.trie.finditer(lowered):
+            base = m.start()
+            for off, idx in credits[m.group()]:
+                pos = base + off
+                k = kind[idx]
+                if k == "regex":
+                    if pos <= last_end.get(idx, -1):
+                        continue
+                    ls, le = self._line(text, pos, pos)
+                    last_end[idx] = le
+                    self._verify_regex(idx, text, ls, le)
+                    continue
+                if k == "literal_cs" and not text.startswith(patterns[idx], pos):
+                    continue
+                pred = unless[idx]
+                if pred is not None:
+                    cached = unless_line.get(idx)
+                    if cached is None or pos > cached[0]:
+                        ls, le = self._line(text, pos, pos)
+                        cached = unless_line[idx] = (le, pred.search(text, ls, le) is not None)
+                    if cached[1]:
+                        continue
+                self._hit(idx, pos)
+
+        for idx in rs.unanchored:
+            pred = unless[idx]
+            for m in rs.compiled[idx].finditer(text):
+                if pred is not None:
+                    ls, le = self._line(text, m.start(), m.end())
+                    if pred.search(text, ls, le):
+                        continue
+                self._hit(idx, m.start())
+
+        self.offset += len(text)
+        self.lines += text.count("\n")
+        return self
+
+    def result(self) -> dict:
+        rs = self.rs
+        hits = {}
+        top = -1
+        for idx, n in enumerate(self.counts):
+            if not n:
+                continue
+            rule = rs.rules[idx]
+            hits[rule.id] = {"count": n, "severity": rule.severity, "first_offset": self.first[idx]}
+            top = max(top, SEVERITIES.index(rule.severity))
+        return {
+            "engine": ENGINE_VERSION,
+            "ruleset": rs.digest,
+            "chars": self.offset,
+            "lines": self.lines + (1 if self.offset else 0),
+            "total_hits": sum(self.counts),
+            "max_severity": SEVERITIES[top] if top >= 0 else None,
+            "hits": hits,
+        }
+
+
+class RuleSet:
+    def __init__(self, rules: tuple[Rule, ...]):
+        self.rules = rules
+        self.digest = hashlib.sha256(repr(rules).encode()).hexdigest()[:16]
+        self.kind: list[str] = []
+        self.patterns = [r.pattern for r in rules]
+        self.compiled: list[Optional[re.Pattern]] = []
+        self.unless = [re.compile(r.unless) if r.unless else None for r in rules]
+        self.unanchored: list[int] = []
+
+        anchor_rules: dict[str, list[int]] = {}
+        for idx, r in enumerate(rules):
+            if r.literal:
+                self.kind.append("literal_ci" if r.ignore_case else "literal_cs")
+                self.compiled.append(None)
+                anchors = [r.pattern.lower()]
+            else:
+                self.kind.append("regex")
+                self.compiled.append(re.compile(r.pattern, re.IGNORECASE if r.ignore_case else 0))
+                anchors = _anchors(sre_parse.parse(r.pattern))
+                if not anchors:
+                    self.unanchored.append(idx)
+                    continue
+            for a in set(anchors):
+                anchor_rules.setdefault(a, []).append(idx)
+
+        words = sorted(anchor_rules)
+        self.trie = re.compile(_trie_regex(words)) if words else re.compile(r"(?!)")
+        # Para cada anchor: (offset, regla) de todos los anchors contenidos en él (incluido él mismo)
+        overlapping = re.compile("(?=(" + _trie_regex(words) + "))") if words else None
+        self.credits: dict[str, list[tuple[int, int]]] = {}
+        for a in words:
+            found = set()
+            for m in overlapping.finditer(a):
+                inner = m.group(1)
+                found.add((m.start(), inner))
+                # Prefijos del anchor más largo en esa posición (el trie es greedy)
+                for k in range(1, len(inner)):
+                    if inner[:k] in anchor_rules:
+                        found.add((m.start(), inner[:k]))
+            self.credits[a] = [(off, idx) for off, w in sorted(found) for idx in anchor_rules[w]]
+
+    def scanner(self) -> Scan:
+        return Scan(self)
+
+    def scan(self, text: str) -> dict:
+        return Scan(self).feed(text).result()
+
+
+@lru_cache(maxsize=16)
+def compile_rules(rules: tuple[Rule, ...]) -> RuleSet:
+    """RuleSet compilado y cacheado: se reusa entre requests mientras no cambien las reglas."""
+    return RuleSet(rules)
@@ -0,0 +1,60 @@
+# app/analyzer/rules.py
+# Definición de reglas de detección y carga desde ANALYSIS_RULES_FILE (JSON).
+import json
+from dataclasses import dataclass
+from typing import Optional
+
+SEVERITIES = ("info", "low", "medium", "high", "critical")
+
+
+@dataclass(frozen=True)
+class Rule:
+    id: str
+    pattern: str
+    severity: str = "medium"
+    literal: bool = False        # True: pattern es texto literal (va al trie, mucho más rápido)
+    ignore_case: bool = True
+    unless: Optional[str] = None  # predicado: se descarta el hit si la línea matchea este regex
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Rule":
+        severity = d.get("severity", "medium")
+        if severity not in SEVERITIES:
+            raise ValueError(f"regla {d.get('id')!r}: severidad inválida {severity!r}")
+        return cls(
+            id=str(d["id"]),
+            pattern=d["pattern"],
+            severity=severity,
+            literal=bool(d.get("literal", False)),
+            ignore_case=bool(d.get("ignore_case", True)),
+            unless=d.get("unless"),
+        )
+
+
+DEFAULT_RULES: tuple[Rule, ...] = (
+    Rule("error", "error", "medium", literal=True),
+    Rule("critical", "critical", "high", literal=True),
+    Rule("fatal", "fatal", "high", literal=True),
+    Rule("panic", "kernel panic", "critical", literal=True),
+    Rule("oom", r"out of memory|oom-killer|OutOfMemoryError", "critical"),
+    Rule("traceback", "Traceback (most recent call last)", "medium", literal=True, ignore_case=False),
+    Rule("segfault", r"segfault|segmentation fault", "high"),
+    Rule("ssh_failed_password", r"Failed password for (?:invalid user )?\S+", "high"),
+    Rule("ssh_invalid_user", r"Invalid user \S+ from", "medium"),
+    Rule("sudo_auth_failure", r"sudo: .*authentication failure", "high"),
+    Rule("http_5xx", r'" 5\d\d \d+', "medium"),
+    Rule("http_401_403", r'" 40[13] \d+', "low"),
+    Rule("sql_injection", r"(?:union\s+select|or\s+1\s*=\s*1|';\s*drop\s+table)", "critical"),
+    Rule("path_traversal", r"\.\./\.\./", "high"),
+    Rule("timeout", r"timed? ?out", "low", unless=r"(?i)retry(?:ing)? succeeded"),
+    Rule("connection_refused", "connection refused", "medium", literal=True),
+    Rule("disk_full", r"no space left on device", "critical"),
+    Rule("warning", "warn", "info", literal=True),
+)
+
+
+def load_rules(path: Optional[str]) -> tuple[Rule, ...]:
+    if not path:
+        return DEFAULT_RULES
+    with open(path, encoding="utf-8") as f:
+        return tuple(Rule.from_dict(d) for d in json.load(f))
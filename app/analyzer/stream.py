@@ -0,0 +1,253 @@
+# app/analyzer/stream.py
+# Análisis en streaming para POST /analysis/upload: bytes -> descompresión -> texto
+# alineado a líneas -> Scan.feed. Cada etapa es un generador que sólo retiene un
+# trozo acotado, así que la memoria no depende del tamaño del archivo subido.
+import codecs
+import zlib
+from typing import Iterator, Optional
+
+from ..config import settings
+from . import get_ruleset
+
+try:  # python-multipart >= 0.0.13
+    from python_multipart.exceptions import MultipartParseError
+    from python_multipart.multipart import MultipartParser, MultipartState, parse_options_header
+except ImportError:  # pragma: no cover
+    from multipart.exceptions import MultipartParseError
+    from multipart.multipart import MultipartParser, MultipartState, parse_options_header
+
+try:  # zstd es opcional: sin `zstandard` instalado se responde 415
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+SUMMARY_CHARS = 280
+OUT_PIECE = 256 * 1024   # tope de bytes descomprimidos por paso (frena zip bombs)
+ZSTD_IN_PIECE = 16 * 1024
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class UnsupportedEncoding(Exception):
+    """Content-Encoding desconocido o zstd sin la librería instalada."""
+
+
+class TooLarge(Exception):
+    """El contenido descomprimido supera ANALYSIS_UPLOAD_MAX_BYTES."""
+
+
+class CorruptInput(Exception):
+    """El stream comprimido (o el multipart) está dañado o incompleto."""
+
+
+def _gzip_pieces(data: bytes, state: dict) -> Iterator[bytes]:
+    d = state.get("d") or state.setdefault("d", zlib.decompressobj(wbits=47))  # gzip o zlib
+    while data:
+        try:
+            out = d.decompress(data, OUT_PIECE)
+        except zlib.error as e:
+            raise CorruptInput(str(e))
+        if out:
+            yield out
+        if d.eof:
+            # gzip multi-miembro (p.ej. archivos concatenados): arranca un descompresor nuevo
+            data = d.unused_data
+            d = state["d"] = zlib.decompressobj(wbits=47) if data else d
+        else:
+            data = d.unconsumed_tail
+
+
+def _zstd_pieces(data: bytes, state: dict) -> Iterator[bytes]:
+    d = state.get("d") or state.setdefault("d", zstandard.ZstdDecompressor().decompressobj())
+    # zstandard no acepta max_length: se le pasa la entrada en trozos chicos
+    for i in range(0, len(data), ZSTD_IN_PIECE):
+        try:
+            out = d.decompress(data[i:i + ZSTD_IN_PIECE])
+        except zstandard.ZstdError as e:
+            raise CorruptInput(str(e))
+        if out:
+            yield out
+
+
+class UploadAnalysis:
+    """Acumulador: write(bytes) las veces que haga falta y close() -> (input_summary, result).
+
+    encoding: "gzip", "zstd", "identity" o None (se detecta por los magic bytes).
+    """
+
+    def __init__(self, encoding: Optional[str] = None):
+        if encoding not in (None, "identity", "gzip", "x-gzip", "zstd"):
+            raise UnsupportedEncoding(encoding)
+        if encoding == "zstd" and zstandard is None:
+            raise UnsupportedEncoding("zstd (instalar `zstandard`)")
+        self.encoding = "gzip" if encoding == "x-gzip" else encoding
+        self.scan = get_ruleset().scanner()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.summary = ""
+        self._state: dict = {}
+        self._head = b""  # primeros bytes, mientras se detecta la compresión
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._partial = ""  # última línea incompleta
+        self._pending: list[str] = []
+        self._pending_chars = 0
+
+    # -- etapa 1: descompresión --
+    def _decompressed(self, data: bytes) -> Iterator[bytes]:
+        if self.encoding is None:
+            self._head += data
+            if len(self._head) < 4:
+                return
+            data, self._head = self._head, b""
+            if data.startswith(GZIP_MAGIC):
+                self.encoding = "gzip"
+            elif data.startswith(ZSTD_MAGIC):
+                if zstandard is None:
+                    raise UnsupportedEncoding("zstd (instalar `zstandard`)")
+                self.encoding = "zstd"
+            else:
+                self.encoding = "identity"
+        if self.encoding == "gzip":
+            yield from _gzip_pieces(data, self._state)
+        elif self.encoding == "zstd":
+            yield from _zstd_pieces(data, self._state)
+        elif data:
+            yield data
+
+    # -- etapa 2: texto alineado a líneas --
+    def _lines(self, pieces: Iterator[bytes], final: bool = False) -> Iterator[str]:
+        for raw in pieces:
+            self.bytes_out += len(raw)
+            if self.bytes_out > settings.ANALYSIS_UPLOAD_MAX_BYTES:
+                raise TooLarge()
+            text = self._partial + self._decoder.decode(raw)
+            cut = text.rfind("\n") + 1
+            if cut == 0 and len(text) < settings.ANALYSIS_UPLOAD_CHUNK_CHARS:
+                self._partial = text
+                continue
+            if cut == 0:
+                # Línea gigante sin salto: se corta igual para no crecer sin límite
+                cut = len(text)
+            self._partial = text[cut:]
+            yield text[:cut]
+        if final:
+            rest = self._partial + self._decoder.decode(b"", final=True)
+            self._partial = ""
+            if rest:
+                yield rest
+
+    # -- etapa 3: scan por trozos de ~ANALYSIS_UPLOAD_CHUNK_CHARS --
+    def _consume(self, texts: Iterator[str], final: bool = False):
+        for text in texts:
+            if len(self.summary) < SUMMARY_CHARS:
+                self.summary += text[:SUMMARY_CHARS - len(self.summary)]
+            self._pending.append(text)
+            self._pending_chars += len(text)
+            if self._pending_chars >= settings.ANALYSIS_UPLOAD_CHUNK_CHARS:
+                self._flush()
+        if final:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            self.scan.feed("".join(self._pending))
+            self._pending, self._pending_chars = [], 0
+
+    def write(self, data: bytes):
+        self.bytes_in += len(data)
+        self._consume(self._lines(self._decompressed(data)))
+
+    def close(self, title: str) -> tuple[str, dict]:
+        tail: Iterator[bytes] = iter(())
+        if self.encoding is None:
+            # Menos de 4 bytes en total: no alcanza para detectar, va como texto
+            self.encoding, tail, self._head = "identity", iter([self._head]), b""
+        self._consume(self._lines(tail, final=True), final=True)
+        d = self._state.get("d")
+        if self.bytes_in and self.encoding in ("gzip", "zstd") and not (d and getattr(d, "eof", True)):
+            raise CorruptInput("stream comprimido incompleto")
+        result = {"summary_length": len(self.summary), "title_length": len(title)}
+        result.update(self.scan.result())
+        return self.summary, result
+
+
+class MultipartUpload:
+    """Parser multipart/form-data en streaming: el campo de archivo va directo a un
+    UploadAnalysis (sin spool a disco como request.form()); los demás campos se guardan
+    acotados en `fields`."""
+
+    FIELD_MAX = 1024
+
+    def __init__(self, content_type: str, file_field: str = "file"):
+        _ctype, params = parse_options_header(content_type)
+        boundary = params.get(b"boundary")
+        if not boundary:
+            raise CorruptInput("multipart sin boundary")
+        self.file_field = file_field
+        self.fields: dict[str, str] = {}
+        self.filename: Optional[str] = None
+        self.upload: Optional[UploadAnalysis] = None
+        self._headers: dict[bytes, bytes] = {}
+        self._hname = b""
+        self._hvalue = b""
+        self._name: Optional[str] = None
+        self._buf = b""
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def _on_part_begin(self):
+        self._headers, self._name, self._buf = {}, None, b""
+
+    def _on_header_field(self, data, start, end):
+        self._hname += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self._hvalue += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._hname.lower()] = self._hvalue
+        self._hname = self._hvalue = b""
+
+    def _on_headers_finished(self):
+        _disp, params = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._name = params.get(b"name", b"").decode("utf-8", "replace")
+        if self._name == self.file_field and self.upload is None:
+            self.filename = params.get(b"filename", b"").decode("utf-8", "replace") or None
+            # latin-1 no falla con bytes arbitrarios: un valor raro termina en UnsupportedEncoding
+            enc = self._headers.get(b"content-encoding", b"").decode("latin-1").strip().lower() or None
+            self.upload = UploadAnalysis(enc)
+        elif self._name == self.file_field:
+            self._name = None  # sólo se analiza el primer archivo
+
+    def _on_part_data(self, data, start, end):
+        if self._name == self.file_field:
+            self.upload.write(data[start:end])
+        elif self._name and len(self._buf) < self.FIELD_MAX:
+            self._buf += data[start:end][:self.FIELD_MAX - len(self._buf)]
+
+    def _on_part_end(self):
+        if self._name and self._name != self.file_field:
+            self.fields[self._name] = self._buf.decode("utf-8", "replace")
+
+    def write(self, data: bytes):
+        try:
+            self._parser.write(data)
+        except MultipartParseError as e:
+            raise CorruptInput(f"multipart inválido: {e}")
+
+    def close(self):
+        try:
+            self._parser.finalize()
+        except MultipartParseError as e:
+            raise CorruptInput(f"multipart inválido: {e}")
+        # finalize() no verifica que el body haya llegado hasta el boundary de cierre
+        if self._parser.state != MultipartState.END:
+            raise CorruptInput("multipart incompleto")
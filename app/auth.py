@@ -2,13 +2,12 @@
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from jose import JWTError, jwt
 
-from .database import get_db
-from .models import User
-from .utils.security import ALGORITHM, decode_access_token, get_token_from_cookie
-from .config import settings
+from .database import get_read_db, get_async_read_db
+from .models import User, normalize_email
+from .utils.security import get_token_from_cookie
+from .utils import principal_cache
+from .utils.principal_cache import UserSnapshot
 
 # IMPORTANTE: no dispares 401 automático si falta el Authorization
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
@@ -21,38 +20,44 @@ def _cred_exc():
     )
 
 def _find_user_by_email(db: Session, email: str) -> User | None:
-    if not email:
+    email_norm = normalize_email(email)
+    if not email_norm:
         return None
-    return (
-        db.query(User)
-        .filter(func.lower(User.email) == email.strip().lower())
-        .first()
-    )
+    return db.query(User).filter(User.email_norm == email_norm).first()
+
+def load_principal(db: Session, sub: str | None) -> UserSnapshot | None:
+    """Resuelve el subject del token a un snapshot del usuario (cacheado)."""
+    if not sub:
+        return None
+    snap = principal_cache.get_user(sub)
+    if snap:
+        return snap
+    user = _find_user_by_email(db, sub)
+    if not user:
+        return None
+    return principal_cache.put_user(sub, user)
+
+def _principal_from_token(db: Session, token: str) -> UserSnapshot | None:
+    payload = principal_cache.decode_token(token)
+    return load_principal(db, payload.get("sub") if payload else None)
 
 def get_current_user(
     request: Request,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     token: str | None = Depends(oauth2_scheme),
-) -> User:
+) -> UserSnapshot:
     # 1) Cookie JWT
     cookie_token = get_token_from_cookie(request)
     if cookie_token:
-        payload = decode_access_token(cookie_token)
-        sub = payload.get("sub") if payload else None
-        user = _find_user_by_email(db, sub or "")
+        user = _principal_from_token(db, cookie_token)
         if user:
             return user
 
     # 2) Authorization: Bearer <token>
     if token:
-        try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
-            sub = payload.get("sub")
-            user = _find_user_by_email(db, sub or "")
-            if user:
-                return user
-        except JWTError:
-            pass
+        user = _principal_from_token(db, token)
+        if user:
+            return user
 
     # Si ninguna via autenticó:
     raise _cred_exc()
@@ -60,10 +65,29 @@ def get_current_user(
 # Útil para endpoints "opcionales" (no obligan a estar logueado)
 def get_current_user_optional(
     request: Request,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     token: str | None = Depends(oauth2_scheme),
-) -> User | None:
+) -> UserSnapshot | None:
     try:
         return get_current_user(request, db, token)
     except HTTPException:
         return None
+
+# ---------------- Variante async (ASYNC_DB) ----------------
+async def get_current_user_async(
+    request: Request,
+    db=Depends(get_async_read_db),
+    token: str | None = Depends(oauth2_scheme),
+) -> UserSnapshot:
+    for candidate in (get_token_from_cookie(request), token):
+        if not candidate:
+            continue
+        payload = principal_cache.decode_token(candidate)
+        sub = payload.get("sub") if payload else None
+        if not sub:
+            continue
+        # Hit de cache: sin tocar la DB
+        user = principal_cache.get_user(sub) or await db.run_sync(load_principal, sub)
+        if user:
+            return user
+    raise _cred_exc()
@@ -1,4 +1,5 @@
 # app/billing/base.py
+import asyncio
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 
@@ -28,3 +29,7 @@ class InvoiceResponse:
 class BillingProvider(ABC):
     @abstractmethod
     def create_invoice(self, data: InvoiceRequest) -> InvoiceResponse: ...
+
+    async def acreate_invoice(self, data: InvoiceRequest, client=None) -> InvoiceResponse:
+        # Por defecto corre la versión sync en un thread; los providers HTTP la pisan
+        return await asyncio.to_thread(self.create_invoice, data)
@@ -0,0 +1,91 @@
+# app/billing/dedup.py
+# Idempotencia por payment ID de Mercado Pago (MP reenvía notificaciones sin parar).
+# Capa caliente: LRU en memoria con las facturas ya emitidas.
+# Capa durable: billing_outbox, con payment_id UNIQUE y el CAE/número/pdf_url guardados.
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models import BillingOutbox
+from . import outbox
+
+_lock = threading.Lock()
+_done: "OrderedDict[str, dict]" = OrderedDict()
+_stats = {"memory_hits": 0, "db_hits": 0, "misses": 0}
+
+
+def _invoice_dict(cae, pdf_url, number) -> dict:
+    return {"cae": cae, "pdf": pdf_url, "n": number}
+
+
+def remember(payment_id: str | None, invoice: dict) -> None:
+    if not payment_id:
+        return
+    with _lock:
+        _done[payment_id] = invoice
+        _done.move_to_end(payment_id)
+        while len(_done) > settings.BILLING_DEDUP_CACHE_SIZE:
+            _done.popitem(last=False)
+
+
+def lookup(payment_id: str | None) -> dict | None:
+    """Factura ya emitida para este pago, sólo desde memoria (sin tocar la DB)."""
+    if not payment_id:
+        return None
+    with _lock:
+        inv = _done.get(payment_id)
+        if inv is not None:
+            _done.move_to_end(payment_id)
+            _stats["memory_hits"] += 1
+        return inv
+
+
+def enqueue_once(mp_payment: dict) -> dict:
+    """Encola el pago si es nuevo; si ya existe devuelve su estado sin duplicar la fila."""
+    pid = outbox.payment_id_of(mp_payment)
+    if pid:
+        existing = _existing(pid)
+        if existing:
+            return existing
+    try:
+        row_id = outbox.enqueue(mp_payment)
+    except IntegrityError:
+        # Carrera con otra entrega del mismo pago: ganó la otra
+        existing = _existing(pid)
+        if existing:
+            return existing
+        raise
+    with _lock:
+        _stats["misses"] += 1
+    return {"id": row_id, "status": "pending", "duplicate": False}
+
+
+def _existing(payment_id: str) -> dict | None:
+    with SessionLocal() as db:
+        row = db.execute(
+            select(BillingOutbox.id, BillingOutbox.status, BillingOutbox.cae, BillingOutbox.pdf_url, BillingOutbox.number)
+            .where(BillingOutbox.payment_id == payment_id)
+        ).first()
+    if not row:
+        return None
+    with _lock:
+        _stats["db_hits"] += 1
+    out = {"id": row.id, "status": row.status, "duplicate": True}
+    if row.status == "failed":
+        # Una reentrega de MP sirve como reintento manual
+        outbox.requeue(row.id)
+        out["status"] = "pending"
+    elif row.status == "done":
+        inv = _invoice_dict(row.cae, row.pdf_url, row.number)
+        remember(payment_id, inv)
+        out.update(inv)
+    return out
+
+
+def stats() -> dict:
+    with _lock:
+        return {"cached": len(_done), **_stats}
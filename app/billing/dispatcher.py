@@ -0,0 +1,101 @@
+# app/billing/dispatcher.py
+# Drena billing_outbox en background: cliente HTTP async con pool de conexiones,
+# concurrencia acotada y reintentos con backoff exponencial (ver outbox.mark_retry).
+import asyncio
+import logging
+
+import httpx
+
+from ..config import settings
+from . import dedup, outbox
+from .service import acreate_invoice_for_payment
+
+log = logging.getLogger(__name__)
+
+
+class OutboxDispatcher:
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+        self._wake: asyncio.Event | None = None
+        self._sem: asyncio.Semaphore | None = None
+        self._client: httpx.AsyncClient | None = None
+        self.stats = {"sent": 0, "retried": 0, "failed": 0, "inflight": 0}
+
+    async def start(self):
+        if self._task:
+            return
+        self._wake = asyncio.Event()
+        self._sem = asyncio.Semaphore(settings.BILLING_CONCURRENCY)
+        self._client = httpx.AsyncClient(
+            timeout=settings.BILLING_HTTP_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=settings.BILLING_CONCURRENCY),
+        )
+        self._task = asyncio.create_task(self._loop(), name="billing-outbox")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    def wake(self):
+        """Avisar que hay filas nuevas (el webhook lo llama después de encolar)."""
+        if self._wake:
+            self._wake.set()
+
+    async def run_once(self) -> int:
+        rows = await asyncio.to_thread(outbox.claim_due, settings.BILLING_CONCURRENCY * 4)
+        await asyncio.gather(*(self._dispatch(*r) for r in rows))
+        return len(rows)
+
+    async def _loop(self):
+        while True:
+            try:
+                n = await self.run_once()
+            except Exception:
+                log.exception("billing outbox: error drenando la cola")
+                n = 0
+            if n == 0:
+                # Dormir hasta el próximo reintento programado (o hasta que llegue un webhook)
+                timeout = settings.BILLING_POLL_SECONDS
+                try:
+                    due_in = await asyncio.to_thread(outbox.seconds_until_next_due)
+                except Exception:
+                    due_in = None
+                if due_in is not None:
+                    timeout = min(timeout, max(due_in, 0.05))
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+
+    async def _dispatch(self, row_id: int, payment: dict, attempts: int):
+        async with self._sem:
+            self.stats["inflight"] += 1
+            try:
+                invoice = await acreate_invoice_for_payment(payment, self._client)
+                error = None if invoice.ok else f"provider error: {invoice.raw}"
+            except Exception as e:
+                invoice, error = None, repr(e)
+            finally:
+                self.stats["inflight"] -= 1
+
+        attempts += 1
+        if error is None:
+            await asyncio.to_thread(outbox.mark_done, row_id, attempts, invoice)
+            dedup.remember(outbox.payment_id_of(payment), {"cae": invoice.cae, "pdf": invoice.pdf_url, "n": invoice.number})
+            self.stats["sent"] += 1
+            return
+        status = await asyncio.to_thread(outbox.mark_retry, row_id, attempts, error)
+        self.stats["failed" if status == "failed" else "retried"] += 1
+        log.warning("billing outbox: fila %s intento %s -> %s (%s)", row_id, attempts, status, error)
+
+
+dispatcher = OutboxDispatcher()
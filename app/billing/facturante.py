@@ -1,16 +1,17 @@
 # app/billing/facturante.py
-import os, requests
+import os, requests, time
 from .base import BillingProvider, InvoiceRequest, InvoiceResponse
+from ..utils import metrics
 
-FACT_API = "https://api.facturante.com/..."
+FACT_API = os.getenv("FACT_API_URL", "https://api.facturante.com/...")
 FACT_API_KEY = os.getenv("FACT_API_KEY")
 FACT_CUIT = os.getenv("FACT_CUIT")
 FACT_PTO_VTA = os.getenv("FACT_PTO_VTA")
 
 class FacturanteProvider(BillingProvider):
-    def create_invoice(self, data: InvoiceRequest) -> InvoiceResponse:
+    def _payload(self, data: InvoiceRequest) -> dict:
         # Mapeo simple a Facturante (Factura C para Monotributo)
-        payload = {
+        return {
             "cuit": FACT_CUIT,
             "ptoVta": int(FACT_PTO_VTA),
             "tipoCmp": 11,               # 11 = Factura C
@@ -26,9 +27,13 @@ class FacturanteProvider(BillingProvider):
             ],
             "cliente": {"email": data.customer_email, "nombre": data.customer_name},
         }
-        r = requests.post(FACT_API, json=payload, headers={"Authorization": f"Bearer {FACT_API_KEY}"}, timeout=20)
-        if r.ok:
-            j = r.json()
+
+    def _headers(self) -> dict:
+        return {"Authorization": f"Bearer {FACT_API_KEY}"}
+
+    def _response(self, ok: bool, status_code: int, body: dict | None, text: str) -> InvoiceResponse:
+        if ok:
+            j = body or {}
             return InvoiceResponse(
                 ok=True,
                 cae=j.get("cae"),
@@ -36,4 +41,25 @@ class FacturanteProvider(BillingProvider):
                 number=str(j.get("cbteNro")),
                 raw=j
             )
-        return InvoiceResponse(ok=False, cae=None, pdf_url=None, number=None, raw={"status": r.status_code, "text": r.text})
+        return InvoiceResponse(ok=False, cae=None, pdf_url=None, number=None, raw={"status": status_code, "text": text})
+
+    def create_invoice(self, data: InvoiceRequest) -> InvoiceResponse:
+        t0 = time.perf_counter()
+        outcome = "error"
+        try:
+            r = requests.post(FACT_API, json=self._payload(data), headers=self._headers(), timeout=20)
+            outcome = "ok" if r.ok else "rejected"
+            return self._response(r.ok, r.status_code, r.json() if r.ok else None, r.text)
+        finally:
+            metrics.facturante_calls.observe(time.perf_counter() - t0, outcome)
+
+    async def acreate_invoice(self, data: InvoiceRequest, client=None) -> InvoiceResponse:
+        # client: httpx.AsyncClient compartido (pool de conexiones del dispatcher)
+        t0 = time.perf_counter()
+        outcome = "error"
+        try:
+            r = await client.post(FACT_API, json=self._payload(data), headers=self._headers())
+            outcome = "ok" if r.is_success else "rejected"
+            return self._response(r.is_success, r.status_code, r.json() if r.is_success else None, r.text)
+        finally:
+            metrics.facturante_calls.observe(time.perf_counter() - t0, outcome)
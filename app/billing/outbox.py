@@ -0,0 +1,127 @@
+# app/billing/outbox.py
+# Operaciones sobre billing_outbox. Todas son sync (SQLAlchemy); el dispatcher las
+# llama con asyncio.to_thread y el webhook con run_in_threadpool.
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import or_, select, update
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models import BillingOutbox
+from .base import InvoiceResponse
+
+
+def _now() -> datetime:
+    # Naive UTC, mismo formato que guarda SQLAlchemy al bindear datetimes
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def payment_id_of(mp_payment: dict) -> str | None:
+    pid = (mp_payment.get("data") or {}).get("id") or mp_payment.get("id")
+    return str(pid) if pid is not None else None
+
+
+def enqueue(mp_payment: dict) -> int:
+    with SessionLocal() as db:
+        row = BillingOutbox(
+            payment_id=payment_id_of(mp_payment),
+            payload=json.dumps(mp_payment),
+            status="pending",
+            attempts=0,
+            next_attempt_at=_now(),
+        )
+        db.add(row); db.commit()
+        return row.id
+
+
+def requeue(row_id: int) -> None:
+    """Vuelve a poner en cola una fila "failed" (p.ej. cuando MP reenvía el pago)."""
+    with SessionLocal() as db:
+        db.execute(
+            update(BillingOutbox)
+            .where(BillingOutbox.id == row_id, BillingOutbox.status == "failed")
+            .values(status="pending", attempts=0, next_attempt_at=_now())
+        )
+        db.commit()
+
+
+def claim_due(limit: int) -> list[tuple[int, dict, int]]:
+    """Toma filas vencidas y las marca "sending" con un lease; si el proceso muere, vuelven a vencer."""
+    now = _now()
+    lease_until = now + timedelta(seconds=settings.BILLING_LEASE_SECONDS)
+    claimed = []
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(BillingOutbox.id, BillingOutbox.payload, BillingOutbox.attempts)
+            .where(
+                BillingOutbox.status.in_(("pending", "sending")),
+                BillingOutbox.next_attempt_at <= now,
+            )
+            .order_by(BillingOutbox.next_attempt_at)
+            .limit(limit)
+        ).all()
+        for row_id, payload, attempts in rows:
+            # UPDATE condicional: si otro worker la tomó primero, rowcount == 0
+            res = db.execute(
+                update(BillingOutbox)
+                .where(
+                    BillingOutbox.id == row_id,
+                    BillingOutbox.attempts == attempts,
+                    or_(BillingOutbox.status == "pending", BillingOutbox.status == "sending"),
+                    BillingOutbox.next_attempt_at <= now,
+                )
+                .values(status="sending", next_attempt_at=lease_until)
+            )
+            if res.rowcount:
+                claimed.append((row_id, json.loads(payload), attempts))
+        db.commit()
+    return claimed
+
+
+def seconds_until_next_due() -> float | None:
+    with SessionLocal() as db:
+        nxt = db.execute(
+            select(BillingOutbox.next_attempt_at)
+            .where(BillingOutbox.status.in_(("pending", "sending")))
+            .order_by(BillingOutbox.next_attempt_at)
+            .limit(1)
+        ).scalar()
+    if nxt is None:
+        return None
+    return max((nxt.replace(tzinfo=None) - _now()).total_seconds(), 0.0)
+
+
+def mark_done(row_id: int, attempts: int, invoice: InvoiceResponse) -> None:
+    with SessionLocal() as db:
+        db.execute(
+            update(BillingOutbox)
+            .where(BillingOutbox.id == row_id)
+            .values(
+                status="done", attempts=attempts, last_error=None,
+                cae=invoice.cae, pdf_url=invoice.pdf_url, number=invoice.number,
+            )
+        )
+        db.commit()
+
+
+def backoff_seconds(attempts: int) -> float:
+    # Exponencial con jitter: base * 2^(n-1), tope BILLING_BACKOFF_MAX_SECONDS
+    delay = min(settings.BILLING_BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0), settings.BILLING_BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def mark_retry(row_id: int, attempts: int, error: str) -> str:
+    status = "failed" if attempts >= settings.BILLING_MAX_ATTEMPTS else "pending"
+    with SessionLocal() as db:
+        db.execute(
+            update(BillingOutbox)
+            .where(BillingOutbox.id == row_id)
+            .values(
+                status=status, attempts=attempts, last_error=error[:2000],
+                next_attempt_at=_now() + timedelta(seconds=backoff_seconds(attempts)),
+            )
+        )
+        db.commit()
+    return status
@@ -4,7 +4,7 @@ from .facturante import FacturanteProvider
 
 provider = FacturanteProvider()
 
-def create_invoice_for_payment(mp_payment: dict):
+def invoice_request_for_payment(mp_payment: dict) -> InvoiceRequest:
     # Mapear desde Mercado Pago
     email = mp_payment["payer"]["email"]
     name = mp_payment["payer"].get("first_name","") + " " + mp_payment["payer"].get("last_name","")
@@ -14,5 +14,10 @@ def create_invoice_for_payment(mp_payment: dict):
         "title": mp_payment["description"], "unit_price": mp_payment["transaction_amount"], "quantity": 1
     }]]
 
-    req = InvoiceRequest(customer_email=email, customer_name=name.strip(), items=items)
-    return provider.create_invoice(req)
+    return InvoiceRequest(customer_email=email, customer_name=name.strip(), items=items)
+
+def create_invoice_for_payment(mp_payment: dict):
+    return provider.create_invoice(invoice_request_for_payment(mp_payment))
+
+async def acreate_invoice_for_payment(mp_payment: dict, client=None):
+    return await provider.acreate_invoice(invoice_request_for_payment(mp_payment), client)
@@ -0,0 +1,40 @@
+# app/billing/signature.py
+# Firma de las notificaciones de Mercado Pago (header x-signature: "ts=...,v1=...").
+# v1 = HMAC-SHA256 con la clave secreta del webhook sobre el manifest
+# "id:<data.id>;request-id:<x-request-id>;ts:<ts>;" (las partes que falten se omiten).
+import hashlib
+import hmac
+
+
+def _parse(x_signature: str) -> dict:
+    parts = {}
+    for item in (x_signature or "").split(","):
+        key, _, value = item.strip().partition("=")
+        if value:
+            parts[key.strip()] = value.strip()
+    return parts
+
+
+def manifest(data_id: str | None, request_id: str | None, ts: str) -> str:
+    out = ""
+    if data_id:
+        # MP firma los ids alfanuméricos en minúsculas
+        out += f"id:{data_id.lower() if data_id.isalnum() else data_id};"
+    if request_id:
+        out += f"request-id:{request_id};"
+    return out + f"ts:{ts};"
+
+
+def sign(secret: str, data_id: str | None, request_id: str | None, ts: str) -> str:
+    """Valor de x-signature para estos datos (lo usan los benchmarks para simular a MP)."""
+    v1 = hmac.new(secret.encode(), manifest(data_id, request_id, ts).encode(), hashlib.sha256).hexdigest()
+    return f"ts={ts},v1={v1}"
+
+
+def verify(secret: str, x_signature: str | None, request_id: str | None, data_id: str | None) -> bool:
+    parts = _parse(x_signature or "")
+    ts, v1 = parts.get("ts"), parts.get("v1")
+    if not secret or not ts or not v1:
+        return False
+    expected = hmac.new(secret.encode(), manifest(data_id, request_id, ts).encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, v1.lower())
@@ -9,6 +9,110 @@ class Settings(BaseSettings):
     CORS_ORIGINS: Union[str, List[AnyHttpUrl]] = "*"
     COOKIE_DOMAIN: Optional[str] = None  # p.ej. ".alerttrail.com" para compartir con www
 
+    # SQLite: "production" = WAL + pragmas + un escritor y un pool de lectores
+    SQLITE_PROFILE: str = "default"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024
+    SQLITE_READ_POOL_SIZE: int = 8
+
+    # Handlers async con AsyncSession para analysis/auth (el camino sync sigue disponible)
+    ASYNC_DB: bool = False
+
+    # bcrypt: costo y executor dedicado (threads o processes)
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_POOL_MODE: str = "threads"
+    PASSWORD_POOL_WORKERS: int = 4
+    PASSWORD_QUEUE_MAX: int = 64          # hashes en curso + en cola antes de responder 503
+
+    # Facturación: outbox de pagos de Mercado Pago + dispatcher async
+    BILLING_DISPATCHER_ENABLED: bool = True
+    BILLING_CONCURRENCY: int = 4
+    BILLING_MAX_ATTEMPTS: int = 8
+    BILLING_BACKOFF_BASE_SECONDS: float = 5
+    BILLING_BACKOFF_MAX_SECONDS: float = 3600
+    BILLING_LEASE_SECONDS: int = 120      # una fila "sending" vuelve a la cola si nadie la cierra
+    BILLING_POLL_SECONDS: float = 10
+    BILLING_HTTP_TIMEOUT_SECONDS: float = 20
+    BILLING_DEDUP_CACHE_SIZE: int = 10000  # pagos ya facturados que se responden desde memoria
+    MP_WEBHOOK_SECRET: str = ""          # clave secreta del webhook en MP; vacía = /webhooks/mpago rechaza todo
+
+    # Multi-core (python -m app.serve): el padre aplica el esquema y los workers no
+    SCHEMA_ON_STARTUP: bool = True
+    WRITER_SOCKET: Optional[str] = None  # socket Unix del escritor único (app/writer.py)
+
+    # Rate limiting (utils/ratelimit.py): token bucket por usuario/IP y tope de concurrencia por clase
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_RULES: Optional[str] = None  # JSON: [{"name", "routes", "per_minute", "burst", "concurrency"}]
+    RATE_LIMIT_BACKEND: str = "memory"  # memory | sqlite (compartido entre workers)
+    RATE_LIMIT_SQLITE_PATH: str = "./ratelimit.sqlite3"
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+    RATE_LIMIT_TRUST_FORWARDED: bool = False  # usar X-Forwarded-For (detrás del proxy de Render)
+
+    # Métricas (GET /metrics, formato Prometheus)
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: Optional[str] = None  # si se define, /metrics pide "Authorization: Bearer <token>"
+
+    # Arranque en frío
+    WARMUP: str = "off"  # off | startup | background: precarga JWT, bcrypt y reglas
+    STARTUP_PROFILE: bool = False  # imprime las fases del arranque (también en GET /health/startup)
+    LOG_ROUTES: bool = False  # imprime la tabla de rutas al arrancar
+    BILLING_START_DELAY_SECONDS: float = 0  # el dispatcher (y httpx) arrancan después del startup
+
+    # Motor de reglas: JSON con [{"id", "pattern", "severity", "literal", "ignore_case", "unless"}]
+    ANALYSIS_RULES_FILE: Optional[str] = None
+
+    # result_json se comprime con zstd desde este tamaño (0 = nunca; requiere `zstandard`)
+    ANALYSIS_RESULT_ZSTD_MIN_BYTES: int = 2048
+    ANALYSIS_RESULT_ZSTD_LEVEL: int = 3
+
+    # Memo por contenido de POST /analysis (utils/memo.py): LRU en proceso delante de analyses.content_hash
+    ANALYSIS_MEMO_ENABLED: bool = True
+    ANALYSIS_MEMO_MAXSIZE: int = 10000
+
+    # POST /analysis/batch
+    ANALYSIS_BATCH_MAX_ITEMS: int = 10000
+    ANALYSIS_BATCH_CHUNK: int = 500
+
+    # POST /analysis/upload: tope descomprimido y tamaño de cada trozo que pasa por el motor
+    ANALYSIS_UPLOAD_MAX_BYTES: int = 1024 * 1024 * 1024
+    ANALYSIS_UPLOAD_CHUNK_CHARS: int = 1024 * 1024
+
+    # GET condicionales (/auth/me, GET /analysis): cache en proceso de users.data_version.
+    # Con varios workers, otro proceso puede responder 304 con la versión vieja hasta este TTL.
+    USER_VERSION_CACHE_TTL_SECONDS: float = 2  # 0 = leer siempre la base (una consulta por PK)
+
+    # Compresión de respuestas de texto: brotli (si está instalado el paquete) o gzip
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_BYTES: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # Cache de principals (token -> claims, email -> usuario)
+    AUTH_CACHE_ENABLED: bool = True
+    AUTH_CACHE_MAXSIZE: int = 10000
+    AUTH_CACHE_TTL_SECONDS: int = 30
+
+    # PDFs: pool de procesos para el render y jobs asincrónicos
+    PDF_POOL_WORKERS: int = 2
+    PDF_QUEUE_MAX: int = 32               # renders pendientes antes de responder 503
+    PDF_INLINE_MAX_BYTES: int = 4096      # reportes chicos se renderizan en el request
+    PDF_RENDER_TIMEOUT_SECONDS: int = 30
+    PDF_JOBS_MAX_KEPT: int = 256          # jobs terminados que se conservan
+    PDF_JOBS_DIR: str = ""                # vacío = jobs en memoria; app.serve con varios workers usa un dir temporal
+    PDF_CACHE_DIR: str = "./pdf_cache"    # vacío = sin cache en disco
+    PDF_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+
+    # GET /analysis/export?format=zip: PDFs renderizándose a la vez por export
+    EXPORT_PDF_INFLIGHT: int = 4
+
+    # Cuota de análisis por día (UTC) para usuarios sin is_pro; 0 = sin límite
+    FREE_DAILY_ANALYSES: int = 100
+
+    # GET /analysis/search: bm25 sólo sobre las N coincidencias más recientes del usuario
+    SEARCH_RANK_WINDOW: int = 1000
+
     class Config:
         env_file = ".env"
 
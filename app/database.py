@@ -1,14 +1,128 @@
-from sqlalchemy import create_engine
+import time
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
 from .config import settings
+from .utils import metrics, result_codec
+
+def _is_sqlite_file(url: str) -> bool:
+    return url.startswith("sqlite") and url not in ("sqlite://", "sqlite:///") and ":memory:" not in url
+
+def _sqlite_pragmas(engine, read_only: bool = False):
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cur.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cur.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+        cur.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}")  # negativo = KiB
+        if read_only:
+            cur.execute("PRAGMA query_only=ON")
+        cur.close()
+
+def _sqlite_functions(engine):
+    """Funciones SQL propias; los triggers del índice de búsqueda (app/search.py) las necesitan."""
+    @event.listens_for(engine, "connect")
+    def _register(dbapi_conn, _record):
+        dbapi_conn.create_function("alerttrail_search_terms", 1, result_codec.search_terms, deterministic=True)
+
+def _instrument(engine):
+    """Cuenta queries y tiempo de DB (por request, vía utils/metrics.py)."""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_t0"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        metrics.record_query(time.perf_counter() - conn.info.pop("query_t0", time.perf_counter()))
+
+def make_engines(url: str, profile: str = "default"):
+    """Devuelve (engine de escritura, engine de lectura).
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
-)
+    Perfil "production" sobre un archivo SQLite: WAL + pragmas, un único
+    escritor (pool de 1 conexión) y un pool más grande de lectores query_only.
+    En cualquier otro caso los dos son el mismo engine.
+    """
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    if profile != "production" or not _is_sqlite_file(url):
+        eng = create_engine(url, connect_args=connect_args)
+        if url.startswith("sqlite"):
+            _sqlite_functions(eng)
+        return eng, eng
+
+    writer = create_engine(
+        url, connect_args=connect_args,
+        pool_size=1, max_overflow=0, pool_timeout=settings.SQLITE_BUSY_TIMEOUT_MS / 1000,
+    )
+    reader = create_engine(
+        url, connect_args=connect_args,
+        pool_size=settings.SQLITE_READ_POOL_SIZE, max_overflow=settings.SQLITE_READ_POOL_SIZE,
+    )
+    _sqlite_pragmas(writer)
+    _sqlite_pragmas(reader, read_only=True)
+    _sqlite_functions(writer)
+    _sqlite_functions(reader)
+    return writer, reader
+
+engine, read_engine = make_engines(settings.DATABASE_URL, settings.SQLITE_PROFILE)
+for _eng in {engine, read_engine}:
+    _instrument(_eng)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# ---------------- Camino async (ASYNC_DB) ----------------
+# aiosqlite en local; con Postgres, asyncpg. Sólo se crea si está habilitado.
+def async_url(url: str) -> str:
+    for sync_prefix, async_prefix in (
+        ("sqlite://", "sqlite+aiosqlite://"),
+        ("postgresql://", "postgresql+asyncpg://"),
+        ("postgres://", "postgresql+asyncpg://"),
+    ):
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
+def make_async_engines(url: str, profile: str = "default"):
+    """Como make_engines, con AsyncEngine: (escritura, lectura).
+
+    Con el perfil "production" el camino async también escribe por un pool de 1 conexión
+    y lee por lectores query_only. Los jobs sync del mismo proceso (outbox, lotes) usan
+    el escritor de make_engines: son dos conexiones de escritura y el busy_timeout las ordena.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    aurl = async_url(url)
+    if profile != "production" or not _is_sqlite_file(url):
+        eng = create_async_engine(aurl)
+        if url.startswith("sqlite"):
+            _sqlite_functions(eng.sync_engine)
+        return eng, eng
+
+    writer = create_async_engine(
+        aurl, pool_size=1, max_overflow=0, pool_timeout=settings.SQLITE_BUSY_TIMEOUT_MS / 1000,
+    )
+    reader = create_async_engine(
+        aurl, pool_size=settings.SQLITE_READ_POOL_SIZE, max_overflow=settings.SQLITE_READ_POOL_SIZE,
+    )
+    _sqlite_pragmas(writer.sync_engine)
+    _sqlite_pragmas(reader.sync_engine, read_only=True)
+    _sqlite_functions(writer.sync_engine)
+    _sqlite_functions(reader.sync_engine)
+    return writer, reader
+
+async_engine = async_read_engine = None
+AsyncSessionLocal = AsyncReadSessionLocal = None
+if settings.ASYNC_DB:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine, async_read_engine = make_async_engines(settings.DATABASE_URL, settings.SQLITE_PROFILE)
+    for _eng in {async_engine, async_read_engine}:
+        _instrument(_eng.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
 
 class Base(DeclarativeBase):
     pass
@@ -19,3 +133,19 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Para handlers que sólo leen: con el perfil "production" no compiten por el escritor
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
@@ -1,17 +1,29 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse, HTMLResponse
-from fastapi.routing import APIRoute
+import asyncio
+import sys
 
-from .config import settings
-from .database import Base, engine
-from .routes import auth as auth_routes
-from .routes import analysis as analysis_routes
+from .startup import phase, report as startup_report, run_warmup
 
-# Crear tablas en el arranque (simple para MVP)
-Base.metadata.create_all(bind=engine)
+with phase("import.framework"):
+    from fastapi import FastAPI, Request
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import RedirectResponse, HTMLResponse, PlainTextResponse
+    from fastapi.routing import APIRoute
 
-app = FastAPI(title="AlertTrail API", version="1.0.0")
+    from .config import settings
+    from .database import engine
+    from .migrations import ensure_schema
+
+# PDF (ReportLab), facturación (httpx/requests) y bcrypt (passlib) se cargan en el primer uso
+with phase("import.routes"):
+    from .utils import (
+        compression, memo, metrics, principal_cache, pdf_cache, pdf_jobs, password_pool, ratelimit, user_version,
+    )
+    from .utils.result_codec import ORJSONResponse
+    from .routes import auth as auth_routes
+    from .routes import analysis as analysis_routes
+    from .routes import webhooks as webhooks_routes
+
+app = FastAPI(title="AlertTrail API", version="1.0.0", default_response_class=ORJSONResponse)
 
 # CORS
 if settings.CORS_ORIGINS == "*":
@@ -21,31 +33,49 @@ elif isinstance(settings.CORS_ORIGINS, list):
 else:
     allow_origins = [str(settings.CORS_ORIGINS)]
 
+# Rate limiting antes que CORS: así los 429/503 también llevan los headers de CORS
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(ratelimit.RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allow_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Next-Offset", "X-Duplicate-Of", "ETag", "Last-Modified"],
 )
 
-# Routers
+# Routers (con ASYNC_DB los async van primero: sus rutas ganan el match)
+if settings.ASYNC_DB:
+    from .routes import auth_async as auth_async_routes
+    from .routes import analysis_async as analysis_async_routes
+    app.include_router(auth_async_routes.router)
+    app.include_router(analysis_async_routes.router)
 app.include_router(auth_routes.router)
 app.include_router(analysis_routes.router)
+app.include_router(webhooks_routes.router)
 
 
 # --- Middleware: interceptar /auth/logout aunque no exista la ruta ---
-@app.middleware("http")
-async def _force_auth_logout(request, call_next):
-    path = request.url.path
-    if request.method == "GET" and path == "/auth/logout":
-        # mismo borrado de cookie que usamos en _logout_response()
-        r = RedirectResponse(url="/auth/login", status_code=302)
-        r.delete_cookie("access_token", path="/")
-        if getattr(settings, "COOKIE_DOMAIN", None):
-            r.delete_cookie("access_token", path="/", domain=settings.COOKIE_DOMAIN)
-        return r
-    return await call_next(request)
+# ASGI puro (antes era BaseHTTPMiddleware, que agrega una task y copia el body por request)
+class _ForceAuthLogout:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "GET" and scope["path"] == "/auth/logout":
+            # mismo borrado de cookie que usamos en _logout_response()
+            return await _logout_response()(scope, receive, send)
+        return await self.app(scope, receive, send)
+
+app.add_middleware(_ForceAuthLogout)
+# gzip/brotli para JSON/NDJSON grandes (los 304 y los PDFs pasan sin tocar)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(compression.CompressionMiddleware)
+# Métricas por fuera de todo: cuenta también los 429/503 del rate limiting
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
 
 # --- Logout blindado (borra cookie con y sin dominio) ---
 def _logout_response():
@@ -79,8 +109,67 @@ def root():
 def health():
     return {"ok": True}
 
-# Log de rutas para verificar montaje
+# Contadores internos (para dimensionar caches/pools)
+@app.get("/health/stats", tags=["root"], include_in_schema=False)
+def health_stats():
+    from .billing.dispatcher import dispatcher as billing_dispatcher
+    from .billing import dedup as billing_dedup
+    return {"auth_cache": principal_cache.stats(), "pdf": pdf_jobs.stats(), "pdf_cache": pdf_cache.stats(),
+            "password_pool": password_pool.stats(), "billing": billing_dispatcher.stats,
+            "billing_dedup": billing_dedup.stats(), "rate_limit": ratelimit.stats(),
+            "user_versions": user_version.stats(), "analysis_memo": memo.stats()}
+
+# Formato texto de Prometheus; con METRICS_TOKEN exige "Authorization: Bearer <token>"
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint(request: Request):
+    if settings.METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {settings.METRICS_TOKEN}":
+        return PlainTextResponse("forbidden\n", status_code=403)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/health/startup", tags=["root"], include_in_schema=False)
+def health_startup():
+    return startup_report()
+
+# Esquema: create_all + migraciones sólo si la versión guardada no es la actual
+# (con app.serve lo hace el proceso padre, una vez)
+@app.on_event("startup")
+def _prepare():
+    if settings.SCHEMA_ON_STARTUP:
+        with phase("startup.schema"):
+            ensure_schema(engine)
+    run_warmup(settings.WARMUP)
+    if settings.LOG_ROUTES:
+        _log_routes()
+    if settings.STARTUP_PROFILE:
+        rep = startup_report()
+        print(f"\n=== STARTUP (proceso: {rep['process_age_ms']} ms) ===")
+        for ph in rep["phases"]:
+            print(f"{ph['name']:<24} {ph['ms']:>8.1f} ms")
+        print("==============\n")
+
+async def _start_billing_later():
+    await asyncio.sleep(settings.BILLING_START_DELAY_SECONDS)
+    from .billing.dispatcher import dispatcher as billing_dispatcher
+    await billing_dispatcher.start()
+
 @app.on_event("startup")
+async def _start_billing():
+    # En un task: el import del stack de facturación no demora el arranque
+    if settings.BILLING_DISPATCHER_ENABLED:
+        app.state.billing_task = asyncio.create_task(_start_billing_later())
+
+@app.on_event("shutdown")
+async def _shutdown_pools():
+    task = getattr(app.state, "billing_task", None)
+    if task:
+        task.cancel()
+    if "app.billing.dispatcher" in sys.modules:
+        from .billing.dispatcher import dispatcher as billing_dispatcher
+        await billing_dispatcher.stop()
+    pdf_jobs.shutdown()
+    password_pool.shutdown()
+
+# Log de rutas para verificar montaje (LOG_ROUTES=true)
 def _log_routes():
     paths = sorted([r.path for r in app.routes if isinstance(r, APIRoute)])
     print("\n=== ROUTES ===")
@@ -0,0 +1,173 @@
+# app/migrations.py
+# Migraciones mínimas y versionadas (sin Alembic).
+# En una base nueva create_all ya deja el esquema final, así que cada paso
+# tiene que ser idempotente: revisa lo que existe antes de tocar nada.
+# Uso manual: python -m app.migrations
+from sqlalchemy import LargeBinary, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+BATCH_SIZE = 1000
+
+def _columns(conn: Connection, table: str) -> set[str]:
+    return {c["name"] for c in inspect(conn).get_columns(table)}
+
+def _indexes(conn: Connection, table: str) -> set[str]:
+    return {i["name"] for i in inspect(conn).get_indexes(table)}
+
+def _m001_users_email_norm(conn: Connection):
+    if "email_norm" not in _columns(conn, "users"):
+        conn.execute(text("ALTER TABLE users ADD COLUMN email_norm VARCHAR(255)"))
+
+    # Backfill por lotes. Si dos filas viejas difieren sólo en mayúsculas,
+    # la primera (menor id) se queda con el email normalizado.
+    taken = {r[0] for r in conn.execute(text("SELECT email_norm FROM users WHERE email_norm IS NOT NULL"))}
+    pending = conn.execute(text("SELECT id, email FROM users WHERE email_norm IS NULL ORDER BY id")).all()
+    batch = []
+    for user_id, email in pending:
+        norm = (email or "").strip().lower()
+        if not norm or norm in taken:
+            continue
+        taken.add(norm)
+        batch.append({"id": user_id, "norm": norm})
+        if len(batch) >= BATCH_SIZE:
+            conn.execute(text("UPDATE users SET email_norm = :norm WHERE id = :id"), batch)
+            batch = []
+    if batch:
+        conn.execute(text("UPDATE users SET email_norm = :norm WHERE id = :id"), batch)
+
+    if "ix_users_email_norm" not in _indexes(conn, "users"):
+        conn.execute(text("CREATE UNIQUE INDEX ix_users_email_norm ON users (email_norm)"))
+
+def _m002_analyses_keyset_index(conn: Connection):
+    if "ix_analyses_user_created_id" not in _indexes(conn, "analyses"):
+        conn.execute(text("CREATE INDEX ix_analyses_user_created_id ON analyses (user_id, created_at, id)"))
+
+def _m003_billing_outbox_unique_payment(conn: Connection):
+    idx = {i["name"]: i for i in inspect(conn).get_indexes("billing_outbox")}
+    if idx.get("ix_billing_outbox_payment_id", {}).get("unique"):
+        return
+    # Duplicados previos: queda la fila facturada (o la más vieja) de cada pago
+    dupes = conn.execute(text(
+        "SELECT payment_id FROM billing_outbox WHERE payment_id IS NOT NULL GROUP BY payment_id HAVING COUNT(*) > 1"
+    )).scalars().all()
+    for pid in dupes:
+        keep = conn.execute(text(
+            "SELECT id FROM billing_outbox WHERE payment_id = :p ORDER BY status = 'done' DESC, id LIMIT 1"
+        ), {"p": pid}).scalar()
+        conn.execute(text("DELETE FROM billing_outbox WHERE payment_id = :p AND id != :k"), {"p": pid, "k": keep})
+    if "ix_billing_outbox_payment_id" in idx:
+        conn.execute(text("DROP INDEX ix_billing_outbox_payment_id"))
+    conn.execute(text("CREATE UNIQUE INDEX ix_billing_outbox_payment_id ON billing_outbox (payment_id)"))
+
+def _m004_analyses_result_binary(conn: Connection):
+    # result_json pasa de texto (json.dumps) a bytes de orjson (utils/result_codec.py)
+    from .utils import result_codec
+    if conn.dialect.name == "postgresql":
+        col = next(c for c in inspect(conn).get_columns("analyses") if c["name"] == "result_json")
+        if not isinstance(col["type"], LargeBinary):
+            conn.execute(text(
+                "ALTER TABLE analyses ALTER COLUMN result_json TYPE BYTEA USING convert_to(result_json, 'UTF8')"
+            ))
+        return
+    if conn.dialect.name != "sqlite":
+        return
+    # SQLite guarda BLOBs en la columna TEXT sin conversión: se reescriben las filas viejas
+    last_id = 0
+    while True:
+        rows = conn.execute(text(
+            "SELECT id, result_json FROM analyses WHERE id > :last AND typeof(result_json) = 'text' "
+            "ORDER BY id LIMIT :n"
+        ), {"last": last_id, "n": BATCH_SIZE}).all()
+        if not rows:
+            break
+        conn.execute(text("UPDATE analyses SET result_json = :blob WHERE id = :id"), [
+            {"id": row_id, "blob": result_codec.dumps(result_codec.loads(stored))} for row_id, stored in rows
+        ])
+        last_id = rows[-1][0]
+
+def _m005_users_data_version(conn: Connection):
+    cols = _columns(conn, "users")
+    if "data_version" not in cols:
+        conn.execute(text("ALTER TABLE users ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0"))
+    if "data_updated_at" not in cols:
+        ts = "TIMESTAMP WITH TIME ZONE" if conn.dialect.name == "postgresql" else "DATETIME"
+        conn.execute(text(f"ALTER TABLE users ADD COLUMN data_updated_at {ts}"))
+        # Último cambio conocido: el análisis más nuevo o el alta del usuario
+        conn.execute(text(
+            "UPDATE users SET data_updated_at = COALESCE("
+            "(SELECT MAX(created_at) FROM analyses WHERE analyses.user_id = users.id), created_at)"
+        ))
+
+def _m006_analyses_fts(conn: Connection):
+    if conn.dialect.name != "sqlite":
+        return  # sin FTS5: app/search.py cae a ILIKE
+    from . import search
+    search.install(conn)
+    # Filas previas, dentro de esta transacción; para reindexar más tarde: python -m app.search rebuild
+    after = 0
+    while after is not None:
+        after = search.index_pending(conn, after, search.REBUILD_BATCH)
+
+def _m007_analysis_daily(conn: Connection):
+    # create_all ya creó la tabla; acá se llena desde las filas existentes
+    from . import stats
+    from .models import AnalysisDaily
+    AnalysisDaily.__table__.create(conn, checkfirst=True)
+    for user_id in conn.execute(text("SELECT DISTINCT user_id FROM analyses")).scalars().all():
+        stats.recompute_user(conn, user_id)
+
+def _m008_analyses_content_hash(conn: Connection):
+    # Sin backfill: el contenido original no se guarda (sólo input_summary)
+    if "content_hash" not in _columns(conn, "analyses"):
+        conn.execute(text("ALTER TABLE analyses ADD COLUMN content_hash VARCHAR(64)"))
+    if "ix_analyses_user_content_hash" not in _indexes(conn, "analyses"):
+        conn.execute(text("CREATE INDEX ix_analyses_user_content_hash ON analyses (user_id, content_hash)"))
+
+# (versión, nombre, función). Agregar siempre al final.
+MIGRATIONS = [
+    (1, "users.email_norm", _m001_users_email_norm),
+    (2, "analyses(user_id, created_at, id)", _m002_analyses_keyset_index),
+    (3, "billing_outbox.payment_id unique", _m003_billing_outbox_unique_payment),
+    (4, "analyses.result_json binario (orjson)", _m004_analyses_result_binary),
+    (5, "users.data_version / data_updated_at", _m005_users_data_version),
+    (6, "analyses_fts (búsqueda FTS5)", _m006_analyses_fts),
+    (7, "analysis_daily (rollups y cuota)", _m007_analysis_daily),
+    (8, "analyses.content_hash (memo)", _m008_analyses_content_hash),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def current_version(conn: Connection) -> int:
+    conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+    return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+
+def run_migrations(engine: Engine) -> list[str]:
+    applied = []
+    with engine.begin() as conn:
+        version = current_version(conn)
+        for step_version, name, step in MIGRATIONS:
+            if step_version <= version:
+                continue
+            step(conn)
+            conn.execute(text("INSERT INTO schema_version (version) VALUES (:v)"), {"v": step_version})
+            applied.append(name)
+    return applied
+
+def ensure_schema(engine: Engine) -> list[str]:
+    """create_all + migraciones, salvo que la base ya esté en SCHEMA_VERSION (una sola consulta)."""
+    try:
+        with engine.connect() as conn:
+            version = conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+    except DBAPIError:
+        version = 0  # base nueva: todavía no hay schema_version
+    if version >= SCHEMA_VERSION:
+        return []
+    from .database import Base
+    from . import models  # noqa: F401  registra las tablas
+    Base.metadata.create_all(bind=engine)
+    return run_migrations(engine)
+
+if __name__ == "__main__":
+    from .database import engine
+    print("aplicadas:", ensure_schema(engine) or "ninguna")
@@ -1,23 +1,79 @@
-from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Integer, DateTime, ForeignKey, Text, func, Boolean
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
+from datetime import date
+from sqlalchemy import String, Integer, Date, DateTime, ForeignKey, Text, func, Boolean, Index, LargeBinary
 from .database import Base
 
+def normalize_email(email: str | None) -> str:
+    return (email or "").strip().lower()
+
 class User(Base):
     __tablename__ = "users"
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     email: Mapped[str] = mapped_column(String(255), unique=True, index=True)
+    # email en minúsculas y sin espacios: las búsquedas filtran por acá para usar el índice
+    email_norm: Mapped[str | None] = mapped_column(String(255), unique=True, index=True, nullable=True)
     name: Mapped[str] = mapped_column(String(255))
     hashed_password: Mapped[str] = mapped_column(String(255))
     is_pro: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Sube con cada cambio del perfil o de sus análisis: ETag/Last-Modified (utils/user_version.py)
+    data_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    data_updated_at: Mapped["DateTime"] = mapped_column(DateTime(timezone=True), server_default=func.now())
     created_at: Mapped["DateTime"] = mapped_column(DateTime(timezone=True), server_default=func.now())
     analyses: Mapped[list["Analysis"]] = relationship("Analysis", back_populates="owner", cascade="all, delete-orphan")
 
+    @validates("email")
+    def _sync_email_norm(self, key, value):
+        self.email_norm = normalize_email(value)
+        return value
+
 class Analysis(Base):
     __tablename__ = "analyses"
+    # Paginación keyset de GET /analysis: WHERE user_id = ? AND (created_at, id) < (?, ?)
+    # Memo de POST /analysis (utils/memo.py): WHERE user_id = ? AND content_hash = ?
+    __table_args__ = (
+        Index("ix_analyses_user_created_id", "user_id", "created_at", "id"),
+        Index("ix_analyses_user_content_hash", "user_id", "content_hash"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
     title: Mapped[str] = mapped_column(String(255))
     input_summary: Mapped[str] = mapped_column(Text)
-    result_json: Mapped[str] = mapped_column(Text)
+    # orjson compacto (bytes), zstd si es grande: ver utils/result_codec.py
+    result_json: Mapped[bytes] = mapped_column(LargeBinary)
+    # sha256 del contenido normalizado + motor/reglas; NULL en uploads y en filas previas al memo
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
     created_at: Mapped["DateTime"] = mapped_column(DateTime(timezone=True), server_default=func.now())
     owner: Mapped["User"] = relationship("User", back_populates="analyses")
+
+class AnalysisDaily(Base):
+    """Análisis por usuario y día (UTC): contadores que app/stats.py suma en la misma transacción del INSERT."""
+    __tablename__ = "analysis_daily"
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    total: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    hits: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # Un contador por max_severity del resultado (sev_none: ninguna regla disparó)
+    sev_none: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    sev_info: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    sev_low: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    sev_medium: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    sev_high: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    sev_critical: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+
+class BillingOutbox(Base):
+    """Pagos aprobados de Mercado Pago pendientes de facturar (los drena billing.dispatcher)."""
+    __tablename__ = "billing_outbox"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # UNIQUE: una sola fila (y una sola factura) por pago, aunque MP reenvíe la notificación
+    payment_id: Mapped[str | None] = mapped_column(String(64), unique=True, index=True, nullable=True)
+    payload: Mapped[str] = mapped_column(Text)
+    status: Mapped[str] = mapped_column(String(16), default="pending", index=True)  # pending | sending | done | failed
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    # Próximo intento; mientras status == "sending" funciona como lease del dispatcher
+    next_attempt_at: Mapped["DateTime"] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    cae: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    pdf_url: Mapped[str | None] = mapped_column(String(1024), nullable=True)
+    number: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    created_at: Mapped["DateTime"] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped["DateTime"] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
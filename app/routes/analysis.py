@@ -1,35 +1,489 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import insert, select, tuple_
 from sqlalchemy.orm import Session
-from ..database import get_db
+from ..database import get_db, get_read_db, ReadSessionLocal, SessionLocal
+from ..config import settings
 from ..schemas import AnalysisCreate, AnalysisOut
 from ..models import Analysis
 from ..auth import get_current_user
-from ..utils.pdf import build_analysis_pdf
-from fastapi.responses import StreamingResponse
+from ..analyzer import get_ruleset
+from ..analyzer.stream import CorruptInput, MultipartUpload, TooLarge, UnsupportedEncoding, UploadAnalysis
+from .. import search, stats, writer
+from ..utils import export, memo, pdf_cache, pdf_jobs, result_codec, user_version
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from concurrent.futures.process import BrokenProcessPool
 import json
+import logging
+import os
 from io import BytesIO
 
 router = APIRouter(prefix="/analysis", tags=["analysis"])
+log = logging.getLogger(__name__)
 
-@router.post("", response_model=AnalysisOut)
-def run_analysis(data: AnalysisCreate, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    input_summary = (data.content or "")[:280]
+# La lógica vive en funciones que reciben la Session primero: los handlers sync las
+# llaman directo y los async (routes/analysis_async.py) vía AsyncSession.run_sync.
+def analyze(data: AnalysisCreate) -> tuple[str, dict]:
+    # Se analiza el contenido tal cual llegó (offsets, input_summary): memo.normalize sólo arma la clave
+    content = data.content or ""
+    input_summary = content[:280]
     result = {"summary_length": len(input_summary), "title_length": len(data.title)}
-    row = Analysis(user_id=user.id, title=data.title, input_summary=input_summary, result_json=json.dumps(result))
-    db.add(row); db.commit(); db.refresh(row)
-    return AnalysisOut(id=row.id, title=row.title, input_summary=row.input_summary, result_json=result)
+    result.update(get_ruleset().scan(content))
+    return input_summary, result
 
-@router.get("/{analysis_id}/pdf")
-def analysis_pdf(analysis_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    analysis = db.query(Analysis).filter(Analysis.id == analysis_id, Analysis.user_id == user.id).first()
+@writer.op("analysis.insert")
+def _insert_analysis(db: Session, user_id: int, title: str, input_summary: str, stored: bytes,
+                     max_severity: str | None = None, total_hits: int = 0, content_hash: str | None = None) -> int:
+    row = Analysis(user_id=user_id, title=title, input_summary=input_summary, result_json=stored,
+                   content_hash=content_hash)
+    db.add(row)
+    stats.record(db, user_id, [stats.counters(max_severity, total_hits)])
+    user_version.bump(db, user_id)
+    db.flush()
+    return row.id
+
+def save_analysis(db: Session | None, user_id: int, title: str, input_summary: str, result: dict,
+                  content_hash: str | None = None) -> AnalysisOut:
+    # En modo multi-core (app/serve.py) el INSERT lo hace el escritor único y `db` no se usa
+    analysis_id = writer.run(
+        db, "analysis.insert", user_id, title, input_summary, result_codec.dumps(result),
+        result.get("max_severity"), result.get("total_hits", 0), content_hash,
+    )
+    return AnalysisOut(id=analysis_id, title=title, input_summary=input_summary, result_json=result)
+
+def find_duplicate(db: Session, user_id: int, data: AnalysisCreate) -> tuple[str | None, memo.Memo | None]:
+    """(hash del contenido, resultado ya guardado si es un duplicado); (None, None) con el memo apagado."""
+    if not settings.ANALYSIS_MEMO_ENABLED:
+        return None, None
+    key = memo.content_hash(memo.normalize(data.content or ""))
+    return key, memo.lookup(db, user_id, key)
+
+def create_analysis(db: Session | None, user_id: int, data: AnalysisCreate,
+                    content_hash: str | None = None, hit: memo.Memo | None = None) -> AnalysisOut:
+    if hit is not None:
+        # Duplicado: fila nueva con el resultado guardado, sin volver a correr el motor
+        input_summary, result = hit.input_summary, {**hit.result, "title_length": len(data.title)}
+    else:
+        input_summary, result = analyze(data)
+    out = save_analysis(db, user_id, data.title, input_summary, result, content_hash)
+    if content_hash:
+        memo.remember(user_id, content_hash, out.id, input_summary, result)
+    return out
+
+def existing_response(db: Session, user_id: int, hit: memo.Memo) -> Response | None:
+    body = get_one(db, user_id, hit.analysis_id)
+    return _json_response(body, {"X-Duplicate-Of": str(hit.analysis_id)}) if body is not None else None
+
+def check_quota(db: Session, user, n: int = 1):
+    try:
+        stats.check_quota(db, user, n)
+    except stats.QuotaExceeded as e:
+        raise HTTPException(
+            status_code=429, detail=f"Cuota diaria agotada: {e.used}/{e.limit} análisis (plan gratuito)",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+ON_DUPLICATE = Query(
+    "new", pattern="^(new|existing)$",
+    description="Contenido ya analizado: new = fila nueva con el resultado guardado, existing = el análisis existente",
+)
+
+@router.post("", response_model=AnalysisOut)
+def run_analysis(
+    data: AnalysisCreate,
+    response: Response,
+    on_duplicate: str = ON_DUPLICATE,
+    db: Session = Depends(get_db),
+    read_db: Session = Depends(get_read_db),
+    user=Depends(get_current_user),
+):
+    # Memo y cuota por la sesión de lectura (la misma de la autenticación): en modo multi-core
+    # `db` es el pool de una conexión y quedaría tomada mientras el escritor hace el INSERT
+    content_hash, hit = find_duplicate(read_db, user.id, data)
+    if hit is not None:
+        response.headers["X-Duplicate-Of"] = str(hit.analysis_id)
+        if on_duplicate == "existing" and (existing := existing_response(read_db, user.id, hit)):
+            return existing  # no crea fila: no cuenta para la cuota
+    check_quota(read_db, user)
+    return create_analysis(db, user.id, data, content_hash, hit)
+
+# ---------------- Ingesta por lotes ----------------
+_batch_adapter = TypeAdapter(list[AnalysisCreate])
+_item_adapter = TypeAdapter(AnalysisCreate)
+
+def _validation_exc(e: ValidationError, **extra):
+    # Sin `input`: con validate_json es el body en bytes y el 422 no se podría serializar
+    errors = e.errors(include_url=False, include_context=False, include_input=False)
+    return HTTPException(status_code=422, detail={**extra, "errors": errors})
+
+def _parse_batch(body: bytes, content_type: str) -> list[AnalysisCreate]:
+    if "ndjson" not in content_type:
+        try:
+            return _batch_adapter.validate_json(body)
+        except ValidationError as e:
+            raise _validation_exc(e)
+    items = []
+    for n, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            items.append(_item_adapter.validate_json(line))
+        except ValidationError as e:
+            raise _validation_exc(e, line=n)
+    return items
+
+def _batch_hash(data: AnalysisCreate) -> str | None:
+    # El lote no consulta el memo (se analiza todo), pero deja el hash para los POST siguientes
+    return memo.content_hash(memo.normalize(data.content or "")) if settings.ANALYSIS_MEMO_ENABLED else None
+
+def _analyze_batch(user_id: int, items: list[AnalysisCreate]) -> tuple[list[dict], list[dict]]:
+    rows, counters = [], []
+    for data in items:
+        input_summary, result = analyze(data)
+        rows.append({"user_id": user_id, "title": data.title, "input_summary": input_summary,
+                     "result_json": result_codec.dumps(result), "content_hash": _batch_hash(data)})
+        counters.append(stats.counters(result.get("max_severity"), result.get("total_hits", 0)))
+    return rows, counters
+
+@writer.op("analysis.insert_batch")
+def _insert_rows(db: Session, user_id: int, rows: list[dict], counters: list[dict]) -> list[list[int]]:
+    """Sólo los INSERT del lote ya analizado (en chunks); devuelve los ids de cada chunk."""
+    chunk_size = settings.ANALYSIS_BATCH_CHUNK
+    stmt = insert(Analysis).returning(Analysis.id, sort_by_parameter_order=True)
+    chunks = [db.execute(stmt, rows[start:start + chunk_size]).scalars().all()
+              for start in range(0, len(rows), chunk_size)]
+    stats.record(db, user_id, counters)
+    user_version.bump(db, user_id)
+    return chunks
+
+def _insert_batch(user_id: int, items: list[AnalysisCreate]):
+    """Analiza el lote entero y recién después toma el escritor: una transacción con
+    sólo los INSERT. Informa los ids de cada chunk (NDJSON) una vez confirmada.
+
+    La última línea dice si la transacción se confirmó: los ids sólo valen con committed=true.
+    El detalle de un error queda en el log; al cliente le llega un mensaje genérico.
+    """
+    try:
+        rows, counters = _analyze_batch(user_id, items)
+    except Exception:
+        log.exception("lote de análisis: falló el análisis (user %s, %s items)", user_id, len(items))
+        yield json.dumps({"committed": False, "error": "No se pudo analizar el lote"}) + "\n"
+        return
+    # Nada se manda antes del commit: un cliente lento no deja la transacción abierta.
+    # En modo multi-core lo escribe el escritor único, como cualquier otro INSERT
+    try:
+        with SessionLocal() as db:
+            chunks = writer.run(db, "analysis.insert_batch", user_id, rows, counters)
+    except Exception:
+        log.exception("lote de análisis: falló el INSERT (user %s, %s items)", user_id, len(items))
+        yield json.dumps({"committed": False, "error": "No se pudo guardar el lote"}) + "\n"
+        return
+    for ids in chunks:
+        yield json.dumps({"ids": ids}) + "\n"
+    yield json.dumps({"committed": True, "count": len(items)}) + "\n"
+
+@router.post("/batch")
+async def run_analysis_batch(request: Request, db: Session = Depends(get_read_db), user=Depends(get_current_user)):
+    """Array JSON o NDJSON de AnalysisCreate; responde NDJSON con los ids creados."""
+    items = _parse_batch(await request.body(), request.headers.get("content-type", ""))
+    if len(items) > settings.ANALYSIS_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Máximo {settings.ANALYSIS_BATCH_MAX_ITEMS} items por lote")
+    await run_in_threadpool(check_quota, db, user, len(items))
+    return StreamingResponse(_insert_batch(user.id, items), media_type="application/x-ndjson")
+
+# ---------------- Upload en streaming (logs grandes) ----------------
+async def _read_upload(request: Request) -> tuple[UploadAnalysis, dict[str, str], str | None]:
+    ctype = request.headers.get("content-type", "")
+    form = MultipartUpload(ctype) if ctype.startswith("multipart/form-data") else None
+    upload = None if form else UploadAnalysis(request.headers.get("content-encoding", "").strip().lower() or None)
+    sink = form or upload
+    # El trabajo de CPU (descomprimir, escanear) corre en el threadpool, trozo por trozo
+    async for chunk in request.stream():
+        if chunk:
+            await run_in_threadpool(sink.write, chunk)
+    if not form:
+        return upload, {}, None
+    await run_in_threadpool(form.close)
+    if form.upload is None:
+        raise HTTPException(status_code=422, detail="Falta el campo 'file'")
+    return form.upload, form.fields, form.filename
+
+@router.post("/upload", response_model=AnalysisOut)
+async def upload_analysis(
+    request: Request,
+    title: str | None = Query(None, max_length=200),
+    db: Session = Depends(get_db),
+    read_db: Session = Depends(get_read_db),
+    user=Depends(get_current_user),
+):
+    """Analiza un log sin cargarlo entero: cuerpo crudo (text/plain u octet-stream) o
+    multipart con campo `file` (y `title` opcional). gzip/zstd por Content-Encoding o
+    detectado por los magic bytes. Sólo se guardan input_summary y el resultado."""
+    await run_in_threadpool(check_quota, read_db, user)
+    try:
+        upload, fields, filename = await _read_upload(request)
+        title = title or fields.get("title") or filename or "upload"
+        input_summary, result = await run_in_threadpool(upload.close, title)
+    except UnsupportedEncoding as e:
+        raise HTTPException(status_code=415, detail=f"Compresión no soportada: {e}")
+    except TooLarge:
+        raise HTTPException(status_code=413, detail=f"Máximo {settings.ANALYSIS_UPLOAD_MAX_BYTES} bytes descomprimidos")
+    except CorruptInput as e:
+        raise HTTPException(status_code=400, detail=f"Archivo dañado: {e}")
+    return await run_in_threadpool(save_analysis, db, user.id, title, input_summary, result)
+
+def _get_own_analysis(db: Session, analysis_id: int, user_id: int) -> Analysis:
+    analysis = db.query(Analysis).filter(Analysis.id == analysis_id, Analysis.user_id == user_id).first()
     if not analysis:
         raise HTTPException(status_code=404, detail="Análisis no encontrado")
-    pdf_bytes = build_analysis_pdf(analysis.title, analysis.input_summary, json.loads(analysis.result_json))
-    return StreamingResponse(BytesIO(pdf_bytes), media_type="application/pdf", headers={
-        "Content-Disposition": f'attachment; filename="alerttrail_analysis_{analysis_id}.pdf"'
-    })
+    return analysis
+
+def _pdf_busy():
+    return HTTPException(status_code=503, detail="Generador de PDF ocupado", headers={"Retry-After": "5"})
+
+def _pdf_filename(analysis_id: int) -> str:
+    return f"alerttrail_analysis_{analysis_id}.pdf"
+
+def _pdf_response(pdf_bytes: bytes, analysis_id: int, etag: str | None = None):
+    headers = {"Content-Disposition": f'attachment; filename="{_pdf_filename(analysis_id)}"'}
+    if etag:
+        headers["ETag"] = etag
+    return StreamingResponse(BytesIO(pdf_bytes), media_type="application/pdf", headers=headers)
+
+def _pdf_file_response(path: str, analysis_id: int, etag: str | None = None) -> Response | None:
+    # FileResponse envía el archivo sin cargarlo en memoria (sendfile/pathsend si el server lo soporta).
+    # El put() de otro request puede haberlo desalojado: None y el caller vuelve a los bytes
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return FileResponse(
+        path, media_type="application/pdf", filename=_pdf_filename(analysis_id),
+        headers={"ETag": etag} if etag else None, stat_result=stat,
+    )
+
+def _render_pdf(analysis: Analysis, key: str, etag: str | None = None) -> Response:
+    try:
+        pdf_bytes = pdf_jobs.render(
+            analysis.title, analysis.input_summary, result_codec.loads(analysis.result_json),
+            inline=pdf_jobs.is_small(analysis.input_summary, analysis.result_json),
+        )
+    except pdf_jobs.QueueFull:
+        raise _pdf_busy()
+    except pdf_jobs.RenderTimeout:
+        raise HTTPException(status_code=504, detail="El PDF tardó demasiado en generarse", headers={"Retry-After": "5"})
+    except BrokenProcessPool:
+        raise _pdf_busy()  # se murió un proceso del pool; el próximo pedido usa uno nuevo
+    # Los bytes ya están en memoria: se responden directo, sin depender del archivo recién escrito
+    pdf_cache.put(key, pdf_bytes)
+    return _pdf_response(pdf_bytes, analysis.id, etag)
+
+@router.get("/{analysis_id}/pdf")
+def analysis_pdf(analysis_id: int, request: Request, db: Session = Depends(get_read_db), user=Depends(get_current_user)):
+    analysis = _get_own_analysis(db, analysis_id, user.id)
+    key = pdf_cache.key_for(analysis.title, analysis.input_summary, analysis.result_json)
+    etag = pdf_cache.etag_for(key)
+    if pdf_cache.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    path = pdf_cache.get(key)
+    if path and (cached := _pdf_file_response(path, analysis_id, etag)):
+        return cached
+    return _render_pdf(analysis, key, etag)
+
+# ---------------- PDF asincrónico (jobs en el pool de procesos) ----------------
+def _job_out(job: pdf_jobs.PdfJob) -> dict:
+    return {
+        "job_id": job.id,
+        "analysis_id": job.analysis_id,
+        "status": job.status,
+        "error": job.error,
+        "status_url": f"/analysis/pdf/jobs/{job.id}",
+        "download_url": f"/analysis/pdf/jobs/{job.id}/download",
+    }
+
+@router.post("/{analysis_id}/pdf/jobs", status_code=202)
+def create_pdf_job(analysis_id: int, db: Session = Depends(get_read_db), user=Depends(get_current_user)):
+    analysis = _get_own_analysis(db, analysis_id, user.id)
+    try:
+        job = pdf_jobs.submit_job(
+            analysis.id, user.id, analysis.title, analysis.input_summary, result_codec.loads(analysis.result_json),
+            cache_key=pdf_cache.key_for(analysis.title, analysis.input_summary, analysis.result_json),
+        )
+    except pdf_jobs.QueueFull:
+        raise _pdf_busy()
+    return _job_out(job)
+
+def _get_own_job(job_id: str, user_id: int) -> pdf_jobs.PdfJob:
+    job = pdf_jobs.get_job(job_id, user_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job no encontrado")
+    return job
+
+@router.get("/pdf/jobs/{job_id}")
+def pdf_job_status(job_id: str, user=Depends(get_current_user)):
+    return _job_out(_get_own_job(job_id, user.id))
+
+@router.get("/pdf/jobs/{job_id}/download")
+def pdf_job_download(job_id: str, db: Session = Depends(get_read_db), user=Depends(get_current_user)):
+    job = _get_own_job(job_id, user.id)
+    if job.status == "pending":
+        raise HTTPException(status_code=409, detail="El PDF todavía se está generando", headers={"Retry-After": "1"})
+    if job.status == "error":
+        raise HTTPException(status_code=500, detail="No se pudo generar el PDF")
+    if job.pdf is not None:
+        return _pdf_response(job.pdf, job.analysis_id)
+    if job.path and (cached := _pdf_file_response(job.path, job.analysis_id)):
+        return cached
+    # El cache lo desalojó después de terminar el job: se vuelve a generar
+    analysis = _get_own_analysis(db, job.analysis_id, user.id)
+    return _render_pdf(analysis, pdf_cache.key_for(analysis.title, analysis.input_summary, analysis.result_json))
+
+# ---------------- Listado: keyset sobre (created_at, id) ----------------
+STREAM_BATCH = 500
+
+def _page_filter(stmt, user_id: int, cursor: int | None):
+    stmt = stmt.where(Analysis.user_id == user_id)
+    if cursor:
+        # El ancla se resuelve en SQL para comparar created_at con su formato nativo
+        anchor = select(Analysis.created_at).where(Analysis.id == cursor, Analysis.user_id == user_id).scalar_subquery()
+        stmt = stmt.where(tuple_(Analysis.created_at, Analysis.id) < tuple_(anchor, cursor))
+    return stmt.order_by(Analysis.created_at.desc(), Analysis.id.desc())
+
+def _list_stmt(user_id: int, cursor: int | None):
+    return _page_filter(
+        select(Analysis.id, Analysis.title, Analysis.input_summary, Analysis.result_json), user_id, cursor
+    )
+
+def _json_response(body: bytes, headers: dict | None = None) -> Response:
+    # result_json ya viene serializado desde la base: se responde sin pasar por AnalysisOut
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def list_page(db: Session, user_id: int, limit: int, cursor: int | None) -> tuple[bytes, int | None]:
+    """Una página ya serializada (array JSON) y el cursor de la siguiente (None si es la última)."""
+    rows = db.execute(_list_stmt(user_id, cursor).limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1].id
+    return result_codec.json_array(rows), next_cursor
+
+def get_one(db: Session, user_id: int, analysis_id: int) -> bytes | None:
+    row = db.execute(
+        select(Analysis.id, Analysis.title, Analysis.input_summary, Analysis.result_json)
+        .where(Analysis.id == analysis_id, Analysis.user_id == user_id)
+    ).first()
+    return result_codec.analysis_json(*row) if row else None
+
+def _stream_ndjson(user_id: int, cursor: int | None):
+    # Sesión propia: el generador sigue corriendo después de que el handler retorna
+    db = ReadSessionLocal()
+    try:
+        stmt = _list_stmt(user_id, cursor).execution_options(stream_results=True, yield_per=STREAM_BATCH)
+        for chunk in db.execute(stmt).partitions():
+            yield result_codec.ndjson(chunk)
+    finally:
+        db.close()
+
+# ---------------- Export masivo (ZIP de PDFs, CSV, NDJSON) ----------------
+EXPORT_MEDIA_TYPES = {"zip": "application/zip", "csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+def _export_stream(user_id: int, format: str):
+    if format == "ndjson":
+        yield from _stream_ndjson(user_id, None)
+        return
+    db = ReadSessionLocal()
+    try:
+        stmt = _page_filter(
+            select(Analysis.id, Analysis.title, Analysis.input_summary, Analysis.result_json, Analysis.created_at),
+            user_id, None,
+        ).execution_options(stream_results=True, yield_per=STREAM_BATCH)
+        result = db.execute(stmt)
+        if format == "csv":
+            yield from export.csv_rows(result.partitions())
+        else:
+            yield from export.zip_pdfs(result)
+    finally:
+        db.close()
+
+@router.get("/export")
+def export_analyses(
+    format: str = Query("zip", pattern="^(zip|csv|ndjson)$", description="zip: un PDF por análisis"),
+    user=Depends(get_current_user),
+):
+    """Todos los análisis del usuario en un solo archivo, generado mientras se descarga."""
+    filename = f"alerttrail_export.{format}"
+    return StreamingResponse(
+        _export_stream(user.id, format), media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+# ---------------- Búsqueda (FTS5, ver app/search.py) ----------------
+@router.get("/search", response_model=list[AnalysisOut])
+def search_analyses(
+    q: str = Query(..., min_length=1, max_length=200, description="Palabras (todas deben aparecer); `pal*` busca por prefijo"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10_000),
+    db: Session = Depends(get_read_db),
+    user=Depends(get_current_user),
+):
+    if not search.terms(q):
+        raise HTTPException(status_code=422, detail="La búsqueda no tiene palabras")
+    rows = search.search(db, user.id, q, limit + 1, offset)
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Offset"] = str(offset + limit)
+    return _json_response(result_codec.json_array(rows), headers)
+
+# ---------------- Estadísticas (rollups de app/stats.py) ----------------
+@router.get("/stats")
+def analysis_stats(
+    request: Request,
+    days: int = Query(30, ge=1, le=366),
+    db: Session = Depends(get_read_db),
+    user=Depends(get_current_user),
+):
+    """Análisis por día y por severidad máxima, más la cuota del día. No toca la tabla analyses."""
+    # El día y el plan van en la variante: la cuota cambia a medianoche aunque no haya escrituras
+    v = user_version.validators(db, "stats", user.id, f"{days}.{stats.today().isoformat()}.{int(user.is_pro)}")
+    if v.matches(request.headers):
+        return v.not_modified()
+    return result_codec.ORJSONResponse(stats.summary(db, user, days), headers=v.headers())
+
+def list_validators(db: Session, user_id: int, limit: int, cursor: int | None, format: str):
+    return user_version.validators(db, "analyses", user_id, f"{format}.{limit}.{cursor or 0}")
 
 @router.get("", response_model=list[AnalysisOut])
-def list_my_analyses(db: Session = Depends(get_db), user=Depends(get_current_user)):
-    rows = db.query(Analysis).filter(Analysis.user_id == user.id).order_by(Analysis.created_at.desc()).all()
-    return [AnalysisOut(id=r.id, title=r.title, input_summary=r.input_summary, result_json=json.loads(r.result_json)) for r in rows]
+def list_my_analyses(
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: int | None = Query(None, description="Valor de X-Next-Cursor de la página anterior"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="ndjson: stream completo desde el cursor, ignora limit"),
+    db: Session = Depends(get_read_db),
+    user=Depends(get_current_user),
+):
+    # La versión se lee ANTES que las filas: si algo cambia en el medio, el ETag queda viejo (no al revés)
+    v = list_validators(db, user.id, limit, cursor, format)
+    if v.matches(request.headers):
+        return v.not_modified()
+    if format == "ndjson":
+        return StreamingResponse(_stream_ndjson(user.id, cursor), media_type="application/x-ndjson", headers=v.headers())
+
+    body, next_cursor = list_page(db, user.id, limit, cursor)
+    return _json_response(body, {**v.headers(), **({"X-Next-Cursor": str(next_cursor)} if next_cursor else {})})
+
+@router.get("/{analysis_id:int}", response_model=AnalysisOut)
+def get_analysis(analysis_id: int, request: Request, db: Session = Depends(get_read_db), user=Depends(get_current_user)):
+    v = user_version.validators(db, "analysis", user.id, str(analysis_id))
+    if v.matches(request.headers):
+        # El ETag es por usuario: sin chequear la fila, un id ajeno o inexistente daría 304.
+        # Basta con el índice, sin leer result_json
+        if db.scalar(select(Analysis.id).where(Analysis.id == analysis_id, Analysis.user_id == user.id)) is None:
+            raise HTTPException(status_code=404, detail="Análisis no encontrado")
+        return v.not_modified()
+    body = get_one(db, user.id, analysis_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Análisis no encontrado")
+    return _json_response(body, v.headers())
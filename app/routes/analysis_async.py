@@ -0,0 +1,60 @@
+# app/routes/analysis_async.py
+# Variantes async de los handlers calientes de /analysis (se montan si ASYNC_DB=true,
+# antes del router sync, así que ganan el match). La lógica es la misma de routes/analysis.py:
+# se ejecuta con AsyncSession.run_sync, sin ocupar threads del pool de AnyIO.
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+
+from ..auth import get_current_user_async
+from .. import writer
+from ..database import AsyncReadSessionLocal, get_async_db, get_async_read_db
+from ..schemas import AnalysisCreate, AnalysisOut
+from ..utils import result_codec
+from .analysis import (
+    ON_DUPLICATE, STREAM_BATCH, _json_response, _list_stmt, check_quota, create_analysis, existing_response,
+    find_duplicate, list_page, list_validators,
+)
+
+router = APIRouter(prefix="/analysis", tags=["analysis"])
+
+@router.post("", response_model=AnalysisOut)
+async def run_analysis(
+    data: AnalysisCreate,
+    response: Response,
+    on_duplicate: str = ON_DUPLICATE,
+    db=Depends(get_async_db),
+    read_db=Depends(get_async_read_db),
+    user=Depends(get_current_user_async),
+):
+    # Memo y cuota por la sesión de lectura: el escritor (1 conexión con el perfil production) sólo para el INSERT
+    content_hash, hit = await read_db.run_sync(find_duplicate, user.id, data)
+    if hit is not None:
+        response.headers["X-Duplicate-Of"] = str(hit.analysis_id)
+        if on_duplicate == "existing" and (existing := await read_db.run_sync(existing_response, user.id, hit)):
+            return existing
+    await read_db.run_sync(check_quota, user)
+    return await writer.runner(db.run_sync)(create_analysis, user.id, data, content_hash, hit)
+
+async def _stream_ndjson(user_id: int, cursor: int | None):
+    async with AsyncReadSessionLocal() as db:
+        result = await db.stream(_list_stmt(user_id, cursor).execution_options(yield_per=STREAM_BATCH))
+        async for chunk in result.partitions():
+            yield result_codec.ndjson(chunk)
+
+@router.get("", response_model=list[AnalysisOut])
+async def list_my_analyses(
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: int | None = Query(None, description="Valor de X-Next-Cursor de la página anterior"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="ndjson: stream completo desde el cursor, ignora limit"),
+    db=Depends(get_async_read_db),
+    user=Depends(get_current_user_async),
+):
+    v = await db.run_sync(list_validators, user.id, limit, cursor, format)
+    if v.matches(request.headers):
+        return v.not_modified()
+    if format == "ndjson":
+        return StreamingResponse(_stream_ndjson(user.id, cursor), media_type="application/x-ndjson", headers=v.headers())
+
+    body, next_cursor = await db.run_sync(list_page, user.id, limit, cursor)
+    return _json_response(body, {**v.headers(), **({"X-Next-Cursor": str(next_cursor)} if next_cursor else {})})
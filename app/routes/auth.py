@@ -2,20 +2,21 @@
 import os
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Form, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from starlette.concurrency import run_in_threadpool
 
-from ..database import get_db
+from ..database import get_db, get_read_db, SessionLocal
 from ..schemas import UserCreate, UserOut, LoginRequest, Token
-from ..models import User
+from ..models import User, normalize_email
 from ..utils.security import (
-    verify_password,
-    get_password_hash,
     create_access_token,
     issue_access_cookie,
-    decode_access_token,
 )
+from ..utils import principal_cache, password_pool, user_version
+from ..auth import load_principal, _find_user_by_email
 from ..config import settings  # para borrar cookie con dominio si aplica
+from .. import writer
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -24,33 +25,123 @@ def _get_user_pwd(u: User) -> str:
     """Devuelve el hash de password sin importar el nombre del campo."""
     return getattr(u, "hashed_password", None) or getattr(u, "password_hash", "") or ""
 
+def _set_user_pwd(u: User, pwd_hash: str) -> None:
+    if hasattr(u, "hashed_password"): u.hashed_password = pwd_hash
+    if hasattr(u, "password_hash"):   u.password_hash = pwd_hash
+
 def _norm_email(e: str) -> str:
-    return (e or "").strip().lower()
+    return normalize_email(e)
+
+# bcrypt corre en password_pool (executor propio). El acceso a DB pasa por `run_db(fn, *args)`,
+# que ejecuta fn(session, *args): en el threadpool de AnyIO (acá) o con AsyncSession.run_sync
+# (routes/auth_async.py).
+def _threadpool_runner(db: Session):
+    return lambda fn, *args: run_in_threadpool(fn, db, *args)
+
+def _pwd_busy():
+    return HTTPException(status_code=503, detail="Servicio ocupado, reintentá en unos segundos", headers={"Retry-After": "2"})
+
+def _save_rehash(user_id: int, pwd_hash: str) -> None:
+    # Sesión de escritura propia: el login lee por el pool de lectores
+    with SessionLocal() as db:
+        user = db.get(User, user_id)
+        _set_user_pwd(user, pwd_hash)
+        db.commit()
+
+async def authenticate(run_db, email: str, password: str) -> User | None:
+    user = await run_db(_find_user_by_email, _norm_email(email))
+    if not user:
+        return None
+    try:
+        ok, new_hash = await password_pool.verify_and_update(password, _get_user_pwd(user))
+    except password_pool.Busy:
+        raise _pwd_busy()
+    if not ok:
+        return None
+    if new_hash:
+        # Cambio de costo de bcrypt sin downtime: se rehashea en el login
+        await run_in_threadpool(_save_rehash, user.id, new_hash)
+    return user
+
+@writer.op("auth.create_user")
+def _insert_user(db: Session, email_norm: str, name: str, pwd_hash: str) -> dict | None:
+    """None si el email ya está registrado (lo frena el índice único de email_norm)."""
+    user = User(email=email_norm, name=name)
+    _set_user_pwd(user, pwd_hash)
+    try:
+        # Savepoint: en el escritor único el error no tira abajo al resto del grupo
+        with db.begin_nested():
+            db.add(user)
+    except IntegrityError:
+        return None
+    return {"id": user.id, "email": user.email, "name": user.name, "is_pro": bool(user.is_pro)}
+
+def _create_user(db: Session | None, email_norm: str, name: str, pwd_hash: str) -> UserOut | None:
+    created = writer.run(db, "auth.create_user", email_norm, name, pwd_hash)
+    return UserOut(**created) if created else None
+
+def _email_taken(db: Session, email_norm: str) -> bool:
+    # La conexión se suelta enseguida: no queda tomada mientras corre bcrypt (ni, en
+    # multi-core, durante la ida y vuelta al escritor)
+    try:
+        return _find_user_by_email(db, email_norm) is not None
+    finally:
+        db.close()
+
+def _email_registered():
+    return HTTPException(status_code=400, detail="Email ya registrado")
 
 # ---------------- JSON APIs (para clientes) ----------------
-@router.post("/register", response_model=UserOut, status_code=201)
-def register(user_in: UserCreate, db: Session = Depends(get_db)):
+async def register_user(run_db, user_in: UserCreate, run_read_db=None) -> UserOut:
+    """`run_read_db` (opcional) hace el chequeo previo por otra sesión, p.ej. la de lectura."""
     email_norm = _norm_email(user_in.email)
-    exists = db.query(User).filter(func.lower(User.email) == email_norm).first()
-    if exists:
-        raise HTTPException(status_code=400, detail="Email ya registrado")
-
-    user = User(email=email_norm, name=user_in.name or "")
-    pwd_hash = get_password_hash(user_in.password)
-    if hasattr(user, "hashed_password"):
-        user.hashed_password = pwd_hash
-    if hasattr(user, "password_hash"):
-        user.password_hash = pwd_hash
-
-    db.add(user); db.commit(); db.refresh(user)
+    if await (run_read_db or run_db)(_email_taken, email_norm):
+        raise _email_registered()
+
+    try:
+        pwd_hash = await password_pool.hash_password(user_in.password)
+    except password_pool.Busy:
+        raise _pwd_busy()
+    # Dos registros simultáneos del mismo email pasan el chequeo: el índice único decide
+    user = await writer.runner(run_db)(_create_user, email_norm, user_in.name or "", pwd_hash)
+    if user is None:
+        raise _email_registered()
+    principal_cache.invalidate_user(email_norm)
+    return user
+
+def login_error(detail: str = "Credenciales incorrectas"):
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail)
+
+def me_from_cookie(db: Session, token: str | None) -> UserOut:
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    payload = principal_cache.decode_token(token)
+    if not payload or not payload.get("sub"):
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    user = load_principal(db, payload["sub"])
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return UserOut(id=user.id, email=user.email, name=user.name, is_pro=user.is_pro)
+
+def me_conditional(db: Session, request: Request, response: Response):
+    """/auth/me con ETag/Last-Modified: 304 si el cliente ya tiene la versión actual del perfil."""
+    user = me_from_cookie(db, request.cookies.get("access_token"))
+    v = user_version.validators(db, "me", user.id)
+    if v.matches(request.headers):
+        return v.not_modified()
+    response.headers.update(v.headers())
     return user
 
+# ---------------- JSON APIs (para clientes) ----------------
+@router.post("/register", response_model=UserOut, status_code=201)
+async def register(user_in: UserCreate, db: Session = Depends(get_db), read_db: Session = Depends(get_read_db)):
+    return await register_user(_threadpool_runner(db), user_in, _threadpool_runner(read_db))
+
 @router.post("/login", response_model=Token)
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
-    email_norm = _norm_email(payload.email)
-    user = db.query(User).filter(func.lower(User.email) == email_norm).first()
-    if not user or not verify_password(payload.password, _get_user_pwd(user)):
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciales incorrectas")
+async def login(payload: LoginRequest, db: Session = Depends(get_read_db)):
+    user = await authenticate(_threadpool_runner(db), payload.email, payload.password)
+    if not user:
+        raise login_error()
     token = create_access_token(subject=user.email.lower())
     return {"access_token": token, "token_type": "bearer"}
 
@@ -70,11 +161,10 @@ def login_page():
     return HTMLResponse(html)
 
 @router.post("/login/web", include_in_schema=False)
-def login_web(response: Response, email: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
-    email_norm = _norm_email(email)
-    user = db.query(User).filter(func.lower(User.email) == email_norm).first()
-    if not user or not verify_password(password, _get_user_pwd(user)):
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciales incorrectas.")
+async def login_web(response: Response, email: str = Form(...), password: str = Form(...), db: Session = Depends(get_read_db)):
+    user = await authenticate(_threadpool_runner(db), email, password)
+    if not user:
+        raise login_error("Credenciales incorrectas.")
     issue_access_cookie(response, subject=user.email.lower())
     return RedirectResponse(url="/dashboard", status_code=status.HTTP_303_SEE_OTHER)
 
@@ -95,21 +185,30 @@ def clear_cookie():
     return r
 
 @router.get("/me", response_model=UserOut)
-def me(request: Request, db: Session = Depends(get_db)):
-    token = request.cookies.get("access_token")
-    if not token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    payload = decode_access_token(token)
-    if not payload or not payload.get("sub"):
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    user = db.query(User).filter(func.lower(User.email) == _norm_email(payload["sub"])).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    return UserOut(id=user.id, email=user.email, name=user.name, is_pro=getattr(user, "is_pro", False))
+def me(request: Request, response: Response, db: Session = Depends(get_read_db)):
+    return me_conditional(db, request, response)
 
 # ---------------- Emergencia: reset/crear admin desde ENV ----------------
+@writer.op("auth.admin_reset")
+def _upsert_admin(db: Session, email: str, name: str, pwd_hash: str) -> str:
+    user = _find_user_by_email(db, email)
+    if user:
+        _set_user_pwd(user, pwd_hash)
+        if hasattr(user, "name") and not user.name: user.name = name
+        user_version.bump(db, user.id)
+        action = "actualizado"
+    else:
+        user = User(email=email, name=name)
+        _set_user_pwd(user, pwd_hash)
+        db.add(user); action = "creado"
+    db.flush()
+    return action
+
+def _reset_admin(db: Session | None, email: str, name: str, pwd_hash: str) -> str:
+    return writer.run(db, "auth.admin_reset", email, name, pwd_hash)
+
 @router.post("/_force_admin_reset", include_in_schema=True)
-def _force_admin_reset(
+async def _force_admin_reset(
     secret: str = Query(..., description="Debe coincidir con ADMIN_SETUP_SECRET (o SECRET_KEY)"),
     db: Session = Depends(get_db),
 ):
@@ -123,18 +222,11 @@ def _force_admin_reset(
     if not email or not password:
         raise HTTPException(status_code=400, detail="Faltan ADMIN_EMAIL o ADMIN_PASS")
 
-    pwd_hash = get_password_hash(password)
-    user = db.query(User).filter(func.lower(User.email) == email).first()
-    if user:
-        if hasattr(user, "hashed_password"): user.hashed_password = pwd_hash
-        if hasattr(user, "password_hash"):   user.password_hash = pwd_hash
-        if hasattr(user, "name") and not user.name: user.name = name
-        action = "actualizado"
-    else:
-        user = User(email=email, name=name)
-        if hasattr(user, "hashed_password"): user.hashed_password = pwd_hash
-        if hasattr(user, "password_hash"):   user.password_hash = pwd_hash
-        db.add(user); action = "creado"
-
-    db.commit()
+    # bcrypt por el mismo pool acotado que register/login
+    try:
+        pwd_hash = await password_pool.hash_password(password)
+    except password_pool.Busy:
+        raise _pwd_busy()
+    action = await writer.runner(_threadpool_runner(db))(_reset_admin, email, name, pwd_hash)
+    principal_cache.invalidate_user(email)
     return {"ok": True, "admin": email, "action": action}
@@ -0,0 +1,36 @@
+# app/routes/auth_async.py
+# Variantes async de /auth/register, /auth/login, /auth/login/web y /auth/me (ASYNC_DB=true).
+# Reusan los helpers de routes/auth.py pasando AsyncSession.run_sync como `run_db`.
+from fastapi import APIRouter, Depends, Form, Request, Response, status
+from fastapi.responses import RedirectResponse
+
+from ..database import get_async_db, get_async_read_db
+from ..schemas import LoginRequest, Token, UserCreate, UserOut
+from ..utils.security import create_access_token, issue_access_cookie
+from .auth import authenticate, login_error, me_conditional, register_user
+
+router = APIRouter(prefix="/auth", tags=["auth"])
+
+@router.post("/register", response_model=UserOut, status_code=201)
+async def register(user_in: UserCreate, db=Depends(get_async_db), read_db=Depends(get_async_read_db)):
+    return await register_user(db.run_sync, user_in, read_db.run_sync)
+
+@router.post("/login", response_model=Token)
+async def login(payload: LoginRequest, db=Depends(get_async_read_db)):
+    user = await authenticate(db.run_sync, payload.email, payload.password)
+    if not user:
+        raise login_error()
+    token = create_access_token(subject=user.email.lower())
+    return {"access_token": token, "token_type": "bearer"}
+
+@router.post("/login/web", include_in_schema=False)
+async def login_web(response: Response, email: str = Form(...), password: str = Form(...), db=Depends(get_async_read_db)):
+    user = await authenticate(db.run_sync, email, password)
+    if not user:
+        raise login_error("Credenciales incorrectas.")
+    issue_access_cookie(response, subject=user.email.lower())
+    return RedirectResponse(url="/dashboard", status_code=status.HTTP_303_SEE_OTHER)
+
+@router.get("/me", response_model=UserOut)
+async def me(request: Request, response: Response, db=Depends(get_async_read_db)):
+    return await db.run_sync(me_conditional, request, response)
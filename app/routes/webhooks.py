@@ -1,19 +1,38 @@
 # app/routes/webhooks.py
-from fastapi import APIRouter, Request, HTTPException
-from app.billing.service import create_invoice_for_payment
+from fastapi import APIRouter, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+
+from app.billing import signature
+from app.config import settings
 
 router = APIRouter(prefix="/webhooks", tags=["webhooks"])
 
 @router.post("/mpago")
 async def mpago_webhook(req: Request):
+    if not settings.MP_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="Webhook de Mercado Pago sin configurar (MP_WEBHOOK_SECRET)")
     payload = await req.json()
+    # Antes de encolar nada: sólo se factura lo que firmó Mercado Pago con nuestra clave
+    data_id = req.query_params.get("data.id") or (payload.get("data") or {}).get("id")
+    if not signature.verify(settings.MP_WEBHOOK_SECRET, req.headers.get("x-signature"),
+                            req.headers.get("x-request-id"), None if data_id is None else str(data_id)):
+        raise HTTPException(status_code=401, detail="Firma inválida")
     status = payload.get("data", {}).get("status") or payload.get("status")
     if status not in ("approved","accredited"):
         return {"ok": True, "skipped": True}
 
-    invoice = create_invoice_for_payment(payload)
-    if not invoice.ok:
-        # log y reintento asincrónico
-        raise HTTPException(status_code=502, detail="Billing provider error")
-    # guardar en DB: cae, pdf_url, number
-    return {"ok": True, "cae": invoice.cae, "pdf": invoice.pdf_url, "n": invoice.number}
+    # El stack de facturación (httpx, requests, proveedor) se carga con el primer pago
+    from app.billing import dedup, outbox
+    from app.billing.dispatcher import dispatcher
+
+    # Reentrega de un pago ya facturado: se responde desde memoria, sin DB ni upstream
+    invoice = dedup.lookup(outbox.payment_id_of(payload))
+    if invoice is not None:
+        return {"ok": True, "duplicate": True, **invoice}
+
+    # Se guarda en el outbox y se responde ya; la factura (cae, pdf_url, number)
+    # la emite el dispatcher en background, con reintentos.
+    state = await run_in_threadpool(dedup.enqueue_once, payload)
+    if state["status"] == "pending":
+        dispatcher.wake()
+    return {"ok": True, "queued": state["status"] != "done", **state}
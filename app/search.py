@@ -0,0 +1,183 @@
+# app/search.py
+# Búsqueda de texto completo sobre los análisis (GET /analysis/search) con FTS5 de SQLite.
+# El índice está partido en SHARDS tablas contentless (content='': sólo índice, sin otra
+# copia de los textos), analyses_fts_<user_id % SHARDS>. bm25 recorre la lista entera de
+# cada término para calcular el IDF: partido, ese costo es el de un shard y no el de la
+# base completa. El rowid es (user_id << 32) | analyses.id, así que acotar al usuario es
+# un rango de rowid (FTS5 lo resuelve salteando en las listas, sin un término extra que
+# bm25 tenga que contar). Columnas: title, input_summary y findings (reglas que
+# dispararon + severidad, vía la función SQL alerttrail_search_terms que registra
+# database.py). Los triggers mantienen el índice en la misma transacción de cada
+# INSERT/UPDATE/DELETE sobre analyses.
+# Reindexado completo, por lotes y sin frenar las escrituras: python -m app.search rebuild
+import re
+
+from sqlalchemy import and_, or_, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models import Analysis
+
+# Fijo: cambiarlo requiere una migración que rearme las tablas
+SHARDS = 16
+REBUILD_BATCH = 5000
+MAX_TERMS = 16
+# Ranking bm25 por columna: el título pesa más que los hallazgos y éstos más que el resumen
+RANK = "bm25(10.0, 1.0, 4.0)"
+
+_ROWID = "(({r}.user_id << 32) | {r}.id)"
+_ROW = _ROWID + ", {r}.title, {r}.input_summary, alerttrail_search_terms({r}.result_json)"
+_COLS = "rowid, title, input_summary, findings"
+_TERM = re.compile(r"(\w+)(\*?)")
+
+
+def table(user_id: int) -> str:
+    return f"analyses_fts_{int(user_id) % SHARDS}"
+
+
+def _delete_old(k: int) -> str:
+    # Un 'delete' de una fila que nunca se indexó corrompe un índice contentless: se chequea %_docsize
+    t = f"analyses_fts_{k}"
+    return (f"INSERT INTO {t}({t}, {_COLS}) SELECT 'delete', {_ROW.format(r='old')} "
+            f"WHERE old.user_id % {SHARDS} = {k} "
+            f"AND EXISTS (SELECT 1 FROM {t}_docsize WHERE id = {_ROWID.format(r='old')});")
+
+
+def _insert_new(k: int) -> str:
+    return (f"INSERT INTO analyses_fts_{k}({_COLS}) SELECT {_ROW.format(r='new')} "
+            f"WHERE new.user_id % {SHARDS} = {k};")
+
+
+def _ddl() -> list[str]:
+    shards = range(SHARDS)
+    stmts = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS analyses_fts_{k} USING fts5("
+        "title, input_summary, findings, content='', tokenize='unicode61 remove_diacritics 2')"
+        for k in shards
+    ]
+    inserts = " ".join(_insert_new(k) for k in shards)
+    deletes = " ".join(_delete_old(k) for k in shards)
+    return stmts + [
+        f"CREATE TRIGGER IF NOT EXISTS analyses_fts_ai AFTER INSERT ON analyses BEGIN {inserts} END",
+        f"CREATE TRIGGER IF NOT EXISTS analyses_fts_ad AFTER DELETE ON analyses BEGIN {deletes} END",
+        "CREATE TRIGGER IF NOT EXISTS analyses_fts_au AFTER UPDATE OF user_id, title, input_summary, result_json "
+        f"ON analyses BEGIN {deletes} {inserts} END",
+    ]
+
+
+def install(conn: Connection):
+    """Tablas FTS5 + triggers (idempotente)."""
+    for stmt in _ddl():
+        conn.execute(text(stmt))
+    for k in range(SHARDS):
+        conn.execute(text(f"INSERT INTO analyses_fts_{k}(analyses_fts_{k}, rank) VALUES ('rank', :rank)"),
+                     {"rank": RANK})
+
+
+def index_pending(conn: Connection, after_id: int, batch: int) -> int | None:
+    """Indexa hasta `batch` filas con id > after_id que todavía no estén en el índice.
+
+    Devuelve el último id recorrido, o None si no quedaban filas.
+    """
+    last = conn.execute(text(
+        "SELECT MAX(id) FROM (SELECT id FROM analyses WHERE id > :after ORDER BY id LIMIT :n)"
+    ), {"after": after_id, "n": batch}).scalar()
+    if last is None:
+        return None
+    # Las filas insertadas mientras tanto ya las indexó el trigger: no se duplican
+    for k in range(SHARDS):
+        conn.execute(text(
+            f"INSERT INTO analyses_fts_{k}({_COLS}) SELECT {_ROW.format(r='a')} FROM analyses a "
+            f"WHERE a.id > :after AND a.id <= :last AND a.user_id % {SHARDS} = {k} "
+            f"AND NOT EXISTS (SELECT 1 FROM analyses_fts_{k}_docsize d WHERE d.id = {_ROWID.format(r='a')})"
+        ), {"after": after_id, "last": last})
+    return last
+
+
+def _command(conn: Connection, command: str):
+    for k in range(SHARDS):
+        conn.execute(text(f"INSERT INTO analyses_fts_{k}(analyses_fts_{k}) VALUES (:c)"), {"c": command})
+
+
+def rebuild(engine: Engine, batch: int = REBUILD_BATCH, log=print) -> int:
+    """Vacía el índice y lo vuelve a armar; cada lote es una transacción corta."""
+    with engine.begin() as conn:
+        install(conn)
+        _command(conn, "delete-all")
+    after = 0
+    while True:
+        with engine.begin() as conn:
+            last = index_pending(conn, after, batch)
+        if last is None:
+            break
+        after = last
+        log(f"indexadas hasta id {last}")
+    with engine.begin() as conn:
+        _command(conn, "optimize")
+    return after
+
+
+def terms(q: str) -> list[tuple[str, bool]]:
+    """Palabras de la consulta (y si piden prefijo con `*`); el resto de la sintaxis FTS5 se ignora."""
+    return [(word, star == "*") for word, star in _TERM.findall(q)][:MAX_TERMS]
+
+
+def match_expr(q: str) -> str | None:
+    words = terms(q)
+    if not words:
+        return None
+    return " AND ".join(f'"{word}"' + ("*" if prefix else "") for word, prefix in words)
+
+
+def search(db: Session, user_id: int, q: str, limit: int, offset: int = 0) -> list:
+    """Filas (id, title, input_summary, result_json) ordenadas por relevancia.
+
+    Se rankean sólo las SEARCH_RANK_WINDOW coincidencias más recientes: bm25 cuesta por
+    fila candidata, y un usuario con cientos de miles de análisis no paga por todas.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return _search_like(db, user_id, q, limit, offset)
+    expr = match_expr(q)
+    if expr is None:
+        return []
+    fts, lo, hi = table(user_id), user_id << 32, ((user_id + 1) << 32) - 1
+    # Sin rank, FTS5 recorre las coincidencias por rowid sin calcular nada
+    floor = db.execute(text(
+        f"SELECT rowid FROM {fts} WHERE {fts} MATCH :m AND rowid BETWEEN :lo AND :hi "
+        "ORDER BY rowid DESC LIMIT 1 OFFSET :w"
+    ), {"m": expr, "lo": lo, "hi": hi, "w": settings.SEARCH_RANK_WINDOW}).scalar()
+    return db.execute(text(
+        "SELECT a.id, a.title, a.input_summary, a.result_json FROM "
+        f"(SELECT rowid, rank FROM {fts} WHERE {fts} MATCH :m AND rowid > :floor AND rowid <= :hi "
+        "ORDER BY rank LIMIT :n OFFSET :o) AS f "
+        "JOIN analyses a ON a.id = (f.rowid & 4294967295) WHERE a.user_id = :uid ORDER BY f.rank"
+    ), {"m": expr, "floor": lo - 1 if floor is None else floor, "hi": hi,
+        "n": limit, "o": offset, "uid": user_id}).all()
+
+
+def _search_like(db: Session, user_id: int, q: str, limit: int, offset: int) -> list:
+    # Sin FTS5 (Postgres): todas las palabras en el título o el resumen, las más nuevas primero
+    words = terms(q)
+    if not words:
+        return []
+    stmt = select(Analysis.id, Analysis.title, Analysis.input_summary, Analysis.result_json).where(
+        Analysis.user_id == user_id,
+        and_(*(or_(Analysis.title.ilike(f"%{w}%"), Analysis.input_summary.ilike(f"%{w}%")) for w, _ in words)),
+    )
+    return db.execute(stmt.order_by(Analysis.created_at.desc(), Analysis.id.desc()).limit(limit).offset(offset)).all()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Índice de búsqueda de análisis (FTS5)")
+    ap.add_argument("command", choices=["rebuild"])
+    ap.add_argument("--batch", type=int, default=REBUILD_BATCH)
+    args = ap.parse_args()
+
+    from .database import engine
+    if engine.dialect.name != "sqlite":
+        raise SystemExit("El índice FTS5 sólo existe en SQLite")
+    last = rebuild(engine, args.batch)
+    print(f"listo: índice reconstruido hasta id {last}")
@@ -0,0 +1,179 @@
+# app/serve.py
+# Modo multi-core (Linux/macOS): python -m app.serve --workers 4 --host 0.0.0.0 --port 10000
+#   1. El padre aplica el esquema (ensure_schema) una sola vez; los workers no lo tocan.
+#   2. Con más de un worker arranca el escritor único (app/writer.py): las escrituras de
+#      run_analysis, register y _force_admin_reset pasan por él, en commits agrupados.
+#   3. Importa app.main una vez y hace fork de N workers de uvicorn, que comparten el
+#      código ya cargado (copy-on-write) y el socket de escucha. Cada worker atiende lecturas.
+#   4. Con más de un worker, el estado que no puede ser por proceso pasa a disco: los jobs
+#      de PDF (PDF_JOBS_DIR, un dir temporal si no está) y el rate limiting (backend sqlite).
+# El padre sólo supervisa: si un worker o el escritor mueren, los vuelve a levantar.
+import argparse
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+
+def _parse_args():
+    ap = argparse.ArgumentParser(description="AlertTrail API con N workers preforkeados")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    ap.add_argument("--writer", choices=["auto", "on", "off"], default="auto",
+                    help="escritor único: auto = sólo con más de un worker")
+    ap.add_argument("--log-level", default="info")
+    return ap.parse_args()
+
+
+def _listen(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _fork(target, *args) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            target(*args)
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def _run_writer(path: str):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # el padre decide cuándo terminar (SIGTERM)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    from . import writer
+    writer.serve(path)
+
+
+def _run_worker(app, sock: socket.socket, log_level: str):
+    import uvicorn
+
+    from .database import engine, read_engine
+    # Conexiones abiertas por el padre no se comparten entre procesos
+    engine.dispose(close=False)
+    read_engine.dispose(close=False)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    config = uvicorn.Config(app, log_level=log_level, timeout_graceful_shutdown=10)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main():
+    if not hasattr(os, "fork"):
+        sys.exit("app.serve necesita fork(); en Windows usá uvicorn app.main:app")
+    args = _parse_args()
+    workers = max(1, args.workers)
+    use_writer = args.writer == "on" or (args.writer == "auto" and workers > 1)
+
+    # Antes de importar la app: settings se lee una vez y los hijos la heredan así
+    os.environ["SCHEMA_ON_STARTUP"] = "false"
+    run_dir = tempfile.mkdtemp(prefix="alerttrail-") if use_writer or workers > 1 else None
+    writer_path = None
+    if use_writer:
+        writer_path = os.path.join(run_dir, "writer.sock")
+        os.environ["WRITER_SOCKET"] = writer_path
+
+    from .config import settings
+    if workers > 1:
+        # El polling de un job puede caer en otro worker, y un límite en memoria valdría N veces
+        if not settings.PDF_JOBS_DIR:
+            settings.PDF_JOBS_DIR = os.path.join(run_dir, "pdf_jobs")
+        if settings.RATE_LIMIT_ENABLED and settings.RATE_LIMIT_BACKEND != "sqlite":
+            print(f"[serve] RATE_LIMIT_BACKEND={settings.RATE_LIMIT_BACKEND} es por proceso: uso sqlite "
+                  f"({settings.RATE_LIMIT_SQLITE_PATH}) para {workers} workers", flush=True)
+            settings.RATE_LIMIT_BACKEND = "sqlite"
+
+    from .startup import phase, report
+    from .database import engine, read_engine
+    from .migrations import ensure_schema
+
+    with phase("serve.schema"):
+        applied = ensure_schema(engine)
+    if applied:
+        print(f"[serve] migraciones aplicadas: {', '.join(applied)}", flush=True)
+    with phase("serve.import_app"):
+        from .main import app
+    engine.dispose()
+    read_engine.dispose()
+
+    sock = _listen(args.host, args.port)
+    children: dict[int, str] = {}
+    stopping = False
+
+    def spawn_writer():
+        if os.path.exists(writer_path):
+            os.unlink(writer_path)
+        pid = _fork(_run_writer, writer_path)
+        children[pid] = "writer"
+        deadline = time.time() + 10
+        while not os.path.exists(writer_path) and time.time() < deadline:
+            time.sleep(0.01)
+
+    def spawn_worker():
+        children[_fork(_run_worker, app, sock, args.log_level)] = "worker"
+
+    def stop(_signum, _frame):
+        nonlocal stopping
+        stopping = True
+        for pid, role in list(children.items()):
+            if role == "worker":
+                _kill(pid, signal.SIGTERM)
+
+    if use_writer:
+        spawn_writer()
+    for _ in range(workers):
+        spawn_worker()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    boot_ms = sum(p["ms"] for p in report()["phases"] if p["name"].startswith("serve."))
+    print(f"[serve] {workers} workers en http://{args.host}:{args.port}"
+          f"{' + escritor único' if use_writer else ''} (padre listo en {boot_ms:.0f} ms)", flush=True)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        role = children.pop(pid, None)
+        if role is None:
+            continue
+        if stopping:
+            # Los workers ya terminaron sus requests: recién ahí se corta el escritor
+            if role == "worker" and not any(r == "worker" for r in children.values()):
+                for wpid in list(children):
+                    _kill(wpid, signal.SIGTERM)
+            continue
+        print(f"[serve] {role} {pid} terminó (status {status}); relanzando", flush=True)
+        time.sleep(0.5)
+        spawn_writer() if role == "writer" else spawn_worker()
+
+    if run_dir:
+        shutil.rmtree(run_dir, ignore_errors=True)  # socket del escritor y jobs de PDF
+
+
+def _kill(pid: int, sig: int):
+    try:
+        os.kill(pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+if __name__ == "__main__":
+    main()
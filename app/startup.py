@@ -0,0 +1,135 @@
+# app/startup.py
+# Arranque en frío: fases medidas, warm-up opcional y perfil de imports.
+#   - phase("nombre"): mide un tramo del arranque (imports de main.py, esquema, warm-up).
+#   - report(): fases + tiempo desde que arrancó el proceso (GET /health/startup).
+#   - WARMUP=startup|background: precarga JWT (python-jose), bcrypt (passlib) y las reglas.
+# Perfil completo (python -X importtime + fases): python -m app.startup [--top 25]
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+_T0 = time.perf_counter()
+_lock = threading.Lock()
+_phases: list[tuple[str, float]] = []
+
+
+def process_age_ms() -> float | None:
+    """Milisegundos desde que arrancó el proceso (Linux; None si no se puede leer /proc)."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round((uptime - start_ticks / os.sysconf("SC_CLK_TCK")) * 1000, 1)
+
+
+@contextmanager
+def phase(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _lock:
+            _phases.append((name, round((time.perf_counter() - t0) * 1000, 2)))
+
+
+def report() -> dict:
+    with _lock:
+        phases = list(_phases)
+    return {
+        "process_age_ms": process_age_ms(),
+        "since_app_import_ms": round((time.perf_counter() - _T0) * 1000, 1),
+        "phases": [{"name": n, "ms": ms} for n, ms in phases],
+    }
+
+
+def warm_up():
+    from .analyzer import get_ruleset
+    from .utils import security
+
+    with phase("warmup.jwt"):
+        security.decode_access_token(security.create_access_token("warmup@alerttrail"))
+    with phase("warmup.bcrypt"):
+        security.pwd_context()
+    with phase("warmup.rules"):
+        get_ruleset()
+
+
+def run_warmup(mode: str):
+    """off: nada; startup: antes de aceptar requests; background: en un thread aparte."""
+    if mode == "startup":
+        warm_up()
+    elif mode == "background":
+        threading.Thread(target=warm_up, name="warmup", daemon=True).start()
+
+
+_CHILD = """
+import asyncio, json
+from app.startup import report
+import app.main as m
+
+async def _run():
+    async with m.app.router.lifespan_context(m.app):
+        pass
+
+asyncio.run(_run())
+print("STARTUP_REPORT " + json.dumps(report()))
+"""
+
+
+def _importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """Líneas de -X importtime -> (nombre con sangría, self µs, cumulative µs)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name[1:].rstrip(), int(self_us), int(cum_us)))
+    return rows
+
+
+def main():
+    import argparse
+    import json
+    import subprocess
+    import sys
+
+    ap = argparse.ArgumentParser(description="Perfil de arranque: imports y fases del startup")
+    ap.add_argument("--top", type=int, default=25)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _CHILD], capture_output=True, text=True)
+    wall = (time.perf_counter() - t0) * 1000
+    if proc.returncode != 0:
+        sys.exit(proc.stderr)
+
+    rows = _importtime(proc.stderr)
+    # Los imports de primer nivel (sin sangría) suman el tiempo total de import
+    top_level = [(name, cum) for name, _self, cum in rows if not name.startswith(" ")]
+    by_pkg: dict[str, int] = {}
+    for name, self_us, _cum in rows:
+        pkg = name.strip().split(".")[0]
+        by_pkg[pkg] = by_pkg.get(pkg, 0) + self_us
+
+    print(f"proceso completo: {wall:.0f} ms   imports: {sum(c for _n, c in top_level) / 1000:.0f} ms\n")
+    print(f"{'paquete':<32} {'ms (self)':>10}")
+    for pkg, us in sorted(by_pkg.items(), key=lambda x: -x[1])[:args.top]:
+        print(f"{pkg:<32} {us / 1000:>10.1f}")
+    print(f"\n{'import de primer nivel (cumulative)':<48} {'ms':>8}")
+    for name, cum in sorted(top_level, key=lambda r: -r[1])[:args.top]:
+        print(f"{name:<48} {cum / 1000:>8.1f}")
+
+    for line in proc.stdout.splitlines():
+        if line.startswith("STARTUP_REPORT "):
+            rep = json.loads(line.split(" ", 1)[1])
+            print(f"\nfases (proceso a los {rep['process_age_ms']} ms al terminar):")
+            for ph in rep["phases"]:
+                print(f"  {ph['name']:<30} {ph['ms']:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
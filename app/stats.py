@@ -0,0 +1,189 @@
+# app/stats.py
+# Estadísticas por usuario (GET /analysis/stats) y cuota diaria de los usuarios sin plan pro.
+# analysis_daily guarda, por (user_id, día UTC), cuántos análisis hubo, cuántos hits
+# sumaron y cuántos terminaron en cada max_severity. record() hace el UPSERT en la misma
+# transacción del INSERT del análisis (writer op "analysis.insert" y POST /analysis/batch),
+# así que ni el dashboard ni la cuota hacen COUNT(*) sobre analyses: leer la cuota es una
+# lectura por PK y las estadísticas, un rango de la PK.
+# Recalcular desde las filas crudas, usuario por usuario: python -m app.stats rebuild
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from .analyzer.rules import SEVERITIES
+from .config import settings
+from .models import Analysis, AnalysisDaily, User
+from .utils import result_codec
+
+SEVERITY_KEYS = ("none",) + SEVERITIES
+COUNTERS = ("total", "hits") + tuple(f"sev_{s}" for s in SEVERITY_KEYS)
+REBUILD_BATCH = 5000
+
+
+class QuotaExceeded(Exception):
+    def __init__(self, limit: int, used: int, retry_after: int):
+        super().__init__(f"cuota diaria de {limit} análisis agotada")
+        self.limit, self.used, self.retry_after = limit, used, retry_after
+
+
+def today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def counters(max_severity: str | None, total_hits: int) -> dict:
+    """Lo que suma un análisis a su fila del día."""
+    sev = max_severity if max_severity in SEVERITIES else "none"
+    return {"total": 1, "hits": int(total_hits or 0), f"sev_{sev}": 1}
+
+
+def _add(acc: dict, c: dict):
+    for key, value in c.items():
+        acc[key] = acc.get(key, 0) + value
+
+
+def record(db: Session, user_id: int, items: list[dict], day: date | None = None):
+    """Suma los counters() de `items` a la fila (user_id, día). No hace commit."""
+    acc: dict = {}
+    for c in items:
+        _add(acc, c)
+    if not acc:
+        return
+    row = {"user_id": user_id, "day": day or today(), **{k: acc.get(k, 0) for k in COUNTERS}}
+    dialect = db.get_bind().dialect.name
+    stmt = (pg_insert if dialect == "postgresql" else sqlite_insert)(AnalysisDaily).values(**row)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["user_id", "day"],
+        set_={k: getattr(AnalysisDaily, k) + getattr(stmt.excluded, k) for k in COUNTERS},
+    ))
+
+
+# ---------------- Cuota ----------------
+def used_today(db: Session, user_id: int) -> int:
+    return db.execute(
+        select(AnalysisDaily.total).where(AnalysisDaily.user_id == user_id, AnalysisDaily.day == today())
+    ).scalar() or 0
+
+
+def daily_limit(user) -> int | None:
+    limit = settings.FREE_DAILY_ANALYSES
+    return None if getattr(user, "is_pro", False) or limit <= 0 else limit
+
+
+def check_quota(db: Session, user, n: int = 1):
+    """QuotaExceeded si `n` análisis más superan la cuota diaria del usuario.
+
+    Es un chequeo antes del INSERT, no una reserva: requests simultáneos del mismo
+    usuario pueden pasarse por unos pocos análisis.
+    """
+    limit = daily_limit(user)
+    if limit is None:
+        return
+    used = used_today(db, user.id)
+    if used + n > limit:
+        midnight = datetime.combine(today() + timedelta(days=1), time(), tzinfo=timezone.utc)
+        retry = int((midnight - datetime.now(timezone.utc)).total_seconds()) + 1
+        raise QuotaExceeded(limit, used, retry)
+
+
+# ---------------- Dashboard ----------------
+def _by_severity(values: dict) -> dict:
+    return {s: values[f"sev_{s}"] for s in SEVERITY_KEYS}
+
+
+def summary(db: Session, user, days: int) -> dict:
+    """Últimos `days` días (sólo los que tuvieron análisis), totales del período y cuota."""
+    since = today() - timedelta(days=days - 1)
+    rows = db.execute(
+        select(AnalysisDaily).where(AnalysisDaily.user_id == user.id, AnalysisDaily.day >= since)
+        .order_by(AnalysisDaily.day)
+    ).scalars().all()
+    totals = dict.fromkeys(COUNTERS, 0)
+    out = []
+    for r in rows:
+        values = {k: getattr(r, k) for k in COUNTERS}
+        _add(totals, values)
+        out.append({"day": r.day.isoformat(), "total": r.total, "hits": r.hits, "by_severity": _by_severity(values)})
+    limit = daily_limit(user)
+    used = rows[-1].total if rows and rows[-1].day == today() else 0
+    return {
+        "since": since.isoformat(),
+        "days": out,
+        "totals": {"total": totals["total"], "hits": totals["hits"], "by_severity": _by_severity(totals)},
+        "quota": {"daily_limit": limit, "used_today": used, "remaining": None if limit is None else max(0, limit - used)},
+    }
+
+
+# ---------------- Recalcular desde analyses ----------------
+def _aggregate(conn: Connection, user_id: int, after_id: int = 0, acc: dict | None = None) -> tuple[dict, int]:
+    """Contadores por día de las filas del usuario con id > after_id; devuelve (acumulado, último id)."""
+    acc = acc if acc is not None else defaultdict(dict)
+    last = after_id
+    stmt = (
+        select(Analysis.id, Analysis.created_at, Analysis.result_json)
+        .where(Analysis.user_id == user_id, Analysis.id > after_id)
+        .execution_options(stream_results=True, yield_per=REBUILD_BATCH)
+    )
+    for row in conn.execute(stmt):
+        result = result_codec.loads(row.result_json)
+        created = row.created_at
+        if isinstance(created, datetime) and created.tzinfo is not None:
+            created = created.astimezone(timezone.utc)
+        day = created.date() if isinstance(created, datetime) else today()
+        _add(acc[day], counters(result.get("max_severity"), result.get("total_hits", 0)))
+        last = max(last, row.id)
+    return acc, last
+
+
+def _insert(conn: Connection, user_id: int, acc: dict):
+    rows = [{"user_id": user_id, "day": day, **{k: c.get(k, 0) for k in COUNTERS}} for day, c in acc.items()]
+    if rows:
+        conn.execute(insert(AnalysisDaily), rows)
+
+
+def recompute_user(conn: Connection, user_id: int):
+    """Rehace las filas de un usuario dentro de la transacción de `conn` (lo usa la migración)."""
+    conn.execute(delete(AnalysisDaily).where(AnalysisDaily.user_id == user_id))
+    _insert(conn, user_id, _aggregate(conn, user_id)[0])
+
+
+def rebuild(engine: Engine, log=print) -> int:
+    """Recalcula todos los usuarios; devuelve cuántos.
+
+    Por usuario, las filas se leen fuera de la transacción de escritura y después, ya con
+    el lock (lo toma el DELETE), se suman las que entraron mientras tanto: la base no queda
+    bloqueada para escribir mientras se recorre un historial largo.
+    """
+    done, after_user = 0, 0
+    while True:
+        with engine.connect() as conn:
+            user_ids = conn.execute(
+                select(User.id).where(User.id > after_user).order_by(User.id).limit(REBUILD_BATCH)
+            ).scalars().all()
+        if not user_ids:
+            return done
+        for user_id in user_ids:
+            with engine.connect() as conn:
+                acc, last = _aggregate(conn, user_id)
+            with engine.begin() as conn:
+                conn.execute(delete(AnalysisDaily).where(AnalysisDaily.user_id == user_id))
+                acc, _ = _aggregate(conn, user_id, last, acc)
+                _insert(conn, user_id, acc)
+            done += 1
+        after_user = user_ids[-1]
+        log(f"usuarios recalculados: {done}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Rollups de analysis_daily")
+    ap.add_argument("command", choices=["rebuild"])
+    ap.parse_args()
+
+    from .database import engine
+    print(f"listo: {rebuild(engine)} usuarios")
@@ -0,0 +1,128 @@
+# app/utils/compression.py
+# Compresión de respuestas (ASGI puro): brotli si el cliente lo acepta y está instalado
+# el paquete `brotli`; si no, gzip. Sólo tipos de texto (JSON, NDJSON, HTML...) y desde
+# COMPRESSION_MIN_BYTES: las respuestas chicas, los 304 y los PDFs pasan sin tocar.
+# Las respuestas en streaming (NDJSON) se comprimen trozo por trozo, con flush por trozo
+# para que el cliente las pueda ir procesando.
+import zlib
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+
+from ..config import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "application/javascript", "text/")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """"br", "gzip" o None según Accept-Encoding (respeta q=0)."""
+    prefs = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        prefs[name.strip()] = q
+    star = prefs.get("*", 0.0)
+    if brotli is not None and prefs.get("br", star) > 0:
+        return "br"
+    if prefs.get("gzip", star) > 0:
+        return "gzip"
+    return None
+
+
+class _Gzip:
+    def __init__(self, level: int):
+        self._c = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: formato gzip
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.compress(data) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes) -> bytes:
+        return self._c.compress(data) + self._c.flush()
+
+
+class _Brotli:
+    def __init__(self, quality: int):
+        self._c = brotli.Compressor(quality=quality)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.finish()
+
+
+def _compressible(start: dict, headers: MutableHeaders) -> bool:
+    if not 200 <= start["status"] < 300 or start["status"] == 204 or "content-encoding" in headers:
+        return False
+    return headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_BYTES if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accept = ""
+        for name, value in scope.get("headers") or ():
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept) if accept else None
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start: Optional[dict] = None
+        encoder = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, encoder, passthrough
+            if message["type"] == "http.response.start":
+                start = message  # se manda junto con el primer trozo del body
+                return
+            if passthrough or message["type"] != "http.response.body":
+                if start is not None:
+                    await send(start)
+                    start = None
+                passthrough = True
+                return await send(message)
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if encoder is None:
+                headers = MutableHeaders(raw=list(start["headers"]))
+                pending_start, start = start, None
+                if not _compressible(pending_start, headers):
+                    passthrough = True
+                    await send(pending_start)
+                    return await send(message)
+                headers.add_vary_header("Accept-Encoding")
+                if not more and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send({**pending_start, "headers": headers.raw})
+                    return await send(message)
+                encoder = (_Brotli(settings.COMPRESSION_BROTLI_QUALITY) if encoding == "br"
+                           else _Gzip(settings.COMPRESSION_GZIP_LEVEL))
+                del headers["content-length"]
+                headers["content-encoding"] = encoding
+                await send({**pending_start, "headers": headers.raw})
+
+            out = encoder.chunk(body) if more else encoder.finish(body)
+            await send({"type": "http.response.body", "body": out, "more_body": more})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,130 @@
+# app/utils/export.py
+# Export masivo de los análisis de un usuario (GET /analysis/export), siempre en streaming:
+#   zip    -> un PDF por análisis; los renders van al pool de pdf_jobs con a lo sumo
+#             EXPORT_PDF_INFLIGHT en curso, y cada entrada sale apenas está lista
+#   csv    -> una fila por análisis (resumen + result_json crudo)
+#   ndjson -> lo mismo que GET /analysis?format=ndjson, desde el principio
+# Las filas vienen de un cursor del lado del servidor (yield_per): la memoria depende de
+# las entradas en vuelo, no de cuántos análisis tenga el usuario.
+import csv
+import io
+import time
+import zipfile
+from collections import deque
+from datetime import datetime
+from typing import Callable, Iterator
+
+from ..config import settings
+from . import pdf_cache, pdf_jobs, result_codec
+
+CSV_COLUMNS = ("id", "created_at", "title", "max_severity", "total_hits", "input_summary", "result_json")
+
+
+class _ZipSink:
+    """Destino de zipfile sin seek (zipfile usa data descriptors): se vacía después de cada entrada."""
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._pos = 0
+
+    def write(self, data) -> int:
+        self._buf += data
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        out = bytes(self._buf)
+        self._buf.clear()
+        return out
+
+
+def _zip_time(created_at) -> tuple:
+    dt = created_at if isinstance(created_at, datetime) else datetime.now()
+    return max(dt.timetuple()[:6], (1980, 1, 1, 0, 0, 0))
+
+
+def _submit_pdf(title: str, input_summary: str, stored) -> Callable[[], bytes]:
+    """Arranca el PDF de una fila y devuelve cómo obtenerlo (cache o pool)."""
+    path = pdf_cache.get(pdf_cache.key_for(title, input_summary, stored))
+    if path:
+        def from_cache() -> bytes:
+            try:
+                with open(path, "rb") as f:
+                    return f.read()
+            except OSError:  # lo desalojaron en el medio
+                return pdf_jobs.render(title, input_summary, result_codec.loads(stored))
+        return from_cache
+    # Siempre al pool (aunque el reporte sea chico): el paralelismo es lo que acorta el export
+    result = result_codec.loads(stored)
+    deadline = time.monotonic() + settings.PDF_RENDER_TIMEOUT_SECONDS
+    while True:
+        try:
+            fut = pdf_jobs.render_async(title, input_summary, result)
+            break
+        except pdf_jobs.QueueFull:
+            # Otros requests llenaron la cola: el export espera en vez de cortar el ZIP a la mitad
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+    return lambda: fut.result(timeout=settings.PDF_RENDER_TIMEOUT_SECONDS)[0]
+
+
+def zip_pdfs(rows: Iterator) -> Iterator[bytes]:
+    """Filas (id, title, input_summary, result_json, created_at) -> bytes de un ZIP con un PDF por fila."""
+    sink = _ZipSink()
+    inflight: deque = deque()
+
+    def write_entry(zf: zipfile.ZipFile, row, get_pdf: Callable[[], bytes]):
+        try:
+            data, name = get_pdf(), f"analysis_{row.id}.pdf"
+        except Exception as e:
+            data, name = f"No se pudo generar el PDF: {e}\n".encode(), f"analysis_{row.id}.error.txt"
+        info = zipfile.ZipInfo(name, date_time=_zip_time(row.created_at))
+        info.compress_type = zipfile.ZIP_STORED  # el PDF ya viene comprimido
+        zf.writestr(info, data)
+
+    # Si el cliente corta, a lo sumo EXPORT_PDF_INFLIGHT renders terminan y se descartan
+    with zipfile.ZipFile(sink, "w") as zf:
+        for row in rows:
+            inflight.append((row, _submit_pdf(row.title, row.input_summary, row.result_json)))
+            if len(inflight) >= settings.EXPORT_PDF_INFLIGHT:
+                write_entry(zf, *inflight.popleft())
+                yield sink.take()
+        while inflight:
+            write_entry(zf, *inflight.popleft())
+            yield sink.take()
+    yield sink.take()  # directorio central
+
+
+def _csv_cell(value):
+    # Evita que Excel/Sheets interpreten títulos o logs como fórmulas
+    if isinstance(value, str) and value[:1] in ("=", "+", "-", "@", "\t", "\r"):
+        return "'" + value
+    return value
+
+
+def csv_rows(chunks: Iterator) -> Iterator[bytes]:
+    """Tandas de filas (id, title, input_summary, result_json, created_at) -> CSV por tanda."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(CSV_COLUMNS)
+    for chunk in chunks:
+        for row in chunk:
+            result = result_codec.loads(row.result_json)
+            created = row.created_at.isoformat() if isinstance(row.created_at, datetime) else row.created_at
+            writer.writerow((
+                row.id, created, _csv_cell(row.title), result.get("max_severity") or "",
+                result.get("total_hits", 0), _csv_cell(row.input_summary),
+                result_codec.raw(row.result_json).decode(),
+            ))
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
@@ -0,0 +1,77 @@
+# app/utils/memo.py
+# Memo de resultados de POST /analysis por contenido: los shippers reenvían el mismo
+# payload (reintentos, rotaciones) y cada duplicado se volvía a analizar y guardar.
+# Clave: sha256 de motor + digest del ruleset + contenido normalizado, por usuario.
+# Cambiar las reglas cambia el digest, así que un resultado viejo nunca se reusa.
+#   1. LRU en proceso (ANALYSIS_MEMO_MAXSIZE entradas)
+#   2. analyses.content_hash, indexado con user_id (lo ven todos los workers)
+# Lo que se guarda es la parte del resultado que depende del contenido; title_length
+# se recalcula con el título de cada request.
+import hashlib
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..analyzer import ENGINE_VERSION, get_ruleset
+from ..config import settings
+from ..models import Analysis
+from . import metrics, result_codec
+from .principal_cache import TTLCache
+
+_lru = TTLCache(settings.ANALYSIS_MEMO_MAXSIZE, float("inf"))
+_db_hits = 0
+
+
+@dataclass(frozen=True)
+class Memo:
+    analysis_id: int
+    input_summary: str
+    result: dict
+
+
+def normalize(content: str) -> str:
+    """Fin de línea \\n y sin espacios al final: un log con CRLF o un \\n extra es el mismo log.
+
+    Sólo para la clave: el análisis corre sobre el contenido original, así que una copia
+    con otros fines de línea reusa el resultado (offsets incluidos) de la primera.
+    """
+    return content.replace("\r\n", "\n").replace("\r", "\n").rstrip()
+
+
+def content_hash(content: str) -> str:
+    """Hash del contenido ya normalizado + versión del motor y de las reglas."""
+    h = hashlib.sha256(f"{ENGINE_VERSION}\0{get_ruleset().digest}\0".encode())
+    h.update(content.encode("utf-8", "surrogatepass"))
+    return h.hexdigest()
+
+
+def lookup(db: Session, user_id: int, key: str) -> Optional[Memo]:
+    global _db_hits
+    memo = _lru.get((user_id, key))
+    if memo is not None:
+        metrics.analysis_memo.inc("lru")
+        return memo
+    row = db.execute(
+        select(Analysis.id, Analysis.input_summary, Analysis.result_json)
+        .where(Analysis.user_id == user_id, Analysis.content_hash == key)
+        .order_by(Analysis.id.desc()).limit(1)
+    ).first()
+    if row is None:
+        metrics.analysis_memo.inc("miss")
+        return None
+    metrics.analysis_memo.inc("db")
+    _db_hits += 1
+    return _lru.set((user_id, key), Memo(row.id, row.input_summary, result_codec.loads(row.result_json)))
+
+
+def remember(user_id: int, key: str, analysis_id: int, input_summary: str, result: dict):
+    _lru.set((user_id, key), Memo(analysis_id, input_summary, result))
+
+
+def stats() -> dict:
+    lru = _lru.stats()
+    misses = lru["misses"] - _db_hits  # los misses del LRU que la base tampoco encontró
+    total = lru["hits"] + lru["misses"]
+    return {**lru, "db_hits": _db_hits, "hit_rate": round((total - misses) / total, 4) if total else None}
@@ -0,0 +1,166 @@
+# app/utils/metrics.py
+# Métricas en proceso con salida en formato texto de Prometheus (GET /metrics).
+# Pensado para quedar prendido en producción:
+#   - buckets fijos: cada serie es una lista de enteros preasignada, observe() hace
+#     un bisect y un += bajo un lock;
+#   - las series se crean una vez por combinación de labels (ruta, método...), no por request;
+#   - el acumulador de queries por request es una lista [n, segundos] en un ContextVar.
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_registry: list = []
+_gauges: list[tuple[str, str, Callable[[], float]]] = []
+
+
+def _esc(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_esc(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _fmt_num(v: float) -> str:
+    return repr(float(v)) if v != int(v) else str(int(v))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        for labels, v in items:
+            out.append(f"{self.name}{_fmt_labels(self.labelnames, labels)} {_fmt_num(v)}")
+        return out
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.buckets = tuple(buckets)
+        # labels -> [conteo por bucket..., conteo +Inf, suma]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, *labels):
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(labels)
+            if s is None:
+                s = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            s[idx] += 1
+            s[-1] += value
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(s)) for labels, s in self._series.items()]
+        names = self.labelnames + ("le",)
+        for labels, s in items:
+            acc = 0
+            for bound, n in zip(self.buckets + (float("inf"),), s[:-1]):
+                acc += n
+                le = "+Inf" if bound == float("inf") else _fmt_num(bound)
+                out.append(f"{self.name}_bucket{_fmt_labels(names, labels + (le,))} {acc}")
+            base = _fmt_labels(self.labelnames, labels)
+            out.append(f"{self.name}_sum{base} {s[-1]!r}")
+            out.append(f"{self.name}_count{base} {acc}")
+        return out
+
+
+def gauge(name: str, help: str, fn: Callable[[], float]):
+    """Gauge calculado al momento de exportar (p.ej. cola del pool de PDFs)."""
+    _gauges.append((name, help, fn))
+
+
+def render() -> str:
+    lines: list[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for name, help, fn in _gauges:
+        try:
+            value = fn()
+        except Exception:
+            continue
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {_fmt_num(value)}"]
+    return "\n".join(lines) + "\n"
+
+
+# ---------------- Métricas de la app ----------------
+http_requests = Counter("http_requests_total", "Requests HTTP por ruta y status", ("method", "route", "status"))
+http_latency = Histogram("http_request_duration_seconds", "Latencia por ruta", ("method", "route"))
+db_queries = Histogram("db_queries_per_request", "Queries SQL por request", ("route",), QUERY_COUNT_BUCKETS)
+db_time = Histogram("db_time_per_request_seconds", "Tiempo en la base por request", ("route",))
+db_queries_total = Counter("db_queries_total", "Queries SQL ejecutadas (con o sin request)")
+pdf_render = Histogram("pdf_render_seconds", "Render de PDFs con ReportLab", ("mode",))
+bcrypt_ops = Histogram("bcrypt_seconds", "Hash/verify de bcrypt (incluye la espera en la cola)", ("op",))
+analysis_memo = Counter("analysis_memo_lookups_total", "Memo de POST /analysis por resultado", ("result",))
+facturante_calls = Histogram("facturante_request_seconds", "Llamadas a la API de Facturante", ("outcome",))
+
+# [queries, segundos] del request en curso; None fuera de un request
+_db_acc: ContextVar[Optional[list]] = ContextVar("db_acc", default=None)
+
+
+def record_query(seconds: float):
+    db_queries_total.inc()
+    acc = _db_acc.get()
+    if acc is not None:
+        acc[0] += 1
+        acc[1] += seconds
+
+
+class MetricsMiddleware:
+    """ASGI puro: cuenta requests, mide latencia y junta queries/tiempo de DB por request.
+
+    La ruta es la plantilla (p.ej. /analysis/{analysis_id}/pdf), así la cantidad de series
+    queda acotada; lo que no matchea ninguna ruta va como "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        acc = [0, 0.0]
+        token = _db_acc.set(acc)
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - t0
+            _db_acc.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_requests.inc(method, path, status[0])
+            http_latency.observe(elapsed, method, path)
+            db_queries.observe(acc[0], path)
+            db_time.observe(acc[1], path)
@@ -0,0 +1,90 @@
+# app/utils/password_pool.py
+# Executor dedicado para bcrypt. Los handlers de login/registro esperan acá en vez de
+# ocupar el threadpool compartido de AnyIO, y si la cola se llena se rechaza al toque (503).
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from ..config import settings
+from . import metrics, security
+
+
+class Busy(Exception):
+    """Demasiados hashes pendientes: el caller debe responder 503."""
+
+
+_lock = threading.Lock()
+_executor: Optional[Executor] = None
+_inflight = 0
+metrics.gauge("bcrypt_inflight", "Hashes de bcrypt en curso o en cola", lambda: _inflight)
+_stats = {"calls": 0, "rejected": 0, "rehashed": 0, "ms_total": 0.0, "ms_max": 0.0}
+
+
+def _get_executor() -> Executor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            if settings.PASSWORD_POOL_MODE == "processes":
+                _executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_POOL_WORKERS)
+            else:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.PASSWORD_POOL_WORKERS, thread_name_prefix="bcrypt"
+                )
+        return _executor
+
+
+async def _run(op: str, fn, *args):
+    global _inflight
+    with _lock:
+        if _inflight >= settings.PASSWORD_QUEUE_MAX:
+            _stats["rejected"] += 1
+            raise Busy()
+        _inflight += 1
+    t0 = time.perf_counter()
+    try:
+        return await asyncio.wrap_future(_get_executor().submit(fn, *args))
+    finally:
+        ms = (time.perf_counter() - t0) * 1000
+        metrics.bcrypt_ops.observe(ms / 1000, op)
+        with _lock:
+            _inflight -= 1
+            _stats["calls"] += 1
+            _stats["ms_total"] += ms
+            _stats["ms_max"] = max(_stats["ms_max"], ms)
+
+
+async def hash_password(password: str) -> str:
+    return await _run("hash", security.get_password_hash, password)
+
+
+async def verify_and_update(password: str, hashed: str) -> tuple[bool, Optional[str]]:
+    if not hashed:
+        return False, None
+    ok, new_hash = await _run("verify", security.verify_and_update, password, hashed)
+    if new_hash:
+        with _lock:
+            _stats["rehashed"] += 1
+    return ok, new_hash
+
+
+def stats() -> dict:
+    with _lock:
+        calls = _stats["calls"]
+        return {
+            "mode": settings.PASSWORD_POOL_MODE,
+            "workers": settings.PASSWORD_POOL_WORKERS,
+            "inflight": _inflight,
+            "queue_max": settings.PASSWORD_QUEUE_MAX,
+            **_stats,
+            "ms_avg": round(_stats["ms_total"] / calls, 2) if calls else 0.0,
+        }
+
+
+def shutdown():
+    global _executor
+    with _lock:
+        ex, _executor = _executor, None
+    if ex:
+        ex.shutdown(wait=False, cancel_futures=True)
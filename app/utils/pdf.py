@@ -1,8 +1,13 @@
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
 from io import BytesIO
 
+# Subir cuando cambie el layout: invalida el cache de PDFs en disco
+PDF_TEMPLATE_VERSION = "1"
+
 def build_analysis_pdf(title: str, content: str, result: dict) -> bytes:
+    # ReportLab pesa en el arranque: se importa en el primer render (en el worker del pool)
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
     buffer = BytesIO()
     c = canvas.Canvas(buffer, pagesize=A4)
     w, h = A4
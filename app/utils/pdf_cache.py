@@ -0,0 +1,145 @@
+# app/utils/pdf_cache.py
+# Cache en disco de PDFs renderizados, direccionado por contenido.
+# Los análisis no cambian después de creados, así que la clave (hash de título,
+# resumen, resultado y versión de plantilla) sirve también como ETag fuerte.
+# LRU por mtime: cada hit "toca" el archivo y al pasar el límite se borran los más viejos.
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Optional
+
+from ..config import settings
+from .pdf import PDF_TEMPLATE_VERSION
+
+_lock = threading.Lock()
+_total_bytes: Optional[int] = None  # se calcula al primer uso
+_stats = {"hits": 0, "misses": 0, "writes": 0, "write_errors": 0, "evictions": 0}
+
+
+def enabled() -> bool:
+    return bool(settings.PDF_CACHE_DIR) and settings.PDF_CACHE_MAX_BYTES > 0
+
+
+def key_for(title: str, input_summary: str, result_json) -> str:
+    h = hashlib.sha256()
+    raw = result_json if isinstance(result_json, bytes) else (result_json or "").encode()
+    for part in (PDF_TEMPLATE_VERSION.encode(), (title or "").encode(), (input_summary or "").encode(), raw):
+        h.update(len(part).to_bytes(8, "big"))
+        h.update(part)
+    return h.hexdigest()
+
+
+def etag_for(key: str) -> str:
+    return f'"{key}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _path(key: str) -> str:
+    return os.path.join(settings.PDF_CACHE_DIR, key[:2], key + ".pdf")
+
+
+def _scan() -> list[tuple[float, int, str]]:
+    entries = []
+    for root, _dirs, files in os.walk(settings.PDF_CACHE_DIR):
+        for name in files:
+            if not name.endswith(".pdf"):
+                continue
+            p = os.path.join(root, name)
+            try:
+                st = os.stat(p)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+    return entries
+
+
+def _ensure_total() -> int:
+    global _total_bytes
+    if _total_bytes is None:
+        _total_bytes = sum(size for _m, size, _p in _scan())
+    return _total_bytes
+
+
+def get(key: str) -> Optional[str]:
+    """Path del PDF cacheado (y lo marca como recién usado) o None."""
+    if not enabled():
+        return None
+    p = _path(key)
+    try:
+        os.utime(p)
+    except FileNotFoundError:
+        with _lock:
+            _stats["misses"] += 1
+        return None
+    with _lock:
+        _stats["hits"] += 1
+    return p
+
+
+def _evict_locked():
+    global _total_bytes
+    # Bajamos al 90% para no desalojar en cada escritura
+    target = int(settings.PDF_CACHE_MAX_BYTES * 0.9)
+    for _mtime, size, p in sorted(_scan()):
+        if _total_bytes <= target:
+            break
+        try:
+            os.remove(p)
+        except FileNotFoundError:
+            continue
+        _total_bytes -= size
+        _stats["evictions"] += 1
+
+
+def put(key: str, pdf: bytes) -> Optional[str]:
+    """Guarda el PDF de forma atómica y devuelve su path.
+
+    None si el cache está apagado o no se pudo escribir (disco lleno, permisos): el
+    caller sirve los bytes que ya tiene.
+    """
+    global _total_bytes
+    if not enabled():
+        return None
+    p = _path(key)
+    tmp = None
+    try:
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(p), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf)
+        existed = os.path.exists(p)
+        os.replace(tmp, p)
+    except OSError:
+        if tmp:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+        with _lock:
+            _stats["write_errors"] += 1
+        return None
+    with _lock:
+        _ensure_total()
+        _stats["writes"] += 1
+        if not existed:
+            _total_bytes += len(pdf)
+        if _total_bytes > settings.PDF_CACHE_MAX_BYTES:
+            _evict_locked()
+    return p
+
+
+def stats() -> dict:
+    with _lock:
+        return {
+            "enabled": enabled(),
+            "bytes": _ensure_total() if enabled() else 0,
+            "max_bytes": settings.PDF_CACHE_MAX_BYTES,
+            **_stats,
+        }
@@ -0,0 +1,329 @@
+# app/utils/pdf_jobs.py
+# Render de PDFs fuera del request: pool de procesos (ReportLab no suelta el GIL)
+# + registro de jobs asincrónicos para POST /analysis/{id}/pdf/jobs: en memoria, o con
+# PDF_JOBS_DIR un JSON por job en disco (app.serve lo setea con varios workers: el
+# polling puede caer en un worker distinto del que encoló el job).
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field
+from functools import partial
+from typing import Optional
+
+from ..config import settings
+from . import metrics, pdf_cache
+from .pdf import build_analysis_pdf
+
+
+class QueueFull(Exception):
+    """La cola del pool está llena: el caller debe responder 503."""
+
+
+class RenderTimeout(Exception):
+    """El render no terminó en PDF_RENDER_TIMEOUT_SECONDS (sigue en el pool): el caller debe responder 504."""
+
+
+# Un job pendiente más allá de PDF_RENDER_TIMEOUT_SECONDS + esto se da por perdido (el worker
+# que lo encoló se cayó o se reinició y nadie va a escribir el resultado)
+PENDING_GRACE_SECONDS = 60
+
+
+@dataclass
+class PdfJob:
+    id: str
+    analysis_id: int
+    user_id: int
+    status: str = "pending"  # pending | done | error
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    pdf: Optional[bytes] = None
+    path: Optional[str] = None  # PDF en el cache de disco (en vez de pdf en memoria)
+    error: Optional[str] = None
+
+    def abandoned(self, now: Optional[float] = None) -> bool:
+        deadline = self.created_at + settings.PDF_RENDER_TIMEOUT_SECONDS + PENDING_GRACE_SECONDS
+        return self.status == "pending" and (now or time.time()) > deadline
+
+
+class _MemoryJobs:
+    """Jobs de este proceso (uvicorn con un solo worker)."""
+
+    def __init__(self):
+        self._jobs: "OrderedDict[str, PdfJob]" = OrderedDict()
+
+    def save(self, job: PdfJob):
+        # Sólo se desalojan jobs terminados (o abandonados), los más viejos primero: uno en curso
+        # no puede desaparecer mientras el cliente lo consulta (los pendientes los acota PDF_QUEUE_MAX)
+        with _lock:
+            self._jobs[job.id] = job
+            excess = len(self._jobs) - settings.PDF_JOBS_MAX_KEPT
+            if excess > 0:
+                now = time.time()
+                done = [j.id for j in self._jobs.values() if j.status != "pending" or j.abandoned(now)]
+                for old in done[:excess]:
+                    del self._jobs[old]
+
+    def keep_pdf(self, job: PdfJob, pdf: bytes):
+        job.pdf = pdf
+
+    def get(self, job_id: str) -> Optional[PdfJob]:
+        return self._jobs.get(job_id)
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+
+class _FileJobs:
+    """<PDF_JOBS_DIR>/<id>.json (+ <id>.pdf si el PDF no quedó en el cache), visible para todos los workers."""
+
+    _ID = re.compile(r"[0-9a-f]{32}")
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, job_id: str, ext: str) -> str:
+        return os.path.join(self.path, job_id + ext)
+
+    def _write(self, dest: str, data: bytes):
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, dest)
+
+    def save(self, job: PdfJob):
+        data = {k: v for k, v in asdict(job).items() if k != "pdf"}
+        self._write(self._file(job.id, ".json"), json.dumps(data).encode())
+        self._prune()
+
+    def keep_pdf(self, job: PdfJob, pdf: bytes):
+        path = self._file(job.id, ".pdf")
+        self._write(path, pdf)
+        job.path = path
+
+    def get(self, job_id: str) -> Optional[PdfJob]:
+        if not self._ID.fullmatch(job_id):
+            return None
+        try:
+            with open(self._file(job_id, ".json"), "rb") as f:
+                return PdfJob(**json.loads(f.read()))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def _entries(self) -> list[tuple[float, str]]:
+        out = []
+        for name in os.listdir(self.path):
+            if name.endswith(".json"):
+                try:
+                    out.append((os.stat(os.path.join(self.path, name)).st_mtime, name[:-5]))
+                except FileNotFoundError:
+                    continue
+        return sorted(out)
+
+    def _prune(self):
+        # Igual que en memoria: se borran los terminados (o abandonados) más viejos, nunca uno en curso
+        entries = self._entries()
+        excess = len(entries) - settings.PDF_JOBS_MAX_KEPT
+        now = time.time()
+        for _mtime, job_id in entries:
+            if excess <= 0:
+                break
+            job = self.get(job_id)
+            if job is None or (job.status == "pending" and not job.abandoned(now)):
+                continue
+            for ext in (".json", ".pdf"):
+                try:
+                    os.remove(self._file(job_id, ext))
+                except FileNotFoundError:
+                    pass
+            excess -= 1
+
+    def __len__(self) -> int:
+        return len(self._entries())
+
+
+_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+_jobs = _FileJobs(settings.PDF_JOBS_DIR) if settings.PDF_JOBS_DIR else _MemoryJobs()
+_pending = 0
+metrics.gauge("pdf_queue_pending", "Renders de PDF en curso o en cola", lambda: _pending)
+_stats = {"renders": 0, "inline_renders": 0, "errors": 0, "rejected": 0, "render_ms_total": 0.0, "render_ms_max": 0.0}
+
+
+def _render(title: str, content: str, result: dict) -> tuple[bytes, float]:
+    # Corre en el proceso worker; devuelve también el tiempo de render
+    t0 = time.perf_counter()
+    pdf = build_analysis_pdf(title, content, result)
+    return pdf, (time.perf_counter() - t0) * 1000
+
+
+def _mp_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else methods[0])
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            # forkserver: los procesos del pool no heredan los sockets del worker (con fork, un
+            # pool huérfano retenía el socket de escucha de app.serve y el puerto quedaba tomado)
+            _pool = ProcessPoolExecutor(max_workers=settings.PDF_POOL_WORKERS, mp_context=_mp_context())
+        return _pool
+
+
+def _discard_pool(broken: Optional[ProcessPoolExecutor] = None):
+    """Descarta el pool actual (o sólo `broken`, si todavía es el actual): el próximo submit arma uno nuevo."""
+    global _pool
+    with _lock:
+        if broken is not None and _pool is not broken:
+            return  # ya se reemplazó
+        pool, _pool = _pool, None
+    if pool:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _record(ms: float, inline: bool = False):
+    metrics.pdf_render.observe(ms / 1000, "inline" if inline else "pool")
+    with _lock:
+        _stats["inline_renders" if inline else "renders"] += 1
+        _stats["render_ms_total"] += ms
+        _stats["render_ms_max"] = max(_stats["render_ms_max"], ms)
+
+
+def _submit(title: str, content: str, result: dict) -> Future:
+    global _pending
+    with _lock:
+        if _pending >= settings.PDF_QUEUE_MAX:
+            _stats["rejected"] += 1
+            raise QueueFull()
+        _pending += 1
+    try:
+        pool = _get_pool()
+        try:
+            fut = pool.submit(_render, title, content, result)
+        except BrokenProcessPool:
+            # Un worker murió sin render en curso (nadie lo vio en _on_done): como no había
+            # nada corriendo, se arma un pool nuevo y se reintenta una vez
+            _discard_pool(pool)
+            pool = _get_pool()
+            fut = pool.submit(_render, title, content, result)
+    except Exception:
+        # Sin Future no hay _on_done que descuente
+        with _lock:
+            _pending -= 1
+            _stats["errors"] += 1
+        raise
+    fut.add_done_callback(partial(_on_done, pool))
+    return fut
+
+
+def _on_done(pool: ProcessPoolExecutor, fut: Future):
+    global _pending
+    with _lock:
+        _pending -= 1
+    if fut.exception() is not None:
+        with _lock:
+            _stats["errors"] += 1
+        if isinstance(fut.exception(), BrokenProcessPool):
+            # El worker murió con este render en curso (render, render_async o un job): sin
+            # esto el pool roto rechazaría todos los submits siguientes
+            _discard_pool(pool)
+        return
+    _record(fut.result()[1])
+
+
+def is_small(content: str, result_json: str) -> bool:
+    return len(content or "") + len(result_json or "") <= settings.PDF_INLINE_MAX_BYTES
+
+
+def render(title: str, content: str, result: dict, inline: bool = False) -> bytes:
+    """Render sincrónico. inline=True usa el proceso actual (camino rápido para reportes chicos)."""
+    if inline:
+        pdf, ms = _render(title, content, result)
+        _record(ms, inline=True)
+        return pdf
+    try:
+        return _submit(title, content, result).result(timeout=settings.PDF_RENDER_TIMEOUT_SECONDS)[0]
+    except TimeoutError:
+        raise RenderTimeout()
+
+
+def render_async(title: str, content: str, result: dict) -> Future:
+    """Encola el render en el pool sin esperar; el Future devuelve (pdf, ms). QueueFull si no hay lugar."""
+    return _submit(title, content, result)
+
+
+def submit_job(
+    analysis_id: int, user_id: int, title: str, content: str, result: dict, cache_key: Optional[str] = None
+) -> PdfJob:
+    job = PdfJob(id=uuid.uuid4().hex, analysis_id=analysis_id, user_id=user_id)
+    cached = pdf_cache.get(cache_key) if cache_key else None
+    if cached:
+        job.status, job.path, job.finished_at = "done", cached, time.time()
+        _jobs.save(job)
+        return job
+
+    fut = _submit(title, content, result)
+
+    def _finish(f: Future):
+        # Corre como done-callback: una excepción acá se pierde y el job quedaría pending para siempre
+        try:
+            if f.exception() is not None:
+                job.status, job.error = "error", str(f.exception())
+            else:
+                pdf = f.result()[0]
+                job.path = pdf_cache.put(cache_key, pdf) if cache_key else None  # None si no se pudo escribir
+                if not job.path:
+                    _jobs.keep_pdf(job, pdf)
+                job.status = "done"
+        except Exception as e:
+            job.status, job.error = "error", str(e)
+        job.finished_at = time.time()
+        try:
+            _jobs.save(job)
+        except OSError as e:
+            job.status, job.error = "error", str(e)  # sólo lo ve este proceso
+
+    _jobs.save(job)
+    fut.add_done_callback(_finish)
+    return job
+
+
+def get_job(job_id: str, user_id: int) -> Optional[PdfJob]:
+    job = _jobs.get(job_id)
+    if not job or job.user_id != user_id:
+        return None
+    if job.abandoned():
+        # Si el render igual termina, _finish lo pisa con el resultado
+        job.status, job.error, job.finished_at = "error", "el render no terminó (worker reiniciado)", time.time()
+        try:
+            _jobs.save(job)
+        except OSError:
+            pass
+    return job
+
+
+def stats() -> dict:
+    with _lock:
+        renders = _stats["renders"] + _stats["inline_renders"]
+        return {
+            "workers": settings.PDF_POOL_WORKERS,
+            "pending": _pending,
+            "queue_max": settings.PDF_QUEUE_MAX,
+            "jobs_kept": len(_jobs),
+            **_stats,
+            "render_ms_avg": round(_stats["render_ms_total"] / renders, 2) if renders else 0.0,
+        }
+
+
+def shutdown():
+    _discard_pool()
@@ -0,0 +1,126 @@
+# app/utils/principal_cache.py
+# Cache en proceso de principals verificados:
+#   token   -> claims decodificados (evita jwt.decode en cada request)
+#   subject -> snapshot del usuario (evita el SELECT por email)
+# Las entradas vencen al `exp` del token o tras un TTL corto, lo que ocurra primero.
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from ..config import settings
+from .security import decode_access_token
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Copia inmutable de los campos del usuario que usan las rutas."""
+    id: int
+    email: str
+    name: str
+    is_pro: bool = False
+
+    @classmethod
+    def from_user(cls, user) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            email=user.email,
+            name=user.name or "",
+            is_pro=bool(getattr(user, "is_pro", False)),
+        )
+
+
+class TTLCache:
+    """LRU acotado con vencimiento por entrada. Thread-safe."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Any, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value, expires_at: Optional[float] = None):
+        ttl_deadline = time.time() + self.ttl
+        deadline = min(expires_at, ttl_deadline) if expires_at else ttl_deadline
+        with self._lock:
+            self._data[key] = (deadline, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+_claims = TTLCache(settings.AUTH_CACHE_MAXSIZE, settings.AUTH_CACHE_TTL_SECONDS)
+_users = TTLCache(settings.AUTH_CACHE_MAXSIZE, settings.AUTH_CACHE_TTL_SECONDS)
+
+
+def _subject_key(sub: str) -> str:
+    return (sub or "").strip().lower()
+
+
+def decode_token(token: str) -> Optional[dict]:
+    """decode_access_token con cache; los tokens inválidos no se cachean."""
+    if not settings.AUTH_CACHE_ENABLED:
+        return decode_access_token(token)
+    payload = _claims.get(token)
+    if payload is not None:
+        return payload
+    payload = decode_access_token(token)
+    if payload:
+        exp = payload.get("exp")
+        _claims.set(token, payload, float(exp) if exp else None)
+    return payload
+
+
+def get_user(sub: str) -> Optional[UserSnapshot]:
+    if not settings.AUTH_CACHE_ENABLED:
+        return None
+    return _users.get(_subject_key(sub))
+
+
+def put_user(sub: str, user, expires_at: Optional[float] = None) -> UserSnapshot:
+    snap = user if isinstance(user, UserSnapshot) else UserSnapshot.from_user(user)
+    if settings.AUTH_CACHE_ENABLED:
+        _users.set(_subject_key(sub), snap, expires_at)
+    return snap
+
+
+def invalidate_user(email: str) -> None:
+    """Llamar siempre que cambie un usuario (reset de admin, registro, cambio de plan)."""
+    _users.pop(_subject_key(email))
+
+
+def clear() -> None:
+    _claims.clear()
+    _users.clear()
+
+
+def stats() -> dict:
+    return {"claims": _claims.stats(), "users": _users.stats()}
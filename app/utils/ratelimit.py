@@ -0,0 +1,252 @@
+# app/utils/ratelimit.py
+# Rate limiting y load shedding para los endpoints caros (bcrypt, ReportLab, análisis).
+# Middleware ASGI puro (sin BaseHTTPMiddleware): las rutas que no están en ninguna
+# clase pasan sin costo extra.
+#   - Token bucket por clase de ruta y por clave: "u:<sub del JWT>" o "ip:<cliente>".
+#     Se implementa como GCRA: un solo float por clave (el "theoretical arrival time"),
+#     y las claves ya recargadas no necesitan estado, así que se pueden descartar.
+#     Excedido -> 429 con Retry-After.
+#   - Tope de requests simultáneos por clase (en este proceso). Excedido -> 503.
+#   - RATE_LIMIT_BACKEND=sqlite: los buckets viven en un archivo SQLite compartido,
+#     así los límites valen entre varios workers de uvicorn.
+import json
+import math
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from ..config import settings
+
+
+@dataclass(frozen=True)
+class RouteClass:
+    name: str
+    routes: tuple[str, ...]  # "MÉTODO regex-del-path"
+    per_minute: float        # recarga del bucket
+    burst: int               # capacidad del bucket
+    concurrency: int = 0     # requests simultáneos en el proceso (0 = sin tope)
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "RouteClass":
+        return cls(
+            name=d["name"],
+            routes=tuple(d["routes"]),
+            per_minute=float(d["per_minute"]),
+            burst=int(d["burst"]),
+            concurrency=int(d.get("concurrency", 0)),
+        )
+
+
+DEFAULT_CLASSES: tuple[RouteClass, ...] = (
+    RouteClass("auth", ("POST /auth/login", "POST /auth/login/web", "POST /auth/register"),
+               per_minute=10, burst=5, concurrency=16),
+    RouteClass("pdf", (r"GET /analysis/\d+/pdf", r"POST /analysis/\d+/pdf/jobs"),
+               per_minute=30, burst=10, concurrency=8),
+    RouteClass("analysis", ("POST /analysis", "POST /analysis/batch", "POST /analysis/upload"),
+               per_minute=60, burst=20, concurrency=16),
+    RouteClass("export", ("GET /analysis/export",), per_minute=2, burst=3, concurrency=4),
+)
+
+
+def configured_classes() -> tuple[RouteClass, ...]:
+    """DEFAULT_CLASSES, con RATE_LIMIT_RULES (JSON) reemplazando o agregando clases por nombre."""
+    classes = {c.name: c for c in DEFAULT_CLASSES}
+    if settings.RATE_LIMIT_RULES:
+        for d in json.loads(settings.RATE_LIMIT_RULES):
+            classes[d["name"]] = RouteClass.from_dict(d)
+    return tuple(classes.values())
+
+
+class MemoryBuckets:
+    """GCRA en memoria: dict clave -> TAT. Thread-safe."""
+
+    blocking = False  # hit() es un dict bajo lock: se llama directo desde el event loop
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._tat: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, interval: float, burst: int, now: float) -> float:
+        """0 si se permite; si no, segundos a esperar."""
+        with self._lock:
+            tat = max(self._tat.get(key, now), now) + interval
+            wait = tat - now - burst * interval
+            if wait > 0:
+                return wait
+            self._tat[key] = tat
+            if len(self._tat) > self.max_keys:
+                self._prune(now)
+            return 0.0
+
+    def _prune(self, now: float):
+        # Un TAT vencido equivale a un bucket lleno: se puede borrar sin cambiar nada
+        self._tat = {k: t for k, t in self._tat.items() if t > now}
+        if len(self._tat) > self.max_keys:
+            # Aun así lleno (ataque con muchas claves): se olvidan los más viejos
+            keep = sorted(self._tat.items(), key=lambda kv: kv[1])[-self.max_keys // 2:]
+            self._tat = dict(keep)
+
+    def __len__(self):
+        return len(self._tat)
+
+
+class SQLiteBuckets:
+    """El mismo GCRA en un archivo SQLite compartido por los workers (un UPSERT atómico)."""
+
+    PRUNE_EVERY = 1000
+    # hit() puede esperar el lock del archivo (hasta timeout=0.2): corre en el threadpool
+    # para no frenar el event loop con escrituras concurrentes de otros workers
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._calls = 0
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS rl_buckets (key TEXT PRIMARY KEY, tat REAL NOT NULL) WITHOUT ROWID")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=0.2, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # estado descartable: no vale un fsync
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key: str, interval: float, burst: int, now: float) -> float:
+        conn = self._conn()
+        row = conn.execute(
+            "INSERT INTO rl_buckets (key, tat) VALUES (:k, :now + :i) "
+            "ON CONFLICT(key) DO UPDATE SET tat = max(tat, :now) + :i "
+            "WHERE max(tat, :now) + :i - :now <= :limit RETURNING tat",
+            {"k": key, "now": now, "i": interval, "limit": burst * interval},
+        ).fetchone()
+        self._calls += 1
+        if self._calls % self.PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM rl_buckets WHERE tat < ?", (now,))
+        if row is not None:
+            return 0.0
+        tat = conn.execute("SELECT tat FROM rl_buckets WHERE key = ?", (key,)).fetchone()[0]
+        return max(tat, now) + interval - now - burst * interval
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM rl_buckets").fetchone()[0]
+
+
+def _json_response(status: int, detail: str, retry_after: float):
+    body = json.dumps({"detail": detail}).encode()
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+        (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+    ]
+    return body, headers
+
+
+class RateLimitMiddleware:
+    def __init__(self, app, classes: Optional[tuple[RouteClass, ...]] = None, backend=None):
+        self.app = app
+        self.classes = classes if classes is not None else configured_classes()
+        if backend is None:
+            backend = (SQLiteBuckets(settings.RATE_LIMIT_SQLITE_PATH) if settings.RATE_LIMIT_BACKEND == "sqlite"
+                       else MemoryBuckets(settings.RATE_LIMIT_MAX_KEYS))
+        self.backend = backend
+        # Un regex por clase: "MÉTODO path" completo
+        self._matchers = [(c, re.compile("(?:" + "|".join(c.routes) + ")")) for c in self.classes]
+        self._active = {c.name: 0 for c in self.classes}
+        self.stats = {c.name: {"allowed": 0, "limited": 0, "shed": 0} for c in self.classes}
+        _instances.append(self)
+
+    def _match(self, method: str, path: str) -> Optional[RouteClass]:
+        target = f"{method} {path.rstrip('/') or '/'}"
+        for cls, rx in self._matchers:
+            if rx.fullmatch(target):
+                return cls
+        return None
+
+    def _key(self, scope) -> str:
+        from . import principal_cache
+
+        token = None
+        headers = dict(scope.get("headers") or ())
+        auth = headers.get(b"authorization", b"").decode("latin-1")
+        if auth[:7].lower() == "bearer ":
+            token = auth[7:].strip()
+        elif b"cookie" in headers:
+            for part in headers[b"cookie"].decode("latin-1").split(";"):
+                name, _, value = part.strip().partition("=")
+                if name == "access_token":
+                    token = value
+                    break
+        if token:
+            payload = principal_cache.decode_token(token)
+            if payload and payload.get("sub"):
+                return "u:" + str(payload["sub"]).strip().lower()
+
+        if settings.RATE_LIMIT_TRUST_FORWARDED and b"x-forwarded-for" in headers:
+            # El último salto lo agrega nuestro proxy (Render): el resto lo puede inventar el cliente
+            return "ip:" + headers[b"x-forwarded-for"].decode("latin-1").split(",")[-1].strip()
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "unknown")
+
+    async def _reject(self, send, status: int, detail: str, retry_after: float):
+        body, headers = _json_response(status, detail, retry_after)
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        cls = self._match(scope["method"], scope["path"])
+        if cls is None:
+            return await self.app(scope, receive, send)
+
+        stats = self.stats[cls.name]
+        if cls.concurrency and self._active[cls.name] >= cls.concurrency:
+            stats["shed"] += 1
+            return await self._reject(send, 503, "Servidor ocupado, reintentar en unos segundos", 1)
+
+        key = f"{cls.name}:{self._key(scope)}"
+        # El lugar se toma antes del hit: con un backend bloqueante hay un await en el medio
+        # y otros requests podrían pasar el tope de concurrencia mientras tanto
+        self._active[cls.name] += 1
+        try:
+            args = (key, 60.0 / cls.per_minute, cls.burst, time.time())
+            try:
+                if getattr(self.backend, "blocking", False):
+                    wait = await run_in_threadpool(self.backend.hit, *args)
+                else:
+                    wait = self.backend.hit(*args)
+            except sqlite3.Error:
+                wait = 0.0  # si el backend compartido falla, se deja pasar (fail-open)
+            if wait > 0:
+                stats["limited"] += 1
+                return await self._reject(send, 429, "Demasiados requests", wait)
+
+            stats["allowed"] += 1
+            await self.app(scope, receive, send)
+        finally:
+            self._active[cls.name] -= 1
+
+
+_instances: list[RateLimitMiddleware] = []
+
+
+def stats() -> dict:
+    if not _instances:
+        return {"enabled": False}
+    mw = _instances[-1]
+    return {
+        "enabled": True,
+        "backend": settings.RATE_LIMIT_BACKEND,
+        "keys": len(mw.backend),
+        "active": dict(mw._active),
+        "classes": mw.stats,
+    }
@@ -0,0 +1,92 @@
+# app/utils/result_codec.py
+# Formato de Analysis.result_json: JSON compacto de orjson (bytes) y, si `zstandard`
+# está instalado, comprimido con zstd a partir de ANALYSIS_RESULT_ZSTD_MIN_BYTES.
+# Las filas viejas guardadas como texto (json.dumps) se leen igual.
+# Las respuestas de listado arman el JSON empalmando los bytes guardados: el
+# resultado no se decodifica ni se vuelve a serializar.
+from typing import Iterable, Union
+
+import orjson
+from starlette.responses import JSONResponse
+
+from ..config import settings
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+Stored = Union[bytes, str, None]
+
+
+def dumps(result: dict) -> bytes:
+    raw = orjson.dumps(result)
+    threshold = settings.ANALYSIS_RESULT_ZSTD_MIN_BYTES
+    if zstandard is not None and threshold and len(raw) >= threshold:
+        return zstandard.ZstdCompressor(level=settings.ANALYSIS_RESULT_ZSTD_LEVEL).compress(raw)
+    return raw
+
+
+def raw(stored: Stored) -> bytes:
+    """JSON (bytes UTF-8) listo para empalmar en una respuesta."""
+    if stored is None:
+        return b"null"
+    if isinstance(stored, str):
+        return stored.encode()
+    if stored[:4] == ZSTD_MAGIC:
+        if zstandard is None:
+            raise RuntimeError("result_json comprimido con zstd y `zstandard` no está instalado")
+        return zstandard.ZstdDecompressor().decompress(stored)
+    return bytes(stored)
+
+
+def loads(stored: Stored) -> dict:
+    return orjson.loads(raw(stored))
+
+
+def search_terms(stored: Stored) -> str:
+    """Texto indexable de un resultado (reglas que dispararon y severidad máxima).
+
+    La usan los triggers del índice FTS5 como función SQL (ver app/search.py): nunca
+    levanta, un resultado ilegible simplemente no aporta términos.
+    """
+    try:
+        result = loads(stored)
+    except Exception:
+        return ""
+    if not isinstance(result, dict):
+        return ""
+    hits = result.get("hits")
+    terms = list(hits) if isinstance(hits, dict) else []
+    if isinstance(result.get("max_severity"), str):
+        terms.append(result["max_severity"])
+    return " ".join(terms)
+
+
+def analysis_json(analysis_id: int, title: str, input_summary: str, stored: Stored) -> bytes:
+    """Un AnalysisOut serializado, con result_json tal cual está en la base."""
+    return b"".join((
+        b'{"id":', str(analysis_id).encode(),
+        b',"title":', orjson.dumps(title),
+        b',"input_summary":', orjson.dumps(input_summary),
+        b',"result_json":', raw(stored), b"}",
+    ))
+
+
+def json_array(rows: Iterable) -> bytes:
+    """Filas (id, title, input_summary, result_json) -> array JSON de AnalysisOut."""
+    return b"[" + b",".join(analysis_json(*r) for r in rows) + b"]"
+
+
+def ndjson(rows: Iterable) -> bytes:
+    return b"".join(analysis_json(*r) + b"\n" for r in rows)
+
+
+class ORJSONResponse(JSONResponse):
+    """default_response_class de la app: igual que JSONResponse pero serializa con orjson.
+    (Local en vez de fastapi.responses.ORJSONResponse, deprecada en FastAPI recientes.)"""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
@@ -1,25 +1,46 @@
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Optional
-from jose import jwt, JWTError
-from passlib.context import CryptContext
 from fastapi import Request
 from ..config import settings
 
 ALGORITHM = "HS256"
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# python-jose y passlib se importan en el primer uso (no en el arranque); WARMUP los precarga
+@lru_cache(maxsize=1)
+def pwd_context():
+    from passlib.context import CryptContext
+    # min/max = default: cualquier hash con otro costo queda marcado para rehash en el próximo login
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+    )
+
+def _jose():
+    from jose import jwt, JWTError
+    return jwt, JWTError
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context().verify(plain_password, hashed_password)
+
+def verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """Como verify_password, pero devuelve un hash nuevo si el actual quedó desactualizado."""
+    return pwd_context().verify_and_update(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return pwd_context().hash(password)
 
 def create_access_token(subject: str, expires_minutes: Optional[int] = None) -> str:
+    jwt, _ = _jose()
     expire = datetime.now(timezone.utc) + timedelta(minutes=expires_minutes or settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode = {"sub": subject, "exp": expire}
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
 
 def decode_access_token(token: str) -> Optional[dict]:
+    jwt, JWTError = _jose()
     try:
         return jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
@@ -0,0 +1,111 @@
+# app/utils/user_version.py
+# GET condicionales por usuario (/auth/me, GET /analysis).
+# users.data_version sube, y users.data_updated_at se actualiza, en la misma transacción
+# que cualquier cambio del perfil o de los análisis del usuario (bump()). De ahí salen
+#   ETag: W/"<recurso>-<user_id>-<versión>[-<variante>]"   (débil: vale también comprimido)
+#   Last-Modified: data_updated_at
+# Un If-None-Match / If-Modified-Since vigente se contesta 304 con una lectura por PK
+# (o un hit del cache en proceso) sin cargar filas ni serializar nada.
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Response
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import User
+from .principal_cache import TTLCache
+
+_versions = TTLCache(settings.AUTH_CACHE_MAXSIZE, settings.USER_VERSION_CACHE_TTL_SECONDS)
+
+
+@dataclass(frozen=True)
+class Validators:
+    etag: str
+    last_modified: Optional[datetime]
+
+    def headers(self) -> dict:
+        h = {"ETag": self.etag, "Cache-Control": "private, no-cache"}
+        if self.last_modified:
+            h["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+        return h
+
+    def matches(self, request_headers) -> bool:
+        """True si el cliente ya tiene esta versión (If-None-Match manda sobre If-Modified-Since)."""
+        inm = request_headers.get("if-none-match")
+        if inm:
+            ours = self.etag.removeprefix("W/")
+            return any(t == "*" or t.removeprefix("W/") == ours for t in (t.strip() for t in inm.split(",")))
+        ims = request_headers.get("if-modified-since")
+        if ims and self.last_modified:
+            try:
+                since = parsedate_to_datetime(ims)
+            except (TypeError, ValueError):
+                return False
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+            return self.last_modified.replace(microsecond=0) <= since
+        return False
+
+    def not_modified(self) -> Response:
+        return Response(status_code=304, headers=self.headers())
+
+
+def _utc(value) -> Optional[datetime]:
+    if value is None:
+        return None
+    if isinstance(value, str):  # SQLite sin tipos declarados (p.ej. columna agregada por migración)
+        value = datetime.fromisoformat(value)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def current(db: Session, user_id: int) -> tuple[int, Optional[datetime]]:
+    """(versión, último cambio) del usuario: cache en proceso o una lectura por PK."""
+    cached = _versions.get(user_id) if settings.USER_VERSION_CACHE_TTL_SECONDS > 0 else None
+    if cached is not None:
+        return cached
+    row = db.execute(select(User.data_version, User.data_updated_at).where(User.id == user_id)).first()
+    value = (row[0] or 0, _utc(row[1])) if row else (0, None)
+    if settings.USER_VERSION_CACHE_TTL_SECONDS > 0:
+        _versions.set(user_id, value)
+    return value
+
+
+def validators(db: Session, resource: str, user_id: int, variant: str = "") -> Validators:
+    """`variant` distingue representaciones del mismo recurso (página, formato...)."""
+    version, updated_at = current(db, user_id)
+    tag = f"{resource}-{user_id}-{version}" + (f"-{variant}" if variant else "")
+    return Validators(etag=f'W/"{tag}"', last_modified=updated_at)
+
+
+def bump(db: Session, user_id: int) -> None:
+    """Marca un cambio en los datos del usuario; se confirma (o no) con la transacción de `db`."""
+    db.execute(
+        update(User).where(User.id == user_id)
+        .values(data_version=User.data_version + 1, data_updated_at=datetime.now(timezone.utc))
+    )
+    db.info.setdefault("bumped_users", set()).add(user_id)
+
+
+def forget(user_ids) -> None:
+    """Descarta versiones cacheadas (escrituras confirmadas en otro proceso, ver app/writer.py)."""
+    for user_id in user_ids:
+        _versions.pop(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_bumped(session: Session):
+    # Recién después del commit: antes, otro request podría volver a cachear la versión vieja
+    forget(session.info.pop("bumped_users", ()))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_bumped(session: Session):
+    session.info.pop("bumped_users", None)
+
+
+def stats() -> dict:
+    return _versions.stats()
@@ -0,0 +1,222 @@
+# app/writer.py
+# Escritor único para el modo multi-core (app/serve.py).
+# Con varios workers, cada uno abriendo transacciones de escritura sobre el mismo
+# archivo SQLite termina en esperas de busy_timeout y "database is locked". Acá las
+# escrituras de run_analysis, /analysis/batch, register y _force_admin_reset se mandan a UN proceso
+# que las ejecuta en serie y agrupa las que llegan juntas en un solo commit (un fsync
+# para todo el grupo). Las lecturas siguen en cada worker.
+#
+# Protocolo: socket Unix, mensajes pickle con prefijo de 4 bytes (op, args) -> (ok, valor, user_ids).
+# Sin WRITER_SOCKET las operaciones se ejecutan en la sesión del request, como siempre.
+# Escritor suelto (para workers de uvicorn lanzados aparte): python -m app.writer --socket /tmp/w.sock
+import os
+import pickle
+import queue
+import socket
+import struct
+import threading
+from typing import Any, Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from .config import settings
+
+_HEADER = struct.Struct("!I")
+GROUP_MAX = 256  # operaciones por commit
+
+OPS: dict[str, Callable[..., Any]] = {}
+
+
+def op(name: str):
+    """Registra fn(db, *args) como operación del escritor. No debe hacer commit."""
+    def deco(fn):
+        OPS[name] = fn
+        return fn
+    return deco
+
+
+class WriterUnavailable(RuntimeError):
+    pass
+
+
+def active() -> bool:
+    return bool(settings.WRITER_SOCKET)
+
+
+# ---------------- Lado worker ----------------
+def _send(sock: socket.socket, obj) -> None:
+    data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("conexión cerrada")
+        buf += chunk
+    return bytes(buf)
+
+
+def _recv(sock: socket.socket):
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return pickle.loads(_recv_exact(sock, size))
+
+
+_local = threading.local()
+
+
+def _conn() -> socket.socket:
+    # Una conexión por thread (los handlers sync corren en el threadpool)
+    sock = getattr(_local, "sock", None)
+    if sock is None or getattr(_local, "pid", None) != os.getpid():
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(settings.WRITER_SOCKET)
+        _local.sock, _local.pid = sock, os.getpid()
+    return sock
+
+
+def _remote(name: str, args: tuple):
+    from .utils import user_version
+
+    try:
+        try:
+            sock = _conn()
+            _send(sock, (name, args))
+        except OSError:
+            # Conexión vieja (el escritor se reinició): se reintenta el envío una vez
+            _local.sock = None
+            sock = _conn()
+            _send(sock, (name, args))
+        # Sin reintento acá: el pedido ya salió y pudo haberse confirmado
+        ok, value, user_ids = _recv(sock)
+    except (OSError, ConnectionError) as e:
+        _local.sock = None
+        raise WriterUnavailable(f"escritor no disponible: {e}") from e
+    if not ok:
+        raise value
+    # El commit fue en otro proceso: el cache de versiones de este worker no se enteró
+    user_version.forget(user_ids)
+    return value
+
+
+def run(db: Optional[Session], name: str, *args):
+    """Ejecuta la operación `name`: en el escritor si hay WRITER_SOCKET; si no, en `db` con commit."""
+    if active():
+        return _remote(name, args)
+    value = OPS[name](db, *args)
+    db.commit()
+    return value
+
+
+def runner(run_db):
+    """Adapta un `run_db(fn, *args)` (threadpool o AsyncSession.run_sync): con escritor
+    remoto, fn corre en el threadpool con db=None y no bloquea el event loop esperando el socket."""
+    if not active():
+        return run_db
+    from starlette.concurrency import run_in_threadpool
+    return lambda fn, *args: run_in_threadpool(fn, None, *args)
+
+
+# ---------------- Lado escritor ----------------
+class _Request:
+    __slots__ = ("sock", "name", "args")
+
+    def __init__(self, sock, name, args):
+        self.sock, self.name, self.args = sock, name, args
+
+
+def _reader(sock: socket.socket, pending: "queue.Queue[_Request]"):
+    try:
+        while True:
+            name, args = _recv(sock)
+            pending.put(_Request(sock, name, args))
+    except (OSError, ConnectionError, EOFError):
+        sock.close()
+
+
+def _execute(db: Session, req: _Request):
+    db.info["bumped_users"] = set()
+    value = OPS[req.name](db, *req.args)
+    return value, db.info.pop("bumped_users", set())
+
+
+def _reply(req: _Request, ok: bool, value, user_ids=()):
+    try:
+        try:
+            _send(req.sock, (ok, value, tuple(user_ids)))
+        except (pickle.PicklingError, TypeError, AttributeError):
+            _send(req.sock, (False, RuntimeError(f"{type(value).__name__}: {value}"), ()))
+    except OSError:
+        pass  # el worker se fue; su escritura ya quedó (o no) según el commit
+
+
+def _apply(group: list[_Request]):
+    from .database import SessionLocal
+
+    with SessionLocal() as db:
+        results = []
+        try:
+            for req in group:
+                results.append(_execute(db, req))
+            db.commit()
+        except Exception:
+            db.rollback()
+            results = None
+        if results is not None:
+            for req, (value, user_ids) in zip(group, results):
+                _reply(req, True, value, user_ids)
+            return
+    # Falló alguna: se rehace una por una para devolver cada error a quien corresponde
+    for req in group:
+        with SessionLocal() as db:
+            try:
+                value, user_ids = _execute(db, req)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                _reply(req, False, e)
+                continue
+            _reply(req, True, value, user_ids)
+
+
+def serve(path: str):
+    """Loop del escritor: un thread por conexión lee pedidos, uno solo escribe."""
+    from .database import engine, read_engine
+    from .routes import analysis, auth  # noqa: F401  registran sus operaciones
+
+    # Tras un fork no se comparten conexiones con el padre
+    engine.dispose(close=False)
+    read_engine.dispose(close=False)
+
+    if os.path.exists(path):
+        os.unlink(path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(256)
+    pending: "queue.Queue[_Request]" = queue.Queue()
+
+    def accept_loop():
+        while True:
+            sock, _ = server.accept()
+            threading.Thread(target=_reader, args=(sock, pending), daemon=True).start()
+
+    threading.Thread(target=accept_loop, name="writer-accept", daemon=True).start()
+
+    while True:
+        group = [pending.get()]
+        while len(group) < GROUP_MAX:
+            try:
+                group.append(pending.get_nowait())
+            except queue.Empty:
+                break
+        _apply(group)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Proceso escritor único (ver app/serve.py)")
+    ap.add_argument("--socket", required=True)
+    serve(ap.parse_args().socket)
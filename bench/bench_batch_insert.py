@@ -0,0 +1,49 @@
+# bench/bench_batch_insert.py
+# Filas/s: N llamadas a POST /analysis vs una sola a POST /analysis/batch (in-process, ASGI).
+# Uso: python -m bench.bench_batch_insert [--rows 2000]
+import argparse
+import json
+import os
+import tempfile
+import time
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=2000)
+    args = ap.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.sqlite3")
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")  # N requests seguidos del mismo usuario
+    os.environ.setdefault("FREE_DAILY_ANALYSES", "0")
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    items = [{"title": f"log {i}", "content": "ERROR something failed\n" * 10} for i in range(args.rows)]
+    with TestClient(app) as c:
+        c.post("/auth/register", json={"email": "bench@example.com", "name": "b", "password": "benchpass"})
+        token = c.post("/auth/login", json={"email": "bench@example.com", "password": "benchpass"}).json()["access_token"]
+        h = {"Authorization": f"Bearer {token}"}
+
+        t0 = time.perf_counter()
+        for it in items:
+            c.post("/analysis", json=it, headers=h)
+        single = args.rows / (time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        r = c.post("/analysis/batch", json=items, headers=h)
+        batch = args.rows / (time.perf_counter() - t0)
+        assert json.loads(r.text.splitlines()[-1])["committed"]
+
+        # Body inválido (array JSON y NDJSON con una línea mala): 422, no 500
+        for body, ctype in ((b"no es json", "application/json"),
+                            (b'{"title": "a", "content": "b"}\nno es json\n', "application/x-ndjson")):
+            r = c.post("/analysis/batch", content=body, headers={**h, "content-type": ctype})
+            assert r.status_code == 422, (ctype, r.status_code, r.text)
+
+    print(f"POST /analysis        {single:>10.0f} filas/s")
+    print(f"POST /analysis/batch  {batch:>10.0f} filas/s  ({batch / single:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
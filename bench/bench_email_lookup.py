@@ -0,0 +1,47 @@
+# bench/bench_email_lookup.py
+# Compara la búsqueda de usuario por email: lower(email) (scan) vs email_norm (índice).
+# Uso: python -m bench.bench_email_lookup [--sizes 1000,10000,100000] [--lookups 2000]
+import argparse
+import random
+import time
+
+from sqlalchemy import create_engine, func, insert
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models import User
+
+def _seed(engine, n: int):
+    rows = [
+        {"email": f"User{i}@Example.com", "email_norm": f"user{i}@example.com", "name": f"u{i}", "hashed_password": "x"}
+        for i in range(n)
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(User), rows)
+
+def _time(fn, emails) -> float:
+    t0 = time.perf_counter()
+    for e in emails:
+        fn(e)
+    return (time.perf_counter() - t0) / len(emails) * 1e6
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,10000,100000")
+    ap.add_argument("--lookups", type=int, default=2000)
+    args = ap.parse_args()
+
+    print(f"{'users':>9} {'lower(email) us':>16} {'email_norm us':>14}")
+    for n in [int(x) for x in args.sizes.split(",")]:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        _seed(engine, n)
+        emails = [f"user{random.randrange(n)}@example.com" for _ in range(args.lookups)]
+        with Session(engine) as db:
+            old = _time(lambda e: db.query(User).filter(func.lower(User.email) == e).first(), emails)
+            new = _time(lambda e: db.query(User).filter(User.email_norm == e).first(), emails)
+        print(f"{n:>9} {old:>16.1f} {new:>14.1f}")
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# bench/bench_export.py
+# GET /analysis/export: time-to-first-byte, duración total y pico de RSS según la
+# cantidad de análisis del usuario. Cada medición corre en un subproceso propio
+# (ru_maxrss sólo crece) con uvicorn en un thread; el cliente descarta los bytes a medida que llegan.
+# Uso: python -m bench.bench_export [--rows 1000,5000] [--formats zip,csv,ndjson]
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from bench.bench_suite import PASSWORD, seed
+
+
+def _rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB en Linux
+
+
+async def _child(fmt: str, rows: int) -> dict:
+    import httpx
+    import uvicorn
+    from app.main import app
+
+    seed((rows,))
+    # uvicorn real en un thread: httpx.ASGITransport junta la respuesta entera antes de devolverla
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None) as c:
+        r = await c.post("/auth/login", json={"email": f"list{rows}@example.com", "password": PASSWORD})
+        h = {"Authorization": f"Bearer {r.json()['access_token']}", "Accept-Encoding": "identity"}
+        before = _rss_mb()
+        t0 = time.perf_counter()
+        ttfb, size = None, 0
+        async with c.stream("GET", "/analysis/export", params={"format": fmt}, headers=h) as resp:
+            resp.raise_for_status()
+            async for chunk in resp.aiter_raw():
+                if ttfb is None:
+                    ttfb = time.perf_counter() - t0
+                size += len(chunk)
+        elapsed = time.perf_counter() - t0
+    server.should_exit = True
+    thread.join(timeout=10)
+    return {"format": fmt, "rows": rows, "ttfb_ms": round(ttfb * 1000, 1), "seconds": round(elapsed, 2),
+            "mb": round(size / 1e6, 1), "rss_before_mb": round(before, 1), "rss_peak_mb": round(_rss_mb(), 1)}
+
+
+def _run(fmt: str, rows: int) -> dict:
+    tmp = tempfile.mkdtemp()
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp}/bench.sqlite3", "PDF_CACHE_DIR": "",
+           "RATE_LIMIT_ENABLED": "false", "BILLING_DISPATCHER_ENABLED": "false",
+           "BCRYPT_ROUNDS": os.environ.get("BCRYPT_ROUNDS", "4")}
+    out = subprocess.run(
+        [sys.executable, "-m", "bench.bench_export", "--child", fmt, "--rows", str(rows)],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", default="1000,5000")
+    ap.add_argument("--formats", default="zip,csv,ndjson")
+    ap.add_argument("--child")
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(_child(args.child, int(args.rows)))))
+        return
+
+    print(f"{'formato':>8} {'filas':>7} {'TTFB ms':>8} {'seg':>7} {'filas/s':>8} {'MB':>7} {'RSS delta':>10}")
+    for rows in [int(x) for x in args.rows.split(",")]:
+        for fmt in args.formats.split(","):
+            r = _run(fmt, rows)
+            print(f"{fmt:>8} {rows:>7} {r['ttfb_ms']:>8.1f} {r['seconds']:>7.2f} {rows / r['seconds']:>8.0f} "
+                  f"{r['mb']:>7.1f} {r['rss_peak_mb'] - r['rss_before_mb']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# bench/bench_list_serialization.py
+# GET de listados con 1k y 10k filas: antes (json.loads + AnalysisOut + serialización de
+# FastAPI) vs ahora (result_json empalmado tal cual está en la base). In-process, ASGI.
+# Uso: python -m bench.bench_list_serialization [--rows 1000,10000] [--repeat 5]
+import argparse
+import json
+import os
+import tempfile
+import time
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", default="1000,10000")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    sizes = [int(x) for x in args.rows.split(",")]
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.sqlite3")
+    from fastapi import Depends
+    from fastapi.testclient import TestClient
+    from sqlalchemy import insert, select
+
+    from app.auth import get_current_user
+    from app.database import SessionLocal, get_read_db
+    from app.main import app
+    from app.models import Analysis
+    from app.routes.analysis import _json_response, _page_filter, analyze, list_page
+    from app.schemas import AnalysisCreate, AnalysisOut
+    from app.utils import result_codec
+
+    # Handlers de referencia: el de antes y el actual, sin el tope de limit=1000 de la API
+    @app.get("/bench/list-before", response_model=list[AnalysisOut])
+    def list_before(limit: int, db=Depends(get_read_db), user=Depends(get_current_user)):
+        stmt = _page_filter(select(Analysis.id, Analysis.title, Analysis.input_summary, Analysis.result_json), user.id, None)
+        rows = db.execute(stmt.limit(limit)).all()
+        return [AnalysisOut(id=r.id, title=r.title, input_summary=r.input_summary,
+                            result_json=json.loads(result_codec.raw(r.result_json))) for r in rows]
+
+    @app.get("/bench/list-after")
+    def list_after(limit: int, db=Depends(get_read_db), user=Depends(get_current_user)):
+        return _json_response(list_page(db, user.id, limit, None)[0])
+
+    sample = ("Oct 18 sshd: Failed password for invalid user admin from 203.0.113.9\n"
+              "ERROR db pool exhausted, connection refused\nGET /x HTTP/1.1\" 503 12\n") * 3
+    with TestClient(app) as c:
+        user_id = c.post("/auth/register", json={"email": "bench@example.com", "name": "b", "password": "benchpass"}).json()["id"]
+        token = c.post("/auth/login", json={"email": "bench@example.com", "password": "benchpass"}).json()["access_token"]
+        h = {"Authorization": f"Bearer {token}"}
+
+        summary, result = analyze(AnalysisCreate(title="bench", content=sample))
+        with SessionLocal() as db:
+            db.execute(insert(Analysis), [
+                {"user_id": user_id, "title": f"log {i}", "input_summary": summary, "result_json": result_codec.dumps(result)}
+                for i in range(max(sizes))
+            ])
+            db.commit()
+
+        print(f"{'filas':>7} {'antes ms':>10} {'ahora ms':>10} {'mejora':>8} {'bytes':>10}")
+        for n in sizes:
+            timings = {}
+            for name in ("before", "after"):
+                best = float("inf")
+                for _ in range(args.repeat):
+                    t0 = time.perf_counter()
+                    r = c.get(f"/bench/list-{name}", params={"limit": n}, headers=h)
+                    best = min(best, time.perf_counter() - t0)
+                    assert r.status_code == 200 and len(r.json()) == n
+                timings[name] = best * 1000
+            print(f"{n:>7} {timings['before']:>10.1f} {timings['after']:>10.1f} "
+                  f"{timings['before'] / timings['after']:>7.1f}x {len(r.content):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# bench/bench_memo.py
+# POST /analysis con contenido repetido (reintentos de shippers): throughput y latencia
+# con el memo por hash prendido y apagado, según la proporción de duplicados.
+# Cada corrida es un subproceso propio (ANALYSIS_MEMO_ENABLED se lee al importar la app),
+# sobre una base nueva, con requests secuenciales por httpx.ASGITransport.
+# Uso: python -m bench.bench_memo [--dups 0,30,60,90] [--requests 300] [--kb 64]
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.bench_rules_engine import LINES
+from bench.bench_suite import PASSWORD, _percentile, seed
+
+
+def make_payloads(n: int, kb: float, seed_: int = 7) -> list[str]:
+    rnd = random.Random(seed_)
+    out = []
+    for _ in range(n):
+        lines, size = [], 0
+        while size < kb * 1024:
+            line = rnd.choice(LINES).format(n=rnd.randrange(1000))
+            lines.append(line)
+            size += len(line) + 1
+        out.append("\n".join(lines) + "\n")
+    return out
+
+
+async def _child(dup_pct: int, requests: int, kb: float) -> dict:
+    import httpx
+    from app.main import app
+
+    seed(())
+    rnd = random.Random(dup_pct)
+    fresh = iter(make_payloads(requests, kb))
+    sent: list[str] = []
+    latencies, duplicates = [], 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as c:
+        r = await c.post("/auth/login", json={"email": "bench@example.com", "password": PASSWORD})
+        h = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        t_all = time.perf_counter()
+        for i in range(requests):
+            # Un duplicado reenvía alguno de los últimos 50 payloads, a veces con CRLF (otro shipper)
+            if sent and rnd.random() * 100 < dup_pct:
+                content = rnd.choice(sent[-50:])
+                if rnd.random() < 0.2:
+                    content = content.replace("\n", "\r\n")
+            else:
+                content = next(fresh)
+                sent.append(content)
+            t0 = time.perf_counter()
+            r = await c.post("/analysis", json={"title": f"bench {i}", "content": content}, headers=h)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            r.raise_for_status()
+            duplicates += "x-duplicate-of" in r.headers
+        elapsed = time.perf_counter() - t_all
+        memo = (await c.get("/health/stats")).json()["analysis_memo"]
+    latencies.sort()
+    return {"dup_pct": dup_pct, "rps": round(requests / elapsed, 1),
+            "p50_ms": round(_percentile(latencies, 50), 2), "p95_ms": round(_percentile(latencies, 95), 2),
+            "duplicates": duplicates, "hit_rate": memo["hit_rate"]}
+
+
+def _run(memo_on: bool, dup_pct: int, requests: int, kb: float) -> dict:
+    tmp = tempfile.mkdtemp()
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp}/bench.sqlite3", "PDF_CACHE_DIR": "",
+           "RATE_LIMIT_ENABLED": "false", "BILLING_DISPATCHER_ENABLED": "false", "FREE_DAILY_ANALYSES": "0",
+           "ANALYSIS_MEMO_ENABLED": str(memo_on).lower(),
+           "BCRYPT_ROUNDS": os.environ.get("BCRYPT_ROUNDS", "4")}
+    out = subprocess.run(
+        [sys.executable, "-m", "bench.bench_memo", "--child", str(dup_pct),
+         "--requests", str(requests), "--kb", str(kb)],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dups", default="0,30,60,90", help="%% de requests con contenido ya enviado")
+    ap.add_argument("--requests", type=int, default=300)
+    ap.add_argument("--kb", type=float, default=64, help="tamaño de cada log")
+    ap.add_argument("--child")
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(_child(int(args.child), args.requests, args.kb))))
+        return
+
+    print(f"{'dups %':>6} {'memo':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'duplicados':>10} {'hit rate':>9}")
+    for dup_pct in [int(x) for x in args.dups.split(",")]:
+        base = None
+        for memo_on in (False, True):
+            r = _run(memo_on, dup_pct, args.requests, args.kb)
+            speedup = f"  x{r['rps'] / base:.2f}" if base else ""
+            base = base or r["rps"]
+            print(f"{dup_pct:>6} {'on' if memo_on else 'off':>5} {r['rps']:>8.1f} {r['p50_ms']:>8.2f} "
+                  f"{r['p95_ms']:>8.2f} {r['duplicates']:>10} {str(r['hit_rate']):>9}{speedup}")
+
+
+if __name__ == "__main__":
+    main()
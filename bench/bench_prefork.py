@@ -0,0 +1,167 @@
+# bench/bench_prefork.py
+# Throughput de python -m app.serve de 1 a N workers (escritor único a partir de 2).
+# Cada corrida arranca el launcher sobre una copia de la misma base sembrada y le pega
+# con varios procesos generadores de carga (httpx async) durante --duration segundos.
+# Ojo: los generadores corren en la misma máquina y también consumen CPU.
+# Uso: python -m bench.bench_prefork [--workers 1,2,4] [--mix mixed|read|write] [--duration 10]
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.bench_suite import PASSWORD, SEED_LOG, _percentile, seed
+
+SIZES = (1000,)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _load(base: str, tokens: list[str], mix: str, duration: float, concurrency: int, seed_: int):
+    import httpx
+
+    rnd = random.Random(seed_)
+    write_ratio = {"read": 0.0, "write": 1.0, "mixed": 0.1}[mix]
+    latencies, errors, writes = [], 0, 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base, timeout=30, limits=limits) as client:
+        async def worker():
+            nonlocal errors, writes
+            while time.perf_counter() < deadline:
+                token = rnd.choice(tokens)
+                headers = {"Authorization": f"Bearer {token}"}
+                t0 = time.perf_counter()
+                try:
+                    if rnd.random() < write_ratio:
+                        writes += 1
+                        r = await client.post("/analysis", json={"title": "bench", "content": SEED_LOG}, headers=headers)
+                    elif rnd.random() < 0.5:
+                        r = await client.get("/analysis", params={"limit": 50}, headers=headers)
+                    else:
+                        r = await client.get("/auth/me", cookies={"access_token": token})
+                    ok = r.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append((time.perf_counter() - t0) * 1000)
+                errors += not ok
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, writes
+
+
+def _load_proc(args):
+    return asyncio.run(_load(*args))
+
+
+def _wait_ready(base: str, proc: subprocess.Popen, timeout: float = 30):
+    import httpx
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("app.serve terminó antes de arrancar")
+        try:
+            if httpx.get(base + "/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("app.serve no respondió a tiempo")
+
+
+def run(workers: int, db_template: str, tmp: str, args) -> dict:
+    import httpx
+
+    db_path = os.path.join(tmp, f"run-{workers}.sqlite3")
+    shutil.copy(db_template, db_path)
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}", "SQLITE_PROFILE": "production"}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--workers", str(workers), "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        _wait_ready(base, proc)
+        tokens = [
+            httpx.post(base + "/auth/login", json={"email": f"list{n}@example.com", "password": PASSWORD}).json()["access_token"]
+            for n in SIZES
+        ] + [httpx.post(base + "/auth/login", json={"email": "bench@example.com", "password": PASSWORD}).json()["access_token"]]
+
+        per_client = max(1, args.concurrency // args.clients)
+        jobs = [(base, tokens, args.mix, args.duration, per_client, i) for i in range(args.clients)]
+        t0 = time.perf_counter()
+        with mp.get_context("spawn").Pool(args.clients) as pool:
+            parts = pool.map(_load_proc, jobs)
+        wall = time.perf_counter() - t0
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+    latencies = sorted(x for lat, _e, _w in parts for x in lat)
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "writes": sum(w for _l, _e, w in parts),
+        "errors": sum(e for _l, e, _w in parts),
+        "rps": round(len(latencies) / wall, 1),
+        "p50_ms": round(_percentile(latencies, 50), 2),
+        "p95_ms": round(_percentile(latencies, 95), 2),
+        "p99_ms": round(_percentile(latencies, 99), 2),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", default=",".join(str(n) for n in sorted({1, 2, os.cpu_count() or 1})),
+                    help="cantidades de workers a probar, separadas por coma")
+    ap.add_argument("--mix", choices=["read", "write", "mixed"], default="mixed", help="mixed = 10%% escrituras")
+    ap.add_argument("--duration", type=float, default=10)
+    ap.add_argument("--concurrency", type=int, default=64)
+    ap.add_argument("--clients", type=int, default=2, help="procesos generadores de carga")
+    ap.add_argument("--out", help="guardar resultados en JSON")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="alerttrail-prefork-")
+    template = os.path.join(tmp, "template.sqlite3")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{template}",
+        "RATE_LIMIT_ENABLED": "false",
+        "FREE_DAILY_ANALYSES": "1000000000",  # la cuota se chequea igual, pero no corta
+        "BILLING_DISPATCHER_ENABLED": "false",
+        "BCRYPT_ROUNDS": os.environ.get("BCRYPT_ROUNDS", "4"),
+    })
+    seed(SIZES)
+    from app.database import engine
+    engine.dispose()
+
+    rows = []
+    for n in (int(x) for x in args.workers.split(",")):
+        rows.append(run(n, template, tmp, args))
+        r = rows[-1]
+        print(f"workers={n:<3} {r['rps']:>9.1f} rps  x{r['rps'] / rows[0]['rps']:.2f}  "
+              f"p50 {r['p50_ms']:>7.2f}  p95 {r['p95_ms']:>7.2f} ms  escrituras {r['writes']}  errores {r['errors']}",
+              flush=True)
+
+    print(f"\n(cpus: {os.cpu_count()}, mix: {args.mix}, concurrencia: {args.concurrency})")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"cpus": os.cpu_count(), "mix": args.mix, "runs": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
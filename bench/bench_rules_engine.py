@@ -0,0 +1,65 @@
+# bench/bench_rules_engine.py
+# Throughput (MB/s) del motor de reglas para logs típicos, con 10 a 10.000 reglas.
+# Uso: python -m bench.bench_rules_engine [--rules 10,100,1000,10000] [--mb 1,10]
+import argparse
+import random
+import time
+
+from app.analyzer.engine import RuleSet
+from app.analyzer.rules import DEFAULT_RULES, Rule
+
+LINES = [
+    '127.0.0.1 - - [18/Oct/2026:10:00:00 +0000] "GET /api/items?id={n} HTTP/1.1" 200 512',
+    '10.0.0.{n} - - [18/Oct/2026:10:00:01 +0000] "POST /login HTTP/1.1" 401 87',
+    "Oct 18 10:00:02 web sshd[{n}]: Failed password for invalid user admin from 203.0.113.{n} port 22 ssh2",
+    "2026-10-18 10:00:03,120 INFO worker-{n} processed batch in 35ms",
+    "2026-10-18 10:00:04,500 ERROR db pool exhausted after {n} retries",
+    "2026-10-18 10:00:05,001 WARN slow query took {n}ms",
+]
+
+
+def make_log(mb: float) -> str:
+    rnd = random.Random(42)
+    out, size = [], 0
+    while size < mb * 1024 * 1024:
+        line = rnd.choice(LINES).format(n=rnd.randrange(1000))
+        out.append(line)
+        size += len(line) + 1
+    return "\n".join(out) + "\n"
+
+
+def make_rules(n: int) -> tuple[Rule, ...]:
+    # Las default + literales sintéticos (IOCs, hosts) + algunos regex, ~10% regex
+    rules = list(DEFAULT_RULES)
+    i = 0
+    while len(rules) < n:
+        if i % 10 == 0:
+            rules.append(Rule(f"rx{i}", rf"user{i}\d+ from \S+", "low"))
+        else:
+            rules.append(Rule(f"ioc{i}", f"bad-host-{i}.example", "high", literal=True))
+        i += 1
+    return tuple(rules[:n])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rules", default="10,100,1000,10000")
+    ap.add_argument("--mb", default="1,10")
+    args = ap.parse_args()
+
+    logs = {mb: make_log(mb) for mb in [float(x) for x in args.mb.split(",")]}
+    print(f"{'reglas':>7} {'compilar ms':>12} " + " ".join(f"{f'{mb:g} MB -> MB/s':>16}" for mb in logs))
+    for n in [int(x) for x in args.rules.split(",")]:
+        t0 = time.perf_counter()
+        rs = RuleSet(make_rules(n))
+        compile_ms = (time.perf_counter() - t0) * 1000
+        cols = []
+        for mb, text in logs.items():
+            t0 = time.perf_counter()
+            rs.scan(text)
+            cols.append(f"{mb / (time.perf_counter() - t0):>16.1f}")
+        print(f"{n:>7} {compile_ms:>12.1f} " + " ".join(cols))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# bench/bench_search.py
+# Latencia de app.search.search (FTS5 + bm25) con millones de análisis sintéticos.
+# Siembra las filas sin triggers, arma el índice con el mismo camino por lotes que
+# `python -m app.search rebuild` (y reporta filas/s) y después mide p50/p95 por tipo de
+# consulta, para un usuario "pesado" (10% de las filas) y uno típico.
+# Uso: python -m bench.bench_search [--rows 1000000] [--users 1000] [--repeat 200]
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from bench.bench_suite import _percentile
+
+WORDS = ("error warning failed password timeout refused denied upstream nginx sshd postgres redis "
+         "kernel oom killed disk full latency retry exhausted pool connection reset certificate expired "
+         "login admin root invalid user token jwt forbidden unauthorized payment webhook invoice").split()
+RULES = ("error", "ssh_failed_password", "sql_injection", "path_traversal", "oom_killer", "http_5xx", "brute_force")
+SEVERITIES = ("low", "medium", "high", "critical")
+
+
+def _rare_words(n: int) -> list[str]:
+    rnd = random.Random(7)
+    return ["".join(rnd.choice("bcdfghjklmnprstvz") + rnd.choice("aeiou") for _ in range(4)) for _ in range(n)]
+
+
+RARE = _rare_words(20_000)  # cada una aparece en ~0,02% de las filas
+
+
+def seed(rows: int, users: int, rnd: random.Random, batch: int = 20_000) -> float:
+    """Inserta `rows` análisis (sin índice) y devuelve los segundos que tardó el índice por lotes."""
+    from sqlalchemy import text
+    from app.database import engine
+    from app.migrations import ensure_schema
+    from app import search
+    from app.utils import result_codec
+
+    ensure_schema(engine)
+    with engine.begin() as conn:
+        for name in ("analyses_fts_ai", "analyses_fts_ad", "analyses_fts_au"):
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        conn.execute(text("INSERT INTO users (id, email, email_norm, name, hashed_password, is_pro) "
+                          "VALUES (:id, :e, :e, 'b', 'x', 0)"),
+                     [{"id": u, "e": f"search{u}@example.com"} for u in range(1, users + 1)])
+
+    rare = RARE
+    stmt = text("INSERT INTO analyses (user_id, title, input_summary, result_json) VALUES (:u, :t, :s, :r)")
+    t0 = time.perf_counter()
+    for start in range(0, rows, batch):
+        params = []
+        for _ in range(min(batch, rows - start)):
+            # usuario 1: 10% de las filas; el resto repartido parejo
+            uid = 1 if rnd.random() < 0.10 else rnd.randint(2, users)
+            words = rnd.choices(WORDS, k=12) + rnd.choices(rare, k=3)
+            hits = {r: {"count": 1, "severity": rnd.choice(SEVERITIES)} for r in rnd.sample(RULES, rnd.randint(0, 3))}
+            params.append({
+                "u": uid, "t": f"{rnd.choice(WORDS)} {rnd.choice(rare)}", "s": " ".join(words),
+                "r": result_codec.dumps({"hits": hits, "max_severity": rnd.choice(SEVERITIES) if hits else None}),
+            })
+        with engine.begin() as conn:
+            conn.execute(stmt, params)
+    print(f"sembradas {rows} filas en {time.perf_counter() - t0:.1f}s", flush=True)
+
+    t0 = time.perf_counter()
+    search.rebuild(engine, search.REBUILD_BATCH, log=lambda _m: None)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--users", type=int, default=1000)
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="alerttrail-search-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tmp}/bench.sqlite3")
+    os.environ.setdefault("SQLITE_PROFILE", "production")
+    rnd = random.Random(42)
+    index_s = seed(args.rows, args.users, rnd)
+    print(f"índice: {index_s:.1f}s ({args.rows / index_s:.0f} filas/s), "
+          f"{os.path.getsize(f'{tmp}/bench.sqlite3') / 1e6:.0f} MB en disco\n")
+
+    from app.database import ReadSessionLocal
+    from app import search
+
+    queries = {
+        "palabra común": "error",
+        "palabra rara": lambda: rnd.choice(RARE),
+        "dos palabras": "failed password",
+        "prefijo": "tim*",
+        "regla": "sql_injection",
+        "sin resultados": "zzzzzz",
+    }
+    print(f"{'usuario':>8} {'consulta':>16} {'p50 ms':>8} {'p95 ms':>8} {'filas':>6}")
+    db = ReadSessionLocal()
+    try:
+        for user, uid in (("pesado", 1), ("típico", 2)):
+            for label, q in queries.items():
+                lat, n = [], 0
+                for _ in range(args.repeat):
+                    text_q = q() if callable(q) else q
+                    t0 = time.perf_counter()
+                    n = len(search.search(db, uid, text_q, 20))
+                    lat.append((time.perf_counter() - t0) * 1000)
+                lat.sort()
+                print(f"{user:>8} {label:>16} {_percentile(lat, 50):>8.2f} {_percentile(lat, 95):>8.2f} {n:>6}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
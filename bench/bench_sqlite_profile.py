@@ -0,0 +1,81 @@
+# bench/bench_sqlite_profile.py
+# Escrituras (tipo run_analysis) y lecturas (tipo list_my_analyses) concurrentes
+# sobre un archivo SQLite, con el perfil "default" vs "production".
+# Uso: python -m bench.bench_sqlite_profile [--writers 4] [--readers 16] [--seconds 5]
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, make_engines
+from app.models import Analysis, User
+
+
+def run(profile: str, writers: int, readers: int, seconds: float) -> dict:
+    path = os.path.join(tempfile.mkdtemp(), "bench.sqlite3")
+    writer, reader = make_engines(f"sqlite:///{path}", profile)
+    Base.metadata.create_all(writer)
+    W = sessionmaker(bind=writer)
+    R = sessionmaker(bind=reader)
+    with W() as db:
+        db.add(User(email="bench@example.com", name="b", hashed_password="x")); db.commit()
+        db.add_all(Analysis(user_id=1, title=f"a{i}", input_summary="x" * 200, result_json="{}") for i in range(2000))
+        db.commit()
+
+    counts = {"writes": 0, "reads": 0, "errors": 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + seconds
+
+    def bump(key):
+        with lock:
+            counts[key] += 1
+
+    def write_loop():
+        while time.perf_counter() < stop:
+            try:
+                with W() as db:
+                    db.add(Analysis(user_id=1, title="w", input_summary="x" * 200, result_json="{}")); db.commit()
+                bump("writes")
+            except OperationalError:
+                bump("errors")
+
+    def read_loop():
+        q = (select(Analysis.id, Analysis.title, Analysis.result_json)
+             .where(Analysis.user_id == 1).order_by(Analysis.created_at.desc(), Analysis.id.desc()).limit(100))
+        while time.perf_counter() < stop:
+            try:
+                with R() as db:
+                    db.execute(q).all()
+                bump("reads")
+            except OperationalError:
+                bump("errors")
+
+    threads = [threading.Thread(target=write_loop) for _ in range(writers)]
+    threads += [threading.Thread(target=read_loop) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    writer.dispose(); reader.dispose()
+    return {k: round(v / seconds, 1) if k != "errors" else v for k, v in counts.items()}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--writers", type=int, default=4)
+    ap.add_argument("--readers", type=int, default=16)
+    ap.add_argument("--seconds", type=float, default=5)
+    args = ap.parse_args()
+    print(f"{'perfil':<11} {'writes/s':>9} {'reads/s':>9} {'errores':>8}")
+    for profile in ("default", "production"):
+        r = run(profile, args.writers, args.readers, args.seconds)
+        print(f"{profile:<11} {r['writes']:>9} {r['reads']:>9} {r['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
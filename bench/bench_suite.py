@@ -0,0 +1,357 @@
+# bench/bench_suite.py
+# Suite de benchmarks de toda la API, reproducible: SQLite sembrada en un directorio
+# temporal, Facturante falso local y el mismo set de escenarios contra
+#   --target inprocess  la app por ASGI (httpx.ASGITransport), sin red
+#   --target uvicorn    un uvicorn real levantado como subproceso
+# Reporta p50/p95/p99 (ms), RPS y errores por escenario en JSON.
+#
+# Uso:
+#   python -m bench.bench_suite --out results.json
+#   python -m bench.bench_suite --target uvicorn --workers 2 --only login,analysis_list_1000
+#   python -m bench.bench_suite --baseline bench/baseline.json --compare  # exit 1 si hay regresiones
+#   python -m bench.bench_suite --save-baseline bench/baseline.json
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from bench.fake_facturante import MP_SECRET, FakeFacturante, mp_headers
+
+PASSWORD = "benchpass"
+LIST_SIZES = (100, 1000, 10000)
+SEED_LOG = ("Oct 18 10:00:02 web sshd[42]: Failed password for invalid user admin from 203.0.113.7\n"
+            "2026-10-18 10:00:04,500 ERROR db pool exhausted after 3 retries\n") * 4
+
+
+@dataclass
+class Scenario:
+    name: str
+    requests: int
+    concurrency: int
+    # (client, i, ctx) -> response; se espera status 2xx (o 304); None cuenta como error
+    call: Callable[..., Awaitable]
+
+
+def _scenarios(sizes: tuple[int, ...]) -> list[Scenario]:
+    def auth(ctx):
+        return {"Authorization": f"Bearer {ctx['token']}"}
+
+    async def register(c, i, ctx):
+        return await c.post("/auth/register", json={"email": f"reg-{ctx['run']}-{i}@example.com", "name": "r",
+                                                    "password": PASSWORD})
+
+    async def login(c, i, ctx):
+        return await c.post("/auth/login", json={"email": "bench@example.com", "password": PASSWORD})
+
+    async def me(c, i, ctx):
+        return await c.get("/auth/me", cookies={"access_token": ctx["token"]})
+
+    async def analysis_create(c, i, ctx):
+        return await c.post("/analysis", json={"title": f"bench {i}", "content": SEED_LOG}, headers=auth(ctx))
+
+    def list_page(n):
+        async def call(c, i, ctx):
+            return await c.get("/analysis", params={"limit": 100},
+                               headers={"Authorization": f"Bearer {ctx['list_tokens'][n]}"})
+        return call
+
+    def list_ndjson(n):
+        async def call(c, i, ctx):
+            return await c.get("/analysis", params={"format": "ndjson"},
+                               headers={"Authorization": f"Bearer {ctx['list_tokens'][n]}"})
+        return call
+
+    def list_revalidate(n):
+        # GET condicional: el cliente ya tiene la página, se espera un 304 sin leer filas
+        async def call(c, i, ctx):
+            headers = {"Authorization": f"Bearer {ctx['list_tokens'][n]}"}
+            key = f"etag_{n}"
+            if key not in ctx:
+                ctx[key] = (await c.get("/analysis", params={"limit": 100}, headers=headers)).headers["etag"]
+            r = await c.get("/analysis", params={"limit": 100}, headers={**headers, "If-None-Match": ctx[key]})
+            return r if r.status_code == 304 else None
+        return call
+
+    async def analysis_stats(c, i, ctx):
+        return await c.get("/analysis/stats", params={"days": 90}, headers=auth(ctx))
+
+    async def pdf(c, i, ctx):
+        ids = ctx["pdf_ids"]
+        return await c.get(f"/analysis/{ids[i % len(ids)]}/pdf", headers=auth(ctx))
+
+    async def webhook(c, i, ctx):
+        payment_id = ctx["run"] * 100_000 + i
+        return await c.post("/webhooks/mpago", headers=mp_headers(payment_id), json={
+            "data": {"id": payment_id, "status": "approved"},
+            "payer": {"email": f"payer{i}@example.com", "first_name": "P", "last_name": str(i)},
+            "description": "AlertTrail Pro", "transaction_amount": 1000,
+        })
+
+    out = [
+        Scenario("register", 40, 4, register),
+        Scenario("login", 40, 4, login),
+        Scenario("auth_me", 500, 16, me),
+        Scenario("analysis_create", 300, 8, analysis_create),
+    ]
+    for n in sizes:
+        out.append(Scenario(f"analysis_list_{n}", 200, 8, list_page(n)))
+        out.append(Scenario(f"analysis_ndjson_{n}", max(5, 20000 // n), 4, list_ndjson(n)))
+        out.append(Scenario(f"analysis_list_{n}_304", 200, 8, list_revalidate(n)))
+    out += [
+        Scenario("analysis_stats", 300, 8, analysis_stats),
+        Scenario("pdf_download", 150, 8, pdf),
+        Scenario("webhook_mpago", 300, 16, webhook),
+    ]
+    return out
+
+
+# ---------------- Datos sembrados ----------------
+def seed(sizes: tuple[int, ...]) -> dict:
+    """Usuarios y análisis directo en la base (sin pasar por la API). Devuelve ids útiles."""
+    from sqlalchemy import insert, select
+
+    from app import stats
+    from app.database import SessionLocal, engine
+    from app.migrations import ensure_schema
+    from app.models import Analysis, User
+    from app.routes.analysis import analyze
+    from app.schemas import AnalysisCreate
+    from app.utils import result_codec
+    from app.utils.security import get_password_hash
+
+    ensure_schema(engine)
+    hashed = get_password_hash(PASSWORD)
+    summary, result = analyze(AnalysisCreate(title="seed", content=SEED_LOG))
+    blob = result_codec.dumps(result)
+    with SessionLocal() as db:
+        users = {"bench@example.com": 200, **{f"list{n}@example.com": n for n in sizes}}
+        for email, rows in users.items():
+            user = User(email=email, name="bench", hashed_password=hashed)
+            db.add(user)
+            db.flush()
+            db.execute(insert(Analysis), [
+                {"user_id": user.id, "title": f"seed {i}", "input_summary": summary, "result_json": blob}
+                for i in range(rows)
+            ])
+        db.commit()
+        stats.rebuild(engine, log=lambda _m: None)  # el INSERT directo no pasa por los rollups
+        bench_id = db.scalar(select(User.id).where(User.email == "bench@example.com"))
+        pdf_ids = db.scalars(select(Analysis.id).where(Analysis.user_id == bench_id).limit(50)).all()
+    return {"pdf_ids": list(pdf_ids)}
+
+
+# ---------------- Medición ----------------
+def _percentile(sorted_ms: list[float], p: float) -> float:
+    if not sorted_ms:
+        return 0.0
+    k = max(0, min(len(sorted_ms) - 1, int(round(p / 100 * len(sorted_ms) + 0.5)) - 1))
+    return sorted_ms[k]
+
+
+async def run_scenario(client, sc: Scenario, ctx: dict) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(sc.requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            t0 = time.perf_counter()
+            try:
+                r = await sc.call(client, i, ctx)
+                ok = r is not None and (200 <= r.status_code < 300 or r.status_code == 304)
+            except Exception:
+                ok = False
+            latencies.append((time.perf_counter() - t0) * 1000)
+            errors += not ok
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(sc.concurrency)))
+    wall = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "requests": sc.requests,
+        "concurrency": sc.concurrency,
+        "errors": errors,
+        "rps": round(sc.requests / wall, 1),
+        "mean_ms": round(sum(latencies) / len(latencies), 2),
+        "p50_ms": round(_percentile(latencies, 50), 2),
+        "p95_ms": round(_percentile(latencies, 95), 2),
+        "p99_ms": round(_percentile(latencies, 99), 2),
+    }
+
+
+async def _login_tokens(client, sizes) -> dict:
+    async def token(email):
+        r = await client.post("/auth/login", json={"email": email, "password": PASSWORD})
+        r.raise_for_status()
+        return r.json()["access_token"]
+
+    return {"token": await token("bench@example.com"),
+            "list_tokens": {n: await token(f"list{n}@example.com") for n in sizes}}
+
+
+async def run_all(client, scenarios: list[Scenario], ctx: dict, sizes) -> dict:
+    ctx.update(await _login_tokens(client, sizes))
+    results = {}
+    for sc in scenarios:
+        results[sc.name] = await run_scenario(client, sc, ctx)
+        r = results[sc.name]
+        print(f"  {sc.name:<24} p50 {r['p50_ms']:>8.2f}  p95 {r['p95_ms']:>8.2f}  p99 {r['p99_ms']:>8.2f} ms"
+              f"  {r['rps']:>8.1f} rps  errores {r['errors']}", file=sys.stderr)
+    return results
+
+
+async def inprocess(scenarios, ctx, sizes) -> dict:
+    import httpx
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        return await run_all(client, scenarios, ctx, sizes)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def live_uvicorn(scenarios, ctx, sizes, workers: int) -> dict:
+    import httpx
+
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        env=os.environ.copy(),
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        limits = httpx.Limits(max_connections=64, max_keepalive_connections=64)
+        async with httpx.AsyncClient(base_url=base, timeout=60, limits=limits) as client:
+            deadline = time.time() + 30
+            while True:
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.time() > deadline or proc.poll() is not None:
+                    raise RuntimeError("uvicorn no arrancó")
+                await asyncio.sleep(0.1)
+            return await run_all(client, scenarios, ctx, sizes)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+# ---------------- Baseline ----------------
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Escenarios cuyo p95 subió o cuyo RPS bajó más que `threshold` (fracción)."""
+    regressions = []
+    print(f"\n{'escenario':<24} {'p95 base':>9} {'p95 ahora':>10} {'Δ':>7} {'rps base':>9} {'rps ahora':>10} {'Δ':>7}")
+    for name, cur in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            print(f"{name:<24} (sin baseline)")
+            continue
+        d_p95 = cur["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        d_rps = cur["rps"] / base["rps"] - 1 if base["rps"] else 0.0
+        bad = d_p95 > threshold or d_rps < -threshold or cur["errors"] > base["errors"]
+        flag = "  REGRESIÓN" if bad else ""
+        print(f"{name:<24} {base['p95_ms']:>9.2f} {cur['p95_ms']:>10.2f} {d_p95:>+7.0%} "
+              f"{base['rps']:>9.1f} {cur['rps']:>10.1f} {d_rps:>+7.0%}{flag}")
+        if bad:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--target", choices=["inprocess", "uvicorn"], default="inprocess")
+    ap.add_argument("--workers", type=int, default=1, help="workers de uvicorn (--target uvicorn)")
+    ap.add_argument("--only", help="escenarios separados por coma")
+    ap.add_argument("--sizes", default=",".join(map(str, LIST_SIZES)), help="filas por usuario para GET /analysis")
+    ap.add_argument("--scale", type=float, default=1.0, help="multiplica la cantidad de requests")
+    ap.add_argument("--bcrypt-rounds", type=int, default=None)
+    ap.add_argument("--out", help="archivo JSON de resultados (por defecto stdout)")
+    ap.add_argument("--baseline", help="JSON de una corrida anterior")
+    ap.add_argument("--compare", action="store_true", help="comparar con --baseline; exit 1 si hay regresiones")
+    ap.add_argument("--threshold", type=float, default=0.15, help="tolerancia relativa de p95/RPS")
+    ap.add_argument("--save-baseline", help="guardar esta corrida como baseline")
+    args = ap.parse_args()
+
+    sizes = tuple(int(x) for x in args.sizes.split(","))
+    scenarios = _scenarios(sizes)
+    if args.only:
+        wanted = set(args.only.split(","))
+        scenarios = [s for s in scenarios if s.name in wanted]
+    for s in scenarios:
+        s.requests = max(1, int(s.requests * args.scale))
+
+    tmp = tempfile.mkdtemp(prefix="alerttrail-bench-")
+    with FakeFacturante(latency=0.02) as fake:
+        os.environ.update({
+            "DATABASE_URL": f"sqlite:///{tmp}/bench.sqlite3",
+            "SQLITE_PROFILE": os.environ.get("SQLITE_PROFILE", "production"),
+            "PDF_CACHE_DIR": f"{tmp}/pdf_cache",
+            "RATE_LIMIT_ENABLED": "false",  # el benchmark es un flood a propósito
+            "FREE_DAILY_ANALYSES": "1000000000",  # la cuota se chequea igual, pero no corta
+            "FACT_API_URL": fake.url, "FACT_PTO_VTA": "1", "FACT_CUIT": "20000000001",
+            "BILLING_POLL_SECONDS": "0.2", "MP_WEBHOOK_SECRET": MP_SECRET,
+        })
+        if args.bcrypt_rounds:
+            os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+
+        t0 = time.perf_counter()
+        ctx = {**seed(sizes), "run": int(time.time())}
+        print(f"seed: {time.perf_counter() - t0:.1f}s ({tmp})", file=sys.stderr)
+        if args.target == "uvicorn":
+            results = asyncio.run(live_uvicorn(scenarios, ctx, sizes, args.workers))
+        else:
+            results = asyncio.run(inprocess(scenarios, ctx, sizes))
+
+    report = {
+        "meta": {
+            "target": args.target,
+            "workers": args.workers if args.target == "uvicorn" else None,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "git": subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip(),
+            "timestamp": int(time.time()),
+        },
+        "scenarios": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(text + "\n")
+
+    if args.compare:
+        if not args.baseline:
+            sys.exit("--compare necesita --baseline")
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"\nregresiones: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# bench/bench_upload_memory.py
+# Pico de RSS al analizar logs de distinto tamaño: POST /analysis/upload (gzip, en
+# streaming) vs POST /analysis (JSON). Cada medición corre en un subproceso propio
+# porque ru_maxrss sólo crece. En modo upload el cliente genera el cuerpo al vuelo, así
+# que el pico es del servidor; en modo json incluye también el cuerpo armado por el cliente.
+# Uso: python -m bench.bench_upload_memory [--mb 10,50,200] [--json-max-mb 50]
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+from bench.bench_rules_engine import make_log
+
+LOG_BLOCK_MB = 1
+
+
+def _rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB en Linux
+
+
+async def _gzip_body(mb: int):
+    block = make_log(LOG_BLOCK_MB).encode()
+    comp = zlib.compressobj(wbits=31)
+    for _ in range(mb // LOG_BLOCK_MB):
+        yield comp.compress(block)
+    yield comp.flush()
+
+
+async def _child(mode: str, mb: int) -> dict:
+    import httpx
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as c:
+        await c.post("/auth/register", json={"email": "bench@example.com", "name": "b", "password": "benchpass"})
+        r = await c.post("/auth/login", json={"email": "bench@example.com", "password": "benchpass"})
+        h = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        await c.post("/analysis", json={"title": "warmup", "content": "ERROR warmup"}, headers=h)
+        before = _rss_mb()
+
+        t0 = time.perf_counter()
+        if mode == "upload":
+            r = await c.post("/analysis/upload?title=bench", content=_gzip_body(mb), headers=h)
+        else:
+            content = make_log(LOG_BLOCK_MB) * (mb // LOG_BLOCK_MB)
+            r = await c.post("/analysis", json={"title": "bench", "content": content}, headers=h)
+            del content
+        elapsed = time.perf_counter() - t0
+        r.raise_for_status()
+    return {"mode": mode, "mb": mb, "rss_before_mb": round(before, 1), "rss_peak_mb": round(_rss_mb(), 1),
+            "seconds": round(elapsed, 2), "hits": r.json()["result_json"]["total_hits"]}
+
+
+def _run(mode: str, mb: int) -> dict:
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{tempfile.mkdtemp()}/bench.sqlite3"}
+    out = subprocess.run(
+        [sys.executable, "-m", "bench.bench_upload_memory", "--child", mode, "--mb", str(mb)],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mb", default="10,50,200")
+    ap.add_argument("--json-max-mb", type=int, default=50, help="POST /analysis sólo hasta este tamaño")
+    ap.add_argument("--child", choices=["upload", "json"])
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(_child(args.child, int(args.mb)))))
+        return
+
+    print(f"{'modo':>8} {'MB':>6} {'RSS base':>9} {'RSS pico':>9} {'delta':>8} {'seg':>7} {'MB/s':>7}")
+    for mb in [int(x) for x in args.mb.split(",")]:
+        for mode in ("upload", "json"):
+            if mode == "json" and mb > args.json_max_mb:
+                continue
+            r = _run(mode, mb)
+            delta = r["rss_peak_mb"] - r["rss_before_mb"]
+            print(f"{mode:>8} {mb:>6} {r['rss_before_mb']:>9.1f} {r['rss_peak_mb']:>9.1f} {delta:>8.1f} "
+                  f"{r['seconds']:>7.2f} {mb / r['seconds']:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
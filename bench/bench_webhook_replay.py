@@ -0,0 +1,67 @@
+# bench/bench_webhook_replay.py
+# Tormenta de reentregas de Mercado Pago contra un Facturante falso local.
+# Verifica que cada pago genere exactamente una llamada upstream.
+# Uso: python -m bench.bench_webhook_replay [--payments 200] [--replays 20] [--threads 16]
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench.fake_facturante import MP_SECRET, FakeFacturante, mp_headers
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--payments", type=int, default=200)
+    ap.add_argument("--replays", type=int, default=20)
+    ap.add_argument("--threads", type=int, default=16)
+    ap.add_argument("--latency", type=float, default=0.05, help="latencia simulada de Facturante (s)")
+    args = ap.parse_args()
+
+    with FakeFacturante(latency=args.latency) as fake:
+        tmp = tempfile.mkdtemp()
+        os.environ.update({
+            "DATABASE_URL": f"sqlite:///{tmp}/bench.sqlite3",
+            "FACT_API_URL": fake.url, "FACT_PTO_VTA": "1", "FACT_CUIT": "20000000001",
+            "BILLING_POLL_SECONDS": "0.2", "MP_WEBHOOK_SECRET": MP_SECRET,
+        })
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        def payment(i: int) -> dict:
+            return {
+                "data": {"id": 10_000 + i, "status": "approved"},
+                "payer": {"email": f"payer{i}@example.com", "first_name": "P", "last_name": str(i)},
+                "description": "AlertTrail Pro", "transaction_amount": 1000,
+            }
+
+        deliveries = [payment(i) for _ in range(args.replays) for i in range(args.payments)]
+        with TestClient(app) as client:
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(args.threads) as ex:
+                codes = list(ex.map(lambda p: client.post("/webhooks/mpago", json=p, headers=mp_headers(p["data"]["id"])).status_code, deliveries))
+            elapsed = time.perf_counter() - t0
+
+            deadline = time.time() + 60
+            while len(fake.calls) < args.payments and time.time() < deadline:
+                time.sleep(0.1)
+            # Segunda ola: todo ya facturado, debe salir de memoria
+            t1 = time.perf_counter()
+            for p in deliveries[: args.payments * 5]:
+                client.post("/webhooks/mpago", json=p, headers=mp_headers(p["data"]["id"]))
+            replay_us = (time.perf_counter() - t1) / (args.payments * 5) * 1e6
+            stats = client.get("/health/stats").json()["billing_dedup"]
+
+        upstream = sum(fake.calls.values())
+        dupes = sum(n - 1 for n in fake.calls.values() if n > 1)
+        print(f"entregas: {len(deliveries)} ({args.payments} pagos x {args.replays}) en {elapsed:.2f}s, "
+              f"non-200: {sum(c != 200 for c in codes)}")
+        print(f"llamadas upstream: {upstream}  duplicadas: {dupes}")
+        print(f"reentrega de pago ya facturado: {replay_us:.0f} us/request (in-process)  dedup: {stats}")
+        sys.exit(1 if dupes or upstream != args.payments else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# bench/fake_facturante.py
+# Servidor HTTP local que imita a Facturante: responde un CAE y cuenta las llamadas por cliente.
+# mp_headers() firma las notificaciones simuladas como Mercado Pago (x-signature).
+import json
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+MP_SECRET = "bench-mp-secret"  # los benchmarks lo ponen en MP_WEBHOOK_SECRET
+
+
+def mp_headers(data_id) -> dict:
+    from app.billing import signature
+
+    request_id = uuid.uuid4().hex
+    return {"x-request-id": request_id,
+            "x-signature": signature.sign(MP_SECRET, str(data_id), request_id, str(int(time.time())))}
+
+
+class FakeFacturante:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/invoice"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                key = body["cliente"]["email"]
+                with fake._lock:
+                    fake.calls[key] += 1
+                    n = sum(fake.calls.values())
+                if fake.latency:
+                    time.sleep(fake.latency)
+                out = json.dumps({"cae": f"CAE{n:08d}", "cbteNro": n, "pdfUrl": f"https://fake/{n}.pdf"}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(out)))
+                self.end_headers()
+                self.wfile.write(out)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()